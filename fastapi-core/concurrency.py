@@ -1,7 +1,11 @@
 import asyncio
-from typing import Dict, Set
+import json
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Set
 from loguru import logger
 from config import settings
+from live_feed import live_feed
 
 
 class SessionManager:
@@ -14,13 +18,30 @@ class SessionManager:
     def __init__(self):
         self._lock = asyncio.Lock()
         self._active: Dict[str, dict] = {}  # session_token -> metadata
+        # resume_token -> (session_token, estado, tarea de expiración, cierre)
+        self._parked: Dict[str, tuple] = {}
+        # session_token -> conexión viva (websocket, tarea del handler, actividad)
+        self._connections: Dict[str, dict] = {}
+        self.reaped: Counter = Counter()
+        # Drain: no se admiten sesiones nuevas y las vivas se cierran al terminar su turno
+        self.draining = False
+        self._pending_closes: Set[asyncio.Task] = set()
 
-    async def acquire(self, session_token: str, user_id: int | None = None) -> bool:
+    async def acquire(
+        self,
+        session_token: str,
+        user_id: int | None = None,
+        tenant: str | None = None,
+        voice: str | None = None,
+    ) -> bool:
         """
         Intenta registrar una nueva sesión activa.
         Returns True si se adquirió, False si se alcanzó el límite global.
         """
         async with self._lock:
+            if self.draining:
+                logger.info(f"Drain en curso: rechazando sesión {session_token}")
+                return False
             if len(self._active) >= settings.max_global_sessions:
                 logger.warning(
                     f"Límite global de sesiones alcanzado ({settings.max_global_sessions}). "
@@ -30,7 +51,14 @@ class SessionManager:
             self._active[session_token] = {
                 "user_id": user_id,
                 "session_token": session_token,
+                "tenant": tenant,
+                "voice": voice,
+                "stage": "listening",
+                "turns": 0,
+                "last_latency_ms": None,
+                "started_at": time.time(),
             }
+            live_feed.publish("start", self._active[session_token])
             logger.info(
                 f"Sesión adquirida: {session_token} | "
                 f"Activas: {len(self._active)}/{settings.max_global_sessions}"
@@ -41,12 +69,190 @@ class SessionManager:
         """Libera una sesión activa."""
         async with self._lock:
             if session_token in self._active:
-                del self._active[session_token]
+                live_feed.publish("end", self._active.pop(session_token))
                 logger.info(
                     f"Sesión liberada: {session_token} | "
                     f"Activas restantes: {len(self._active)}"
                 )
 
+    def stage(self, session_token: str, stage: str) -> None:
+        """
+        Marca la etapa actual de la sesión (stt, llm, tts, listening). Sin lock:
+        es una asignación en el event loop y se llama varias veces por turno.
+        """
+        state = self._active.get(session_token)
+        if state is not None and state["stage"] != stage:
+            state["stage"] = stage
+            live_feed.publish("stage", state)
+
+    def turn_done(self, session_token: str, latency_ms: int | None) -> None:
+        """Cierra un turno: suma el contador, guarda la latencia y vuelve a escuchar."""
+        state = self._active.get(session_token)
+        if state is not None:
+            state["turns"] += 1
+            if latency_ms is not None:
+                state["last_latency_ms"] = latency_ms
+            state["stage"] = "listening"
+            live_feed.publish("stage", state)
+            if self.draining:
+                # El turno en curso ya respondió: ahora sí cerrar
+                task = asyncio.create_task(self.close_connection(session_token, "draining"))
+                self._pending_closes.add(task)
+                task.add_done_callback(self._pending_closes.discard)
+
+    def park(
+        self,
+        session_token: str,
+        resume_token: str,
+        state: object,
+        grace: float,
+        on_expire: Callable[[object], Awaitable[None]],
+    ) -> None:
+        """
+        Deja una sesión en espera tras una caída de la conexión: conserva el slot
+        y el estado durante `grace` segundos. Si nadie la reanuda, se llama a
+        `on_expire(state)` para el cierre definitivo (que libera el slot).
+        """
+        async def expire():
+            await asyncio.sleep(grace)
+            entry = self._parked.pop(resume_token, None)
+            if entry is not None:
+                await on_expire(state)
+
+        self._parked[resume_token] = (session_token, state, asyncio.create_task(expire()), on_expire)
+        self.stage(session_token, "parked")
+
+    def resume(self, resume_token: str) -> object | None:
+        """Retoma una sesión en espera (slot incluido). None si venció o no existe."""
+        if self.draining:
+            return None
+        entry = self._parked.pop(resume_token, None)
+        if entry is None:
+            return None
+        session_token, state, task, _ = entry
+        task.cancel()
+        self.stage(session_token, "listening")
+        return state
+
+    async def expire_parked(self) -> None:
+        """Cierra ya todas las sesiones en espera (al apagar el servidor)."""
+        for resume_token in list(self._parked):
+            entry = self._parked.pop(resume_token, None)
+            if entry is not None:
+                _, state, task, on_expire = entry
+                task.cancel()
+                await on_expire(state)
+
+    def parked_count(self) -> int:
+        return len(self._parked)
+
+    # ── Heartbeat y reaper ────────────────────────────────────────────────────
+    def connect(self, session_token: str, websocket) -> None:
+        """Asocia la conexión actual a la sesión (al crearla y al reanudarla)."""
+        now = time.monotonic()
+        self._connections[session_token] = {
+            "websocket": websocket,
+            "task": asyncio.current_task(),
+            "last_seen": now,
+            "last_audio": now,
+            "heartbeat": False,  # el cliente respondió algún pong
+            "closed": None,      # motivo si el servidor cerró la conexión
+        }
+
+    def disconnect(self, session_token: str) -> str | None:
+        """
+        Desasocia la conexión. Returns: motivo si la cerró el servidor (reaper o
+        drain), None si la cerró el cliente. Una sesión cerrada por el servidor
+        no queda en espera de reanudación.
+        """
+        conn = self._connections.pop(session_token, None)
+        return conn["closed"] if conn else None
+
+    def seen(self, session_token: str, audio: bool = False, pong: bool = False) -> None:
+        """Registra un mensaje del cliente (cualquiera cuenta como señal de vida)."""
+        conn = self._connections.get(session_token)
+        if conn is not None:
+            conn["last_seen"] = time.monotonic()
+            if audio:
+                conn["last_audio"] = conn["last_seen"]
+            if pong:
+                conn["heartbeat"] = True
+
+    def _stale_reason(self, session_token: str, conn: dict, now: float) -> str | None:
+        state = self._active.get(session_token)
+        if state and settings.ws_max_duration and time.time() - state["started_at"] > settings.ws_max_duration:
+            return "max_duration"
+        # Solo a clientes que hablan el protocolo: un widget viejo nunca manda pong
+        if conn["heartbeat"] and settings.ws_heartbeat_timeout and now - conn["last_seen"] > settings.ws_heartbeat_timeout:
+            return "heartbeat"
+        if settings.ws_idle_timeout and now - conn["last_audio"] > settings.ws_idle_timeout:
+            return "idle"
+        return None
+
+    async def reap_stale(self) -> None:
+        """
+        Una pasada del reaper: manda ping a cada conexión y cierra las vencidas.
+        Cerrar el socket hace que el handler salga de receive() y haga su cierre
+        normal (que libera el slot); si en la pasada siguiente sigue ahí, se
+        cancela su tarea.
+        """
+        now = time.monotonic()
+        for session_token, conn in list(self._connections.items()):
+            if conn["closed"]:
+                conn["task"].cancel()
+                continue
+            reason = self._stale_reason(session_token, conn, now)
+            if reason is not None:
+                self.reaped[reason] += 1
+                logger.info(f"Reaper: cerrando sesión {session_token} ({reason})")
+                await self.close_connection(session_token, reason)
+                continue
+            try:
+                await asyncio.wait_for(conn["websocket"].send_text(json.dumps({"type": "ping"})), 5)
+            except Exception:
+                # Conexión ya rota: se cierra ahora y, si no alcanza, se cancela en la pasada siguiente
+                self.reaped["heartbeat"] += 1
+                await self.close_connection(session_token, "heartbeat")
+
+    async def close_connection(self, session_token: str, reason: str) -> None:
+        """Avisa al cliente y cierra su socket; el handler hace el cierre normal de la sesión."""
+        conn = self._connections.get(session_token)
+        if conn is None or conn["closed"]:
+            return
+        conn["closed"] = reason
+        code, message = CLOSE_REASONS[reason]
+        try:
+            await asyncio.wait_for(conn["websocket"].send_text(json.dumps({
+                "type": "error", "message": message,
+            })), 5)
+            await asyncio.wait_for(conn["websocket"].close(code=code), 5)
+        except Exception:
+            pass
+
+    async def begin_drain(self) -> None:
+        """
+        Entra en drain: rechaza sesiones nuevas, cierra las que esperan
+        reanudación y las que están entre turnos. Las que están en medio de un
+        turno se cierran en `turn_done`, cuando ya se envió la respuesta.
+        """
+        self.draining = True
+        await self.expire_parked()
+        for session_token, state in list(self._active.items()):
+            if state["stage"] == "listening":
+                await self.close_connection(session_token, "draining")
+
+    async def close_all(self, reason: str) -> None:
+        """Cierra todas las conexiones vivas (vencido el plazo del drain)."""
+        for session_token in list(self._connections):
+            await self.close_connection(session_token, reason)
+
+    def reaper_stats(self) -> dict:
+        return {
+            "connections": len(self._connections),
+            "parked": len(self._parked),
+            "reaped": dict(self.reaped),
+        }
+
     def count(self) -> int:
         """Devuelve el número de sesiones activas (sin lock, solo lectura)."""
         return len(self._active)
@@ -60,5 +266,25 @@ class SessionManager:
         return settings.max_global_sessions
 
 
+# Motivo de cierre por el servidor → (código WebSocket, mensaje al cliente).
+# 4408 le indica al widget que no reconecte; 1012 (Service Restart) sí.
+CLOSE_REASONS = {
+    "idle": (4408, "Sesión cerrada por inactividad."),
+    "max_duration": (4408, "Se alcanzó la duración máxima de la sesión."),
+    "heartbeat": (4408, "Conexión perdida."),
+    "draining": (1012, "El servidor se está reiniciando."),
+}
+
+
 # Singleton global
 session_manager = SessionManager()
+
+
+async def reaper_loop() -> None:
+    """Heartbeat + limpieza de sesiones abandonadas cada `ws_ping_interval` segundos."""
+    while True:
+        await asyncio.sleep(settings.ws_ping_interval)
+        try:
+            await session_manager.reap_stale()
+        except Exception as e:
+            logger.error(f"Error en el reaper de sesiones: {e}")
@@ -1,15 +1,29 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str = ""
+    openai_base_url: str = ""  # vacío = API oficial; útil para proxies o backends de prueba
 
     # Service URLs
     stt_service_url: str = "http://stt-service:8001"
+    # Varias réplicas de STT separadas por coma (vacío = solo stt_service_url);
+    # cada pedido va a la menos cargada, con circuit breaker y detección de outliers
+    stt_service_urls: str = ""
+    stt_health_interval: int = 5             # segundos entre lecturas de la cola (/health)
+    stt_breaker_failures: int = 5            # fallas seguidas que abren el breaker
+    stt_breaker_cooldown: float = 10.0       # segundos abierto antes del pedido de prueba
+    stt_outlier_factor: float = 3.0          # latencia vs mediana de las demás para expulsar
+    stt_outlier_ejection: float = 30.0       # segundos fuera de una réplica lenta
     tts_service_url: str = "http://tts-service:8002"
+    # Varias réplicas de TTS separadas por coma (vacío = solo tts_service_url);
+    # cada voz se rutea por hashing consistente a la misma réplica
+    tts_service_urls: str = ""
+    tts_ring_vnodes: int = 100               # nodos virtuales por réplica en el anillo
+    tts_health_interval: int = 10            # segundos entre health checks de las réplicas
 
     # Database
     database_url: str = "sqlite:///./venzio.db"
@@ -34,6 +48,100 @@ class Settings(BaseSettings):
     llm_max_tokens: int = 500
     llm_temperature: float = 0.7
     llm_timeout: int = 30
+    llm_prompt_log_sample_rate: float = 0.0  # fracción de llamadas que loguean el prompt (DEBUG)
+    llm_hedge_enabled: bool = False          # segunda petición si la primera supera el p95
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_delay: float = 1.5         # segundos; también se usa sin historial de latencias
+    llm_fallback_model: str = ""             # vacío = sin fallback
+    llm_fallback_base_url: str = ""          # vacío = mismo endpoint de OpenAI
+    llm_fallback_api_key: str = ""
+    llm_fallback_after: float = 8.0          # segundos antes de sumar el modelo secundario
+    llm_keepalive_interval: int = 60         # 0 = sin pings de keepalive
+    llm_warmup_timeout: float = 5.0          # espera máxima del precalentamiento al arrancar; 0 = no precalentar
+
+    # FAQ cache (respuestas de primer turno por cliente)
+    faq_cache_enabled: bool = False
+    faq_cache_threshold: float = 0.85
+    faq_cache_ttl_seconds: int = 6 * 3600
+    faq_cache_max_entries: int = 200
+    faq_cache_dim: int = 1024
+
+    # Filtro de silencio previo al STT (WAV PCM16 del widget)
+    audio_gate_enabled: bool = True
+    audio_gate_frame_ms: int = 20
+    audio_gate_rms_threshold: float = 0.01   # mismo umbral que el VAD del widget
+    audio_gate_min_speech_ms: int = 200
+    audio_gate_min_speech_ratio: float = 0.05
+    audio_trim_enabled: bool = False         # recorta silencio inicial/final antes del STT
+    audio_trim_padding_ms: int = 200
+
+    # Audio pre-sintetizado (saludo por cliente y rellenos mientras piensa el LLM)
+    greeting_enabled: bool = False
+    greeting_template: str = "Hola, gracias por comunicarte con {name}. ¿En qué puedo ayudarte?"
+    filler_enabled: bool = False
+    filler_phrases: str = "Un momento, por favor.|Déjame revisarlo.|Claro, dame un segundo."
+    filler_delay: float = 1.2  # segundos de espera del LLM antes de enviar un relleno
+
+    # Captura de sesiones para replay (loadtest/replay.py)
+    capture_enabled: bool = False
+    capture_sample_rate: float = 1.0  # fracción de sesiones capturadas
+    capture_dir: str = "data/captures"
+
+    # Monitor de event loop (lag y detección de bloqueos)
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.1        # segundos entre mediciones de lag
+    loop_block_threshold_ms: int = 100        # bloqueo mayor a esto captura el stack
+    loop_monitor_max_stalls: int = 50         # bloqueos recientes guardados
+    loop_monitor_stack_depth: int = 30
+
+    # Profiler de muestreo (admin)
+    profiler_max_seconds: int = 60
+
+    # Tracing distribuido (W3C traceparent → stt-service / tts-service)
+    tracing_enabled: bool = False
+    trace_sample_rate: float = 0.1           # fracción de turnos trazados
+    trace_exporter: str = "file"             # "file" (JSONL OTLP) | "otlp" (colector HTTP)
+    trace_file: str = "logs/traces.jsonl"
+    otlp_endpoint: str = "http://otel-collector:4318/v1/traces"
+
+    # Logging estructurado (sinks en cola, muestreo y rate limit por categoría)
+    log_level: str = "INFO"
+    log_file_level: str = "DEBUG"
+    log_json: bool = True                    # logs/venzio.log en JSON con los campos bind()
+    log_sample_rates: str = "ws.turn=1.0"    # "categoría=fracción|…" (solo niveles < WARNING)
+    log_rate_limit: int = 50                 # eventos/segundo por categoría (0 = sin límite)
+
+    # Transcripciones por turno (session_turns) y compactación a largo plazo
+    transcript_compress_after_days: int = 7   # 0 = no compactar
+    transcript_compact_interval: int = 3600   # segundos entre pasadas
+
+    # Reanudación del widget: segundos que una sesión caída espera la reconexión
+    session_resume_grace: int = 60           # 0 = cerrar al desconectar
+
+    # Heartbeat y reaper de sesiones abandonadas (libera slots de concurrencia)
+    ws_ping_interval: int = 20               # segundos entre pings (cadencia del reaper)
+    ws_heartbeat_timeout: int = 60           # sin mensajes ni pong (clientes con heartbeat)
+    ws_idle_timeout: int = 300               # sin audio del usuario (0 = sin límite)
+    ws_max_duration: int = 3600              # duración máxima de una sesión (0 = sin límite)
+
+    # Framing binario del WebSocket del widget (subprotocolo venzio.v1)
+    ws_audio_chunk_bytes: int = 16384        # tamaño de los trozos de audio enviados
+
+    # Drain antes de apagar (SIGTERM o POST /api/admin/drain)
+    drain_timeout: int = 60                  # máximo que se espera a que terminen las sesiones (s)
+
+    # Feed en vivo del admin (/ws/admin/live)
+    admin_feed_interval: float = 0.25        # ventana de coalescencia del fan-out (s)
+    admin_feed_queue: int = 32               # lotes en cola por admin antes de descartar
+
+    # Retención: sesiones viejas → archivo frío comprimido en disco (stub en la DB)
+    archive_after_days: int = 180            # 0 = no archivar
+    archive_interval: int = 21600            # segundos entre pasadas
+    archive_dir: str = "data/archive"
+
+    # Búsqueda de texto completo (FTS5 en SQLite, tsvector + GIN en Postgres)
+    search_language: str = "spanish"         # configuración de text search de Postgres
+    search_snippet_tokens: int = 16          # tokens por fragmento resaltado
 
     # Admin seed
     admin_email: str = "admin@venzio.com"
@@ -53,6 +161,29 @@ class Settings(BaseSettings):
     def allowed_origins_list(self) -> List[str]:
         return [o.strip() for o in self.allowed_origins.split(",")]
 
+    @property
+    def stt_service_urls_list(self) -> List[str]:
+        urls = [u.strip().rstrip("/") for u in self.stt_service_urls.split(",") if u.strip()]
+        return urls or [self.stt_service_url]
+
+    @property
+    def tts_service_urls_list(self) -> List[str]:
+        urls = [u.strip().rstrip("/") for u in self.tts_service_urls.split(",") if u.strip()]
+        return urls or [self.tts_service_url]
+
+    @property
+    def filler_phrases_list(self) -> List[str]:
+        return [p.strip() for p in self.filler_phrases.split("|") if p.strip()]
+
+    @property
+    def log_sample_rates_map(self) -> Dict[str, float]:
+        rates = {}
+        for item in self.log_sample_rates.split("|"):
+            category, _, rate = item.partition("=")
+            if category.strip() and rate.strip():
+                rates[category.strip()] = float(rate)
+        return rates
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
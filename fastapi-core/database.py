@@ -7,11 +7,13 @@ from config import settings
 connect_args = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
-    engine = create_engine(
-        settings.database_url,
-        connect_args=connect_args,
-        poolclass=StaticPool,
-    )
+    if ":memory:" in settings.database_url:
+        # In-memory DB only exists on its connection: share a single one
+        engine = create_engine(settings.database_url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        # One connection per checkout: worker threads (turns, rollups, index)
+        # get their own transactions instead of sharing the event loop's
+        engine = create_engine(settings.database_url, connect_args=connect_args)
 else:
     engine = create_engine(settings.database_url)
 
@@ -33,5 +35,5 @@ def get_db():
 
 def init_db():
     """Create all tables if they don't exist."""
-    from models import User, Plan, Voice, VoiceSession, UsageLog, WidgetSite  # noqa: F401
+    from models import User, Plan, Voice, VoiceSession, SessionTurn, SessionTranscript, SessionArchive, DailyStats, UsageLog, WidgetSite  # noqa: F401
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,92 @@
+import asyncio
+import signal
+import time
+
+from loguru import logger
+from config import settings
+from concurrency import session_manager
+
+
+class DrainController:
+    """
+    Apagado sin cortar conversaciones (deploys sin downtime).
+
+    Se dispara con SIGTERM (lo que manda `docker stop`) o con
+    POST /api/admin/drain. Durante el drain /health responde 503 para que el
+    proxy deje de mandar tráfico, SessionManager no admite sesiones nuevas y
+    las vivas se cierran al terminar su turno en curso; cada handler guarda
+    su sesión (duración, resumen, rollup, índice) al cerrarse. Cuando no
+    queda ninguna, o vence `drain_timeout`, se le pasa la señal a uvicorn
+    para que termine. Una segunda SIGTERM sale de inmediato.
+    """
+
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        self.started_at: float | None = None
+        self._previous_handler = None
+
+    @property
+    def draining(self) -> bool:
+        return self.task is not None
+
+    def install(self) -> None:
+        """Toma SIGTERM (se llama en el lifespan, después de que uvicorn instaló el suyo)."""
+        loop = asyncio.get_running_loop()
+
+        def on_sigterm(signum, frame):
+            if self.task is None:
+                loop.call_soon_threadsafe(self.start)
+            else:
+                logger.warning("Segunda SIGTERM: saliendo sin esperar el drain")
+                self._exit()
+
+        try:
+            self._previous_handler = signal.signal(signal.SIGTERM, on_sigterm)
+        except ValueError:
+            # Fuera del hilo principal (tests, algunos runners): solo queda el endpoint
+            logger.debug("Drain por señal no disponible fuera del hilo principal")
+
+    def start(self) -> bool:
+        """Inicia el drain. False si ya estaba en curso."""
+        if self.task is not None:
+            return False
+        self.started_at = time.monotonic()
+        self.task = asyncio.create_task(self._run())
+        return True
+
+    async def _run(self) -> None:
+        logger.warning(
+            f"🚰 Drain iniciado | sesiones activas={session_manager.count()} | "
+            f"plazo={settings.drain_timeout}s"
+        )
+        await session_manager.begin_drain()
+        deadline = self.started_at + settings.drain_timeout
+        while session_manager.count() and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        if session_manager.count():
+            logger.warning(f"Plazo de drain vencido: cerrando {session_manager.count()} sesiones")
+            await session_manager.close_all("draining")
+            # Margen para que los handlers guarden sus sesiones antes de salir
+            end = time.monotonic() + 5
+            while session_manager.count() and time.monotonic() < end:
+                await asyncio.sleep(0.2)
+        logger.warning(f"Drain completo en {time.monotonic() - self.started_at:.1f}s: saliendo")
+        self._exit()
+
+    def _exit(self) -> None:
+        # Devolver SIGTERM a quien la manejaba antes (uvicorn: apagado normal con lifespan)
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGTERM, self._previous_handler)
+        signal.raise_signal(signal.SIGTERM)
+
+    def status(self) -> dict:
+        return {
+            "draining": self.draining,
+            "elapsed_s": round(time.monotonic() - self.started_at, 1) if self.started_at else None,
+            "active_sessions": session_manager.count(),
+            "deadline_s": settings.drain_timeout,
+        }
+
+
+# Singleton global
+drain = DrainController()
@@ -0,0 +1,174 @@
+import json
+import struct
+from typing import NamedTuple
+
+from fastapi import WebSocket
+
+from config import settings
+
+# Framing binario versionado del WebSocket de voz (opcional).
+#
+# Se negocia al conectar con el subprotocolo WebSocket `venzio.v1`: un cliente
+# que no lo pide sigue con el protocolo de siempre (JSON en texto + audio
+# binario sin etiquetar). Con framing, cada mensaje binario es
+#
+#   [versión u8][tipo u8][turno u32][seq u32][payload]   (big-endian, 10 bytes)
+#
+# `turno` es 1 + el índice del turno en la conversación (0 = fuera de un turno:
+# session_ready, saludo) y `seq` crece en cada frame de la conexión, por
+# sentido. El audio va en trozos AUDIO cerrados por un AUDIO_END, en los dos
+# sentidos. Los mensajes de texto siguen siendo JSON (ping, pong, end_session,
+# avisos de cierre), así el reaper y el drain no necesitan saber del framing.
+FRAMING_VERSION = 1
+SUBPROTOCOLS = {f"venzio.v{FRAMING_VERSION}": FRAMING_VERSION}
+
+HEADER = struct.Struct(">BBII")
+
+AUDIO = 0x01         # trozo de audio
+AUDIO_END = 0x02     # fin del clip de audio del turno (payload vacío)
+TRANSCRIPT = 0x10    # final_transcript (texto UTF-8)
+REPLY_TEXT = 0x11    # reply_text (texto UTF-8)
+ERROR = 0x12         # error (mensaje UTF-8)
+EVENT = 0x20         # cualquier otro evento (JSON UTF-8)
+
+# Eventos con tipo propio: el payload es el texto, sin JSON
+_TEXT_EVENTS = {
+    "final_transcript": (TRANSCRIPT, "text"),
+    "reply_text": (REPLY_TEXT, "text"),
+    "error": (ERROR, "message"),
+}
+
+# Igual que el límite de un mensaje de uvicorn (--ws-max-size): el audio de un
+# turno en trozos no puede superar lo que ya se aceptaba en un solo mensaje
+MAX_AUDIO_BYTES = 16 * 1024 * 1024
+
+
+class FrameError(ValueError):
+    """Frame binario inválido (versión, tipo, secuencia o tamaño)."""
+
+
+class Frame(NamedTuple):
+    type: int
+    turn: int
+    seq: int
+    payload: bytes
+
+
+def encode(frame_type: int, turn: int, seq: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(FRAMING_VERSION, frame_type, turn, seq) + payload
+
+
+def decode(data: bytes) -> Frame:
+    if len(data) < HEADER.size:
+        raise FrameError(f"Frame corto ({len(data)} bytes)")
+    version, frame_type, turn, seq = HEADER.unpack_from(data)
+    if version != FRAMING_VERSION:
+        raise FrameError(f"Versión de framing no soportada: {version}")
+    return Frame(frame_type, turn, seq, data[HEADER.size:])
+
+
+class VoiceChannel:
+    """
+    Envío y recepción del WebSocket de voz con o sin framing, según lo
+    negociado. El handler habla en eventos (dicts) y clips de audio; el canal
+    decide cómo van por el cable.
+    """
+
+    def __init__(self, websocket: WebSocket, version: int | None = None):
+        self.websocket = websocket
+        self.version = version
+        self._send_seq = 0
+        self._recv_seq: int | None = None
+        # Audio entrante en trozos: (turno del cliente, partes, bytes acumulados)
+        self._upload: tuple[int, list[bytes], int] | None = None
+        # El último mensaje traía audio (frame AUDIO, o binario sin framing):
+        # lo que el reaper cuenta como actividad, a diferencia de EVENT o AUDIO_END
+        self.audio_received = False
+
+    @property
+    def framed(self) -> bool:
+        return self.version is not None
+
+    @classmethod
+    async def accept(cls, websocket: WebSocket) -> "VoiceChannel":
+        """Acepta la conexión eligiendo el framing si el cliente lo ofrece."""
+        for protocol in websocket.scope.get("subprotocols", []):
+            if protocol in SUBPROTOCOLS:
+                await websocket.accept(subprotocol=protocol)
+                return cls(websocket, SUBPROTOCOLS[protocol])
+        await websocket.accept()
+        return cls(websocket)
+
+    def _frame(self, frame_type: int, turn: int, payload: bytes = b"") -> bytes:
+        data = encode(frame_type, turn, self._send_seq, payload)
+        self._send_seq = (self._send_seq + 1) & 0xFFFFFFFF
+        return data
+
+    async def send_event(self, event: dict, turn: int = 0) -> None:
+        if not self.framed:
+            await self.websocket.send_text(json.dumps(event))
+            return
+        if event["type"] in _TEXT_EVENTS:
+            frame_type, key = _TEXT_EVENTS[event["type"]]
+            await self.websocket.send_bytes(self._frame(frame_type, turn, event[key].encode("utf-8")))
+        else:
+            await self.websocket.send_bytes(self._frame(EVENT, turn, json.dumps(event).encode("utf-8")))
+
+    async def send_audio(self, audio: bytes, turn: int = 0) -> None:
+        """Un clip de audio: en trozos de `ws_audio_chunk_bytes` + AUDIO_END con framing."""
+        if not self.framed:
+            await self.websocket.send_bytes(audio)
+            return
+        size = max(settings.ws_audio_chunk_bytes, 1024)
+        for start in range(0, len(audio), size):
+            await self.websocket.send_bytes(self._frame(AUDIO, turn, audio[start:start + size]))
+        await self.websocket.send_bytes(self._frame(AUDIO_END, turn))
+
+    def incoming(self, message: dict) -> tuple[str, object] | None:
+        """
+        Interpreta un mensaje del cliente. Returns: ("command", dict),
+        ("audio", bytes) con el audio completo de un turno, o None si no hay
+        nada que hacer todavía (un trozo intermedio). Raises: ValueError
+        (FrameError o JSON inválido).
+        """
+        self.audio_received = False
+        if message.get("text") is not None:
+            return "command", json.loads(message["text"])
+        data = message.get("bytes")
+        if not data:
+            return None
+        if not self.framed:
+            self.audio_received = True
+            return "audio", data
+
+        frame = decode(data)
+        expected = self._recv_seq
+        self._recv_seq = (frame.seq + 1) & 0xFFFFFFFF
+        if expected is not None and frame.seq != expected:
+            # Se perdió o desordenó algo: un clip a medias ya no sirve
+            self._upload = None
+            raise FrameError(f"Secuencia {frame.seq}, se esperaba {expected}")
+
+        if frame.type == EVENT:
+            return "command", json.loads(frame.payload)
+        if frame.type == AUDIO:
+            if self._upload is None or self._upload[0] != frame.turn:
+                self._upload = (frame.turn, [], 0)
+            turn, parts, size = self._upload
+            size += len(frame.payload)
+            if size > MAX_AUDIO_BYTES:
+                self._upload = None
+                raise FrameError(f"Audio del turno supera {MAX_AUDIO_BYTES} bytes")
+            parts.append(frame.payload)
+            self._upload = (turn, parts, size)
+            self.audio_received = True
+            return None
+        if frame.type == AUDIO_END:
+            upload, self._upload = self._upload, None
+            if upload is None or upload[0] != frame.turn:
+                raise FrameError(f"AUDIO_END sin audio del turno {frame.turn}")
+            return "audio", b"".join(upload[1])
+        raise FrameError(f"Tipo de frame desconocido: {frame.type:#04x}")
+
+    async def close(self, code: int = 1000) -> None:
+        await self.websocket.close(code=code)
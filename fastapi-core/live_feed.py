@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+
+from loguru import logger
+from config import settings
+
+
+class LiveFeed:
+    """
+    Fan-out de eventos de sesión hacia los admins conectados por WebSocket.
+
+    `publish()` solo guarda el último evento de cada sesión (sin await ni
+    serialización) y despierta al broadcaster. El broadcaster junta todo lo
+    pendiente cada `admin_feed_interval` segundos, lo serializa UNA vez y
+    encola el mismo texto para cada suscriptor: el costo por evento no crece
+    con la cantidad de admins mirando. Un admin lento pierde los lotes más
+    viejos de su cola en vez de frenar a los demás.
+    """
+
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+        self._pending: dict[str, dict] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.batches = 0
+        self.dropped = 0
+
+    def publish(self, event: str, state: dict) -> None:
+        if not self._subscribers:
+            return
+        # Varios cambios de la misma sesión dentro de un intervalo se colapsan en el último
+        self._pending[state["session_token"]] = {"event": event, "at": time.time(), **state}
+        self._wake.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.admin_feed_queue)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._broadcast())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self._pending.clear()
+            self._wake.set()  # que el broadcaster vea que no queda nadie y termine
+
+    async def _broadcast(self) -> None:
+        try:
+            while self._subscribers:
+                await self._wake.wait()
+                # Ventana de coalescencia: lo que llegue mientras tanto va en el mismo lote
+                await asyncio.sleep(settings.admin_feed_interval)
+                self._wake.clear()
+                events, self._pending = list(self._pending.values()), {}
+                if not events:
+                    continue
+                payload = json.dumps({"type": "events", "events": events}, default=str)
+                self.batches += 1
+                for queue in list(self._subscribers):
+                    if queue.full():
+                        queue.get_nowait()
+                        self.dropped += 1
+                    queue.put_nowait(payload)
+        except Exception as e:
+            logger.error(f"Error en el feed en vivo del admin: {e}")
+        finally:
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+# Singleton global
+live_feed = LiveFeed()
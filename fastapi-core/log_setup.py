@@ -0,0 +1,97 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from loguru import logger
+from config import settings
+
+
+class LogGate:
+    """
+    Filtro compartido por los sinks de loguru: muestreo y rate limit por categoría.
+
+    Los eventos llevan su categoría con `logger.bind(category="ws.turn")`. Por
+    debajo de WARNING se muestrean según `log_sample_rates`; todos los niveles
+    respetan `log_rate_limit` eventos/segundo por categoría, para que una
+    tormenta de errores tampoco sature los sinks. Los eventos sin categoría
+    pasan siempre.
+    """
+
+    def __init__(self):
+        self.sample_rates = settings.log_sample_rates_map
+        self.rate_limit = settings.log_rate_limit
+        self._windows: dict[str, list] = {}
+        self._lock = threading.Lock()
+        # La decisión se toma una vez por evento y se reutiliza en cada sink
+        self._last = threading.local()
+        self.sampled_out: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+
+    def __call__(self, record: dict) -> bool:
+        if getattr(self._last, "record", None) is record:
+            return self._last.keep
+        keep = self._decide(record)
+        self._last.record, self._last.keep = record, keep
+        return keep
+
+    def _decide(self, record: dict) -> bool:
+        category = record["extra"].get("category")
+        if category is None:
+            return True
+        if record["level"].no < 30:  # < WARNING
+            rate = self.sample_rates.get(category, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out[category] += 1
+                return False
+        if self.rate_limit <= 0:
+            return True
+        now = int(time.monotonic())
+        with self._lock:
+            window = self._windows.setdefault(category, [now, 0])
+            if window[0] != now:
+                window[0], window[1] = now, 0
+            window[1] += 1
+            if window[1] > self.rate_limit:
+                self.rate_limited[category] += 1
+                return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "sample_rates": self.sample_rates,
+            "rate_limit_per_s": self.rate_limit,
+            "sampled_out": dict(self.sampled_out),
+            "rate_limited": dict(self.rate_limited),
+        }
+
+
+# Singleton global
+log_gate = LogGate()
+
+
+def configure_logging() -> None:
+    """
+    Sinks en cola (`enqueue=True`): el hilo que loguea solo encola el evento y
+    un hilo de loguru escribe en stdout y en el archivo, así una escritura
+    lenta nunca bloquea el event loop. El archivo va en JSON con los campos
+    de `bind()` (categoría, sesión, timings) si `log_json` está activo.
+    """
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | {message}",
+        level=settings.log_level,
+        filter=log_gate,
+        enqueue=True,
+    )
+    logger.add(
+        "logs/venzio.log",
+        rotation="10 MB",
+        retention="7 days",
+        level=settings.log_file_level,
+        filter=log_gate,
+        serialize=settings.log_json,
+        enqueue=True,
+    )
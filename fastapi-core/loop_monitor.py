@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+
+from loguru import logger
+from config import settings
+
+
+class LoopMonitor:
+    """
+    Mide continuamente el retraso (lag) del event loop y detecta bloqueos.
+
+    - Una tarea async duerme `loop_monitor_interval` y registra cuánto tarda
+      de más en despertar: eso es el lag que sufre cada sesión de voz.
+    - Un hilo watchdog revisa el último latido de esa tarea; si el loop lleva
+      más de `loop_block_threshold_ms` sin latir, captura el stack del hilo del
+      loop en ese momento, es decir, el callback que lo está reteniendo.
+    """
+
+    def __init__(self):
+        self._lags: deque[float] = deque(maxlen=600)
+        self.stalls: deque[dict] = deque(maxlen=settings.loop_monitor_max_stalls)
+        self.max_lag_ms = 0.0
+        self.blocked_count = 0
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # ── Ciclo de vida ─────────────────────────────────────────────────────────
+    def start(self) -> None:
+        if not settings.loop_monitor_enabled or self._task:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Monitor de event loop activo | umbral de bloqueo: {settings.loop_block_threshold_ms}ms"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # ── Medición de lag (en el loop) ──────────────────────────────────────────
+    async def _measure(self) -> None:
+        interval = settings.loop_monitor_interval
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag_ms = max((now - start - interval) * 1000, 0.0)
+            self._lags.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self._beat = now
+
+    # ── Watchdog (hilo aparte) ────────────────────────────────────────────────
+    def _watch(self) -> None:
+        threshold = settings.loop_block_threshold_ms / 1000
+        expected = settings.loop_monitor_interval
+        current: dict | None = None
+        while not self._stop.wait(threshold / 2):
+            silent = time.monotonic() - self._beat - expected
+            if silent > threshold:
+                if current is None:
+                    current = self._capture(silent)
+                else:
+                    current["duration_ms"] = round(silent * 1000, 1)
+            elif current is not None:
+                logger.warning(
+                    f"Event loop bloqueado {current['duration_ms']}ms en: {current['location']}"
+                )
+                current = None
+
+    def _capture(self, silent: float) -> dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=settings.loop_monitor_stack_depth) if frame else []
+        location = stack[-1].strip().splitlines()[0] if stack else "desconocido"
+        stall = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(silent * 1000, 1),
+            "location": location,
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.blocked_count += 1
+        self.stalls.append(stall)
+        return stall
+
+    # ── Lectura ───────────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        lags = sorted(self._lags)
+        n = len(lags)
+        return {
+            "enabled": self._task is not None,
+            "lag_ms_last": round(self._lags[-1], 2) if n else None,
+            "lag_ms_p50": round(lags[n // 2], 2) if n else None,
+            "lag_ms_p99": round(lags[min(int(0.99 * n), n - 1)], 2) if n else None,
+            "lag_ms_max": round(self.max_lag_ms, 2),
+            "blocked_count": self.blocked_count,
+        }
+
+
+# Singleton global
+loop_monitor = LoopMonitor()
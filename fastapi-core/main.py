@@ -1,24 +1,36 @@
 import sys
 import os
+import asyncio
 from contextlib import asynccontextmanager
 from loguru import logger
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 
 # Add project root to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
 from config import settings
 from database import init_db, SessionLocal
-from models import User, Plan, Voice, WidgetSite
+from models import DailyStats, User, Plan, Voice, VoiceSession, WidgetSite
 from auth import hash_password
+from concurrency import reaper_loop, session_manager
+from drain import drain
+from log_setup import configure_logging
+from loop_monitor import loop_monitor
+from tracing import tracer
+from services import llm, stt_client, tts_client
+from services.canned_audio import canned_audio
+from services import rollups, search
+from services.transcripts import compaction_loop
+from services.archive import archive_loop
 
 # ── Routers ───────────────────────────────────────────────────────────────────
 from routers.auth import router as auth_router
 from routers.sessions import router as sessions_router
 from routers.admin import router as admin_router
+from routers.admin_live import router as admin_live_router
 from routers.plans import router as plans_router
 from routers.voices import router as voices_router
 from routers.webhook import router as webhook_router
@@ -30,18 +42,7 @@ from routers.widget_auth import router as widget_auth_router
 
 
 # ── Logging ───────────────────────────────────────────────────────────────────
-logger.remove()
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | {message}",
-    level="INFO",
-)
-logger.add(
-    "logs/venzio.log",
-    rotation="10 MB",
-    retention="7 days",
-    level="DEBUG",
-)
+configure_logging()
 
 
 # ── DB Seed ───────────────────────────────────────────────────────────────────
@@ -157,10 +158,76 @@ async def lifespan(app: FastAPI):
     os.makedirs("logs", exist_ok=True)
     os.makedirs("data", exist_ok=True)
     init_db()
+    search.ensure_index()
     seed_database()
     logger.info(f"✅ DB lista | Max sesiones: {settings.max_global_sessions}")
+    loop_monitor.start()
+    tracer.configure(
+        "venzio-core", settings.tracing_enabled, settings.trace_sample_rate,
+        exporter=settings.trace_exporter, path=settings.trace_file, endpoint=settings.otlp_endpoint,
+    )
+    if settings.llm_warmup_timeout > 0:
+        try:
+            await asyncio.wait_for(llm.warmup(), settings.llm_warmup_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Precalentamiento LLM sin respuesta tras {settings.llm_warmup_timeout}s, se sigue sin él")
+    needs_backfill = False
+    reindex_task = None
+    db = SessionLocal()
+    try:
+        for voice in db.query(Voice).filter(Voice.is_active == True).all():
+            canned_audio.schedule(canned_audio.prepare_fillers(voice.model_file))
+        # Primera vez con rollup diario: recalcularlo desde las sesiones existentes
+        if db.query(VoiceSession.id).first() and not db.query(DailyStats.id).first():
+            needs_backfill = True
+        # Ídem con el índice de búsqueda
+        if db.query(VoiceSession.id).first() and search.is_empty(db):
+            reindex_task = asyncio.create_task(asyncio.to_thread(search.reindex))
+    finally:
+        db.close()
+    if needs_backfill:
+        # Antes de aceptar tráfico: ninguna sesión se cierra durante la carga inicial
+        try:
+            await asyncio.to_thread(rollups.backfill)
+        except Exception:
+            pass  # ya logueado; se puede relanzar con POST /api/admin/analytics/backfill
+    keepalive_task = None
+    if settings.llm_keepalive_interval > 0:
+        keepalive_task = asyncio.create_task(llm.keepalive_loop())
+    compaction_task = None
+    if settings.transcript_compress_after_days > 0:
+        compaction_task = asyncio.create_task(compaction_loop())
+    archive_task = None
+    if settings.archive_after_days > 0:
+        archive_task = asyncio.create_task(archive_loop())
+    reaper_task = None
+    if settings.ws_ping_interval > 0:
+        reaper_task = asyncio.create_task(reaper_loop())
+    stt_health_task = None
+    if len(settings.stt_service_urls_list) > 1:
+        stt_health_task = asyncio.create_task(stt_client.health_loop())
+    # Aun con una sola réplica: es lo que la vuelve a marcar sana tras una caída
+    tts_health_task = asyncio.create_task(tts_client.health_loop())
+    # SIGTERM primero drena las sesiones en curso y después apaga
+    drain.install()
     yield
     logger.info("🛑 Apagando servidor...")
+    # Sesiones del widget esperando reconexión: cerrarlas y guardarlas ahora
+    await session_manager.expire_parked()
+    if keepalive_task:
+        keepalive_task.cancel()
+    if compaction_task:
+        compaction_task.cancel()
+    if archive_task:
+        archive_task.cancel()
+    if reaper_task:
+        reaper_task.cancel()
+    if stt_health_task:
+        stt_health_task.cancel()
+    tts_health_task.cancel()
+    loop_monitor.stop()
+    tracer.shutdown()
+    await logger.complete()
 
 
 # ── FastAPI App ───────────────────────────────────────────────────────────────
@@ -181,6 +248,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Routers
@@ -194,6 +262,7 @@ app.include_router(users_router, prefix="/api/users")
 app.include_router(contact_router, prefix="/api")
 app.include_router(public_rest_router, prefix="/api/public")
 app.include_router(public_ws_router)
+app.include_router(admin_live_router)  # /ws/admin/live
 app.include_router(widget_auth_router)  # /widget/auth — sin prefijo /api
 
 
@@ -204,6 +273,13 @@ def admin_redirect():
 
 @app.get("/health", tags=["Sistema"])
 def health_check():
+    # En drain el balanceador tiene que dejar de mandar tráfico a este worker
+    if session_manager.draining:
+        return JSONResponse(status_code=503, content={
+            "status": "draining",
+            "service": "venzio-core",
+            "active_sessions": session_manager.count(),
+        })
     return {
         "status": "ok",
         "service": "venzio-core",
@@ -1,10 +1,12 @@
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import (
-    Boolean, DateTime, Float, ForeignKey,
-    Integer, String, Text, func
+    BigInteger, Boolean, DateTime, Float, ForeignKey,
+    Integer, LargeBinary, String, Text, UniqueConstraint, func
 )
+import json
 import secrets
+import zlib
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
 
@@ -73,13 +75,110 @@ class VoiceSession(Base):
     voice_id: Mapped[Optional[int]] = mapped_column(ForeignKey("voices.id"), nullable=True)
     started_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    transcript: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Blob histórico (sesiones previas a session_turns); las nuevas no lo escriben
+    legacy_transcript: Mapped[Optional[str]] = mapped_column("transcript", Text, nullable=True)
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="active")  # active|ended|error
     duration_seconds: Mapped[int] = mapped_column(Integer, default=0)
 
     user: Mapped[Optional["User"]] = relationship("User", back_populates="sessions")
     voice: Mapped[Optional["Voice"]] = relationship("Voice", back_populates="sessions")
+    turns: Mapped[list["SessionTurn"]] = relationship(
+        "SessionTurn", back_populates="session", order_by="SessionTurn.turn_index",
+        cascade="all, delete-orphan",
+    )
+    compressed: Mapped[Optional["SessionTranscript"]] = relationship(
+        "SessionTranscript", uselist=False, cascade="all, delete-orphan",
+    )
+    archive: Mapped[Optional["SessionArchive"]] = relationship(
+        "SessionArchive", uselist=False, cascade="all, delete-orphan",
+    )
+
+    @property
+    def transcript(self) -> Optional[str]:
+        """
+        Vista de compatibilidad "Usuario: …\nAgente: …", armada a pedido (las
+        relaciones se cargan recién al leerla). Fuentes, en orden: archivo frío,
+        blob histórico, transcripción comprimida y turnos.
+        """
+        if self.archive is not None:
+            lines = self.archive.record()["transcript"]
+            return "\n".join(lines) if lines else None
+        if self.legacy_transcript is not None:
+            return self.legacy_transcript
+        if self.compressed is not None:
+            lines = self.compressed.lines()
+        else:
+            lines = [line for turn in self.turns for line in turn.lines()]
+        return "\n".join(lines) if lines else None
+
+
+class SessionTurn(Base):
+    """Un turno de una sesión de voz, escrito al terminar el turno (no al cerrar la sesión)."""
+    __tablename__ = "session_turns"
+    __table_args__ = (UniqueConstraint("session_id", "turn_index"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    session_id: Mapped[int] = mapped_column(ForeignKey("voice_sessions.id"), index=True, nullable=False)
+    turn_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    outcome: Mapped[str] = mapped_column(String(20), default="ok")  # ok|no_speech|faq_cache|tts_error|error
+    # Textos en claro mientras la sesión es reciente; al compactar pasan a SessionTranscript
+    user_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    reply_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    stt_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    llm_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    tts_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    total_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    completion_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    session: Mapped["VoiceSession"] = relationship("VoiceSession", back_populates="turns")
+
+    def lines(self) -> list[str]:
+        lines = []
+        if self.user_text:
+            lines.append(f"Usuario: {self.user_text}")
+        if self.reply_text:
+            lines.append(f"Agente: {self.reply_text}")
+        return lines
+
+
+class SessionTranscript(Base):
+    """Transcripción comprimida (zlib sobre JSON) de una sesión ya compactada."""
+    __tablename__ = "session_transcripts"
+
+    session_id: Mapped[int] = mapped_column(ForeignKey("voice_sessions.id"), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    raw_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    compressed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    @staticmethod
+    def pack(lines: list[str]) -> tuple[bytes, int]:
+        raw = json.dumps(lines, ensure_ascii=False).encode("utf-8")
+        return zlib.compress(raw, 9), len(raw)
+
+    def lines(self) -> list[str]:
+        return json.loads(zlib.decompress(self.data))
+
+
+class SessionArchive(Base):
+    """
+    Ubicación de una sesión en el archivo frío (data/archive). La fila de
+    voice_sessions queda como stub: sin textos, turnos ni transcripción.
+    """
+    __tablename__ = "session_archives"
+
+    session_id: Mapped[int] = mapped_column(ForeignKey("voice_sessions.id"), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(Integer, index=True, default=0)  # 0 = sesiones anónimas
+    segment: Mapped[str] = mapped_column(String(64), nullable=False)
+    offset: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    length: Mapped[int] = mapped_column(Integer, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    def record(self) -> dict:
+        from services.archive import archive_store
+        return archive_store.read(self.segment, self.offset, self.length)
 
 
 class UsageLog(Base):
@@ -94,6 +193,27 @@ class UsageLog(Base):
     user: Mapped["User"] = relationship("User", back_populates="usage_logs")
 
 
+class DailyStats(Base):
+    """
+    Rollup por cliente y día (UTC) de las sesiones terminadas. Se suma al cerrar
+    cada sesión y se puede recalcular con un backfill; los dashboards leen de acá
+    en vez de recorrer voice_sessions. tenant_id 0 = sesiones anónimas.
+    """
+    __tablename__ = "daily_stats"
+    __table_args__ = (UniqueConstraint("day", "tenant_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    day: Mapped[str] = mapped_column(String(10), nullable=False, index=True)  # YYYY-MM-DD
+    tenant_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True, default=0)
+    sessions: Mapped[int] = mapped_column(Integer, default=0)
+    seconds: Mapped[int] = mapped_column(Integer, default=0)
+    turns: Mapped[int] = mapped_column(Integer, default=0)
+    errors: Mapped[int] = mapped_column(Integer, default=0)
+    # Latencia total de los turnos respondidos: suma y cantidad, para promediar al leer
+    latency_ms_sum: Mapped[int] = mapped_column(Integer, default=0)
+    latency_samples: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class Payment(Base):
     """Historial de pagos para gestión de suscripciones."""
     __tablename__ = "payments"
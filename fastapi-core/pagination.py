@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable
+
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Query, Session
+
+from database import SessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+EXPORT_BATCH = 500
+
+
+def resolve_sort(sorts: dict, sort: str, order: str):
+    """Valida `sort`/`order` contra las columnas permitidas del listado."""
+    if sort not in sorts:
+        raise HTTPException(status_code=400, detail=f"Orden inválido; opciones: {', '.join(sorts)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order debe ser asc o desc")
+    return sorts[sort], order == "desc"
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, column=None) -> tuple:
+    """(valor de orden, id) de un cursor; `column` tipa el valor si es DateTime."""
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if value is not None and column is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        return value, int(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _comparable(query: Query, column, value=None):
+    """
+    En SQLite los DateTime con server_default se guardan como 'YYYY-MM-DD HH:MM:SS'
+    y SQLAlchemy compara contra '… .ffffff', así que valores iguales no empatan.
+    Allí se ordena y compara sobre un texto normalizado; el resto usa la columna.
+    """
+    if query.session.bind.dialect.name == "sqlite" and column.type.python_type is datetime:
+        expression = func.strftime("%Y-%m-%d %H:%M:%f", column)
+        return expression, value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] if value is not None else None
+    return column, value
+
+
+def keyset_page(
+    query: Query,
+    response: Response,
+    sort_column,
+    id_column,
+    descending: bool,
+    cursor: str | None,
+    limit: int,
+    key: Callable[[object], tuple],
+) -> list:
+    """
+    Una página por keyset: filtra por (columna de orden, id) del último registro
+    de la página anterior en vez de usar OFFSET, así el costo no crece con la
+    profundidad. El cursor de la página siguiente va en el header X-Next-Cursor
+    (ausente en la última página). `key(row)` devuelve (valor de orden, id).
+    En columnas que admiten NULL los nulos van al final en orden ascendente y
+    al principio en descendente (igual en SQLite y Postgres): comparar contra
+    un NULL no da verdadero, así que un cursor en un nulo cortaría el listado.
+    """
+    sort_expression, _ = _comparable(query, sort_column)
+    nullable = bool(getattr(sort_column.expression, "nullable", False))
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_column)
+        sort_expression, value = _comparable(query, sort_column, value)
+        if value is None:
+            # El cursor quedó entre los nulos: solo desempata el id
+            tail = and_(sort_column.is_(None), (id_column < last_id) if descending else (id_column > last_id))
+            after = or_(sort_column.isnot(None), tail) if descending else tail
+        elif descending:
+            after = or_(sort_expression < value, and_(sort_expression == value, id_column < last_id))
+        else:
+            after = or_(sort_expression > value, and_(sort_expression == value, id_column > last_id))
+            if nullable:
+                after = or_(after, sort_column.is_(None))
+        query = query.filter(after)
+    order = []
+    if nullable:
+        order.append(case((sort_column.is_(None), 1), else_=0))
+    order.append(sort_expression)
+    order.append(id_column)
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in order))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(list(key(rows[-1])))
+    return rows
+
+
+def ndjson_export(build_query: Callable[[Session], Query], serialize: Callable[[object], dict],
+                  filename: str) -> StreamingResponse:
+    """
+    Exportación completa en NDJSON (un objeto JSON por línea). Las filas se leen
+    con un cursor del lado del servidor en lotes de EXPORT_BATCH y se escriben a
+    medida que llegan, sin cargar la tabla en memoria. Usa su propia sesión de
+    DB porque el stream sigue después de que termina el endpoint.
+    """
+    def lines():
+        db = SessionLocal()
+        try:
+            for row in build_query(db).yield_per(EXPORT_BATCH):
+                yield json.dumps(serialize(row), default=str, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,64 @@
+# Archivo compartido: la fuente es fastapi-core/profiler.py. stt-service/ y
+# tts-service/ tienen copias idénticas porque cada servicio se construye con su
+# propio contexto de Docker; editar la de fastapi-core y volver a copiarla.
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfilerBusy(RuntimeError):
+    """Ya hay un perfil en curso en este proceso."""
+
+
+class SamplingProfiler:
+    """
+    Profiler de muestreo de bajo costo para el proceso en ejecución.
+    Un hilo toma los stacks de todos los hilos `hz` veces por segundo y
+    devuelve el resultado en formato "collapsed stacks" (flamegraph.pl,
+    speedscope, inferno): una línea por stack, `hilo;f1;f2;f3 cantidad`.
+    Solo puede haber un perfil corriendo a la vez.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self, seconds: float, hz: int = 100) -> str:
+        """Muestrea durante `seconds` segundos (bloqueante: llamar desde un hilo)."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Ya hay un perfil en curso")
+        try:
+            own_id = threading.get_ident()
+            interval = 1.0 / hz
+            samples: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                    samples[";".join(reversed(stack))] += 1
+                time.sleep(interval)
+            return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+        finally:
+            self._lock.release()
+
+
+# Singleton global
+profiler = SamplingProfiler()
@@ -1,15 +1,29 @@
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import RedirectResponse
+import httpx
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import or_
 
 from datetime import datetime, timedelta
 from auth import get_current_admin
+from config import settings
 from concurrency import session_manager
+from live_feed import live_feed
+from log_setup import log_gate
+from loop_monitor import loop_monitor
+from profiler import ProfilerBusy, profiler
 from database import get_db
-from models import Payment, Plan, User, Voice, VoiceSession, UsageLog, WidgetSite
+from drain import drain
+from pagination import keyset_page, ndjson_export, resolve_sort
+from models import Payment, Plan, User, Voice, VoiceSession, WidgetSite
+from services import llm, stt_client, tts_client
+from services.audio_gate import audio_gate
+from services.canned_audio import canned_audio, greeting_text
+from services.faq_cache import faq_cache
+from services import archive, rollups, search
 
 logger = logging.getLogger(__name__)
 
@@ -150,6 +164,12 @@ class PaymentOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+def _refresh_greetings(background_tasks: BackgroundTasks, db: Session, user: User) -> None:
+    """Agenda la re-síntesis del saludo del cliente para todas las voces activas."""
+    voice_files = [v.model_file for v in db.query(Voice).filter(Voice.is_active == True).all()]
+    background_tasks.add_task(canned_audio.prepare_greetings, user.id, greeting_text(user), voice_files)
+
+
 # ── Root ──────────────────────────────────────────────────────────────────────
 @router.get("/")
 def admin_root():
@@ -179,15 +199,8 @@ def get_me(current_admin=Depends(get_current_admin), db: Session = Depends(get_d
             db.rollback()
             site = None
 
-    # Calcular consumo del mes
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-    usage_this_month = db.query(
-        func.coalesce(func.sum(UsageLog.minutes_used), 0)
-    ).filter(
-        UsageLog.user_id == current_admin.id,
-        UsageLog.date >= start_of_month.strftime('%Y-%m-%d')
-    ).scalar()
+    # Consumo del mes desde el rollup diario
+    usage_this_month = rollups.totals(db, tenant_id=current_admin.id, since=rollups.month_start())["minutes"]
 
     # Datos del plan
     plan_name = current_admin.plan.name if current_admin.plan else None
@@ -215,26 +228,221 @@ def get_stats(
     _admin=Depends(get_current_admin),
 ):
     total_users = db.query(User).count()
-    total_sessions = db.query(VoiceSession).count()
     active_count = session_manager.count()
     active_sessions = session_manager.list_active()
+    # Sesiones terminadas desde el rollup diario (O(días)) + las activas en este worker
+    totals = rollups.totals(db)
     return {
         "total_users": total_users,
-        "total_sessions": total_sessions,
+        "total_sessions": totals["sessions"] + active_count,
         "active_sessions_count": active_count,
+        "parked_sessions_count": session_manager.parked_count(),
         "max_sessions": session_manager.max_sessions,
         "active_sessions": active_sessions,
+        "today": rollups.totals(db, since=rollups.days_ago(0)),
+        "totals": totals,
+    }
+
+
+# ── Analytics ─────────────────────────────────────────────────────────────────
+@router.get("/analytics/daily")
+def get_daily_analytics(
+    days: int = Query(30, ge=1, le=366),
+    user_id: int | None = None,
+    db: Session = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    """Sesiones, minutos, turnos, latencia promedio y errores por día (todos o un cliente)."""
+    return {
+        "days": rollups.daily(db, rollups.days_ago(days - 1), rollups.days_ago(0), tenant_id=user_id),
+        "totals": rollups.totals(db, tenant_id=user_id, since=rollups.days_ago(days - 1)),
+    }
+
+
+@router.post("/analytics/backfill", status_code=202)
+def backfill_analytics(
+    background_tasks: BackgroundTasks,
+    since: str | None = None,
+    _admin=Depends(get_current_admin),
+):
+    """Recalcula el rollup diario desde las sesiones (todas, o desde `since` YYYY-MM-DD)."""
+    if since:
+        try:
+            datetime.strptime(since, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="since debe ser YYYY-MM-DD")
+    background_tasks.add_task(rollups.backfill, since)
+    return {"ok": True, "since": since}
+
+
+# ── Búsqueda ──────────────────────────────────────────────────────────────────
+@router.get("/search")
+def search_sessions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    """Búsqueda de texto completo en transcripciones y resúmenes (todos o un cliente)."""
+    return search.search(db, q, response, tenant_id=user_id, cursor=cursor, limit=limit)
+
+
+@router.get("/sessions/{session_id}")
+def get_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    """Sesión completa: desde la DB o, si ya está archivada, desde el archivo frío."""
+    session = db.query(VoiceSession).filter(VoiceSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    return {**archive.session_record(session), "archived": session.archive is not None}
+
+
+@router.post("/search/reindex", status_code=202)
+def reindex_search(
+    background_tasks: BackgroundTasks,
+    _admin=Depends(get_current_admin),
+):
+    """Reconstruye el índice de búsqueda desde las sesiones terminadas."""
+    background_tasks.add_task(search.reindex)
+    return {"ok": True}
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+@router.get("/metrics")
+def get_metrics(_admin=Depends(get_current_admin)):
+    """Contadores en memoria de este worker (cachés, latencias, rechazos)."""
+    return {
+        "faq_cache": faq_cache.stats(),
+        "llm": llm.llm_stats.as_dict(),
+        "audio_gate": audio_gate.stats(),
+        "event_loop": loop_monitor.stats(),
+        "logging": log_gate.stats(),
+        "live_feed": live_feed.stats(),
+        "sessions": session_manager.reaper_stats(),
+        "stt": stt_client.stt_pool.stats(),
+        "tts": tts_client.tts_pool.stats(),
     }
 
 
+# ── Drain ─────────────────────────────────────────────────────────────────────
+@router.post("/drain", status_code=202)
+async def start_drain(_admin=Depends(get_current_admin)):
+    """
+    Drena este worker y lo apaga: /health pasa a 503, no entran sesiones nuevas
+    y las activas se cierran al terminar su turno (máximo `drain_timeout`).
+    """
+    started = drain.start()
+    return {"started": started, **drain.status()}
+
+
+@router.get("/drain")
+def get_drain(_admin=Depends(get_current_admin)):
+    return drain.status()
+
+
+@router.get("/debug/loop")
+def get_loop_debug(_admin=Depends(get_current_admin)):
+    """Lag del event loop y stacks de los bloqueos recientes (más nuevo primero)."""
+    return {
+        **loop_monitor.stats(),
+        "stalls": list(reversed(loop_monitor.stalls)),
+    }
+
+
+@router.post("/debug/profile", response_class=PlainTextResponse)
+async def run_profile(
+    service: str = "core",
+    seconds: float = 10.0,
+    hz: int = 100,
+    _admin=Depends(get_current_admin),
+):
+    """
+    Perfil de muestreo del proceso indicado (core | stt | tts) durante `seconds`.
+    Devuelve un archivo collapsed-stack compatible con flamegraph/speedscope.
+    Solo un perfil a la vez por proceso (409 si ya hay uno corriendo).
+    """
+    seconds = min(max(seconds, 0.1), settings.profiler_max_seconds)
+    hz = min(max(hz, 1), 1000)
+    headers = {"Content-Disposition": f"attachment; filename={service}-profile.collapsed"}
+
+    if service == "core":
+        try:
+            collapsed = await asyncio.to_thread(profiler.run, seconds, hz)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return PlainTextResponse(collapsed, headers=headers)
+
+    urls = {"stt": settings.stt_service_urls_list[0], "tts": settings.tts_service_urls_list[0]}
+    if service not in urls:
+        raise HTTPException(status_code=400, detail="Servicio inválido (core | stt | tts)")
+    try:
+        async with httpx.AsyncClient(timeout=seconds + 15) as client:
+            response = await client.post(
+                f"{urls[service]}/debug/profile", params={"seconds": seconds, "hz": hz}
+            )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Servicio {service} no disponible: {e}")
+    if response.status_code == 409:
+        raise HTTPException(status_code=409, detail="Ya hay un perfil en curso")
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Error del servicio {service}: {response.text}")
+    return PlainTextResponse(response.text, headers=headers)
+
+
 # ── Users ─────────────────────────────────────────────────────────────────────
+USER_SORTS = {"id": User.id, "email": User.email, "created_at": User.created_at, "minutes_used": User.minutes_used}
+
+
+def _users_query(db: Session, q: str | None, status: str | None, plan_id: int | None, is_active: bool | None):
+    query = db.query(User)
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(or_(
+            User.email.ilike(pattern), User.full_name.ilike(pattern), User.company_name.ilike(pattern),
+        ))
+    if status:
+        query = query.filter(User.status == status)
+    if plan_id is not None:
+        query = query.filter(User.plan_id == plan_id)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    return query
+
+
 @router.get("/users", response_model=list[UserOut])
 def list_users(
+    response: Response,
+    q: str | None = None,
+    status: str | None = None,
+    plan_id: int | None = None,
+    is_active: bool | None = None,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    format: str = "json",
     db: Session = Depends(get_db),
     current_admin=Depends(get_current_admin),
 ):
-    logger.info(f"Admin {current_admin.email} requested users list")
-    return db.query(User).all()
+    """Usuarios paginados por cursor (header X-Next-Cursor); `format=ndjson` exporta todos."""
+    sort_column, descending = resolve_sort(USER_SORTS, sort, order)
+    logger.info(f"Admin {current_admin.email} requested users list ({format})")
+    if format == "ndjson":
+        return ndjson_export(
+            lambda s: _users_query(s, q, status, plan_id, is_active).order_by(User.id),
+            lambda u: UserOut.model_validate(u).model_dump(mode="json"),
+            "users.ndjson",
+        )
+    return keyset_page(
+        _users_query(db, q, status, plan_id, is_active), response, sort_column, User.id,
+        descending, cursor, limit, key=lambda u: (getattr(u, sort_column.key), u.id),
+    )
 
 
 @router.put("/users/{user_id}/plan")
@@ -287,6 +495,7 @@ def toggle_user(
 def update_user_prompt(
     user_id: int,
     payload: UpdateUserPrompt,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
@@ -295,21 +504,58 @@ def update_user_prompt(
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     user.master_prompt = payload.master_prompt
     db.commit()
+    llm.invalidate_system_prompt(user.id)
+    _refresh_greetings(background_tasks, db, user)
     return {"ok": True, "master_prompt": user.master_prompt}
 
 
 # ── Voices ────────────────────────────────────────────────────────────────────
+VOICE_SORTS = {"id": Voice.id, "name": Voice.name, "created_at": Voice.created_at}
+
+
+def _voices_query(db: Session, q: str | None, language: str | None, is_active: bool | None):
+    query = db.query(Voice)
+    if q:
+        query = query.filter(or_(Voice.name.ilike(f"%{q}%"), Voice.model_file.ilike(f"%{q}%")))
+    if language:
+        query = query.filter(Voice.language == language)
+    if is_active is not None:
+        query = query.filter(Voice.is_active == is_active)
+    return query
+
+
 @router.get("/voices", response_model=list[VoiceOut])
 def list_all_voices(
+    response: Response,
+    q: str | None = None,
+    language: str | None = None,
+    is_active: bool | None = None,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    format: str = "json",
     db: Session = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
-    return db.query(Voice).all()
+    """Voces paginadas por cursor (header X-Next-Cursor); `format=ndjson` exporta todas."""
+    sort_column, descending = resolve_sort(VOICE_SORTS, sort, order)
+    if format == "ndjson":
+        return ndjson_export(
+            lambda s: _voices_query(s, q, language, is_active).order_by(Voice.id),
+            lambda v: VoiceOut.model_validate(v).model_dump(mode="json"),
+            "voices.ndjson",
+        )
+    return keyset_page(
+        _voices_query(db, q, language, is_active), response, sort_column, Voice.id,
+        descending, cursor, limit, key=lambda v: (getattr(v, sort_column.key), v.id),
+    )
 
 
 @router.post("/voices", response_model=VoiceOut, status_code=201)
 def create_voice(
     payload: VoiceCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
@@ -319,6 +565,7 @@ def create_voice(
     db.add(voice)
     db.commit()
     db.refresh(voice)
+    background_tasks.add_task(canned_audio.prepare_fillers, voice.model_file)
     return voice
 
 
@@ -326,6 +573,7 @@ def create_voice(
 def update_voice(
     voice_id: int,
     payload: VoiceUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
@@ -336,6 +584,9 @@ def update_voice(
         setattr(voice, field, value)
     db.commit()
     db.refresh(voice)
+    canned_audio.forget_voice(voice.model_file)
+    if voice.is_active:
+        background_tasks.add_task(canned_audio.prepare_fillers, voice.model_file)
     return voice
 
 
@@ -348,6 +599,7 @@ def delete_voice(
     voice = db.get(Voice, voice_id)
     if not voice:
         raise HTTPException(status_code=404, detail="Voz no encontrada")
+    canned_audio.forget_voice(voice.model_file)
     db.delete(voice)
     db.commit()
     return {"ok": True}
@@ -387,32 +639,63 @@ def register_payment(
     return payment
 
 
+PAYMENT_SORTS = {"payment_date": Payment.payment_date, "amount": Payment.amount, "id": Payment.id}
+
+
+def _payments_query(db: Session, user_id: int | None, date_from: datetime | None, date_to: datetime | None):
+    query = db.query(Payment, User.email).join(User, Payment.user_id == User.id)
+    if user_id is not None:
+        query = query.filter(Payment.user_id == user_id)
+    if date_from:
+        query = query.filter(Payment.payment_date >= date_from)
+    if date_to:
+        query = query.filter(Payment.payment_date < date_to)
+    return query
+
+
+def _payment_row(row) -> dict:
+    payment, email = row
+    return {
+        "id": payment.id,
+        "user_id": payment.user_id,
+        "user_email": email,
+        "amount": payment.amount,
+        "days_added": payment.days_added,
+        "payment_date": payment.payment_date,
+        "description": payment.description,
+        "plan_id": payment.plan_id,
+        "created_by": payment.created_by,
+    }
+
+
 @router.get("/payments")
 def list_all_payments(
+    response: Response,
+    user_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    sort: str = "payment_date",
+    order: str = "desc",
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    format: str = "json",
     db: Session = Depends(get_db),
     current_admin=Depends(get_current_admin),
 ):
-    payments = (
-        db.query(Payment, User.email)
-        .join(User, Payment.user_id == User.id)
-        .order_by(Payment.payment_date.desc())
-        .all()
+    """Pagos paginados por cursor (header X-Next-Cursor); `format=ndjson` exporta todos."""
+    sort_column, descending = resolve_sort(PAYMENT_SORTS, sort, order)
+    if format == "ndjson":
+        logger.info(f"Admin {current_admin.email} exported payments")
+        return ndjson_export(
+            lambda s: _payments_query(s, user_id, date_from, date_to).order_by(Payment.id),
+            _payment_row,
+            "payments.ndjson",
+        )
+    rows = keyset_page(
+        _payments_query(db, user_id, date_from, date_to), response, sort_column, Payment.id,
+        descending, cursor, limit, key=lambda row: (getattr(row[0], sort_column.key), row[0].id),
     )
-
-    result = []
-    for payment, email in payments:
-        result.append({
-            "id": payment.id,
-            "user_id": payment.user_id,
-            "user_email": email,
-            "amount": payment.amount,
-            "days_added": payment.days_added,
-            "payment_date": payment.payment_date,
-            "description": payment.description,
-            "plan_id": payment.plan_id,
-            "created_by": payment.created_by,
-        })
-
+    result = [_payment_row(row) for row in rows]
     logger.info(f"Admin {current_admin.email} requested payments list ({len(result)} records)")
     return result
 
@@ -421,6 +704,7 @@ def list_all_payments(
 def update_user_data(
     user_id: int,
     payload: UpdateUserData,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
@@ -433,32 +717,67 @@ def update_user_data(
 
     db.commit()
     db.refresh(user)
+    _refresh_greetings(background_tasks, db, user)
     return user
 
 
+SITE_SORTS = {"id": WidgetSite.id, "created_at": WidgetSite.created_at, "domain_allowed": WidgetSite.domain_allowed}
+
+
+def _sites_query(db: Session, q: str | None, is_active: bool | None):
+    # Join con User para obtener email y nombre en la misma consulta
+    query = db.query(WidgetSite, User.email, User.full_name).join(User, WidgetSite.user_id == User.id)
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(or_(
+            WidgetSite.domain_allowed.ilike(pattern), WidgetSite.site_id.ilike(pattern), User.email.ilike(pattern),
+        ))
+    if is_active is not None:
+        query = query.filter(WidgetSite.is_active == is_active)
+    return query
+
+
+def _site_row(row) -> dict:
+    site, email, full_name = row
+    return {
+        "id": site.id,
+        "user_id": site.user_id,
+        "user_email": email,
+        "user_name": full_name,
+        "site_id": site.site_id,
+        "domain_allowed": site.domain_allowed,
+        "is_active": site.is_active,
+        "created_at": site.created_at,
+    }
+
+
 @router.get("/widget-sites", response_model=list[WidgetSiteOut])
 def list_widget_sites(
+    response: Response,
+    q: str | None = None,
+    is_active: bool | None = None,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    format: str = "json",
     db: Session = Depends(get_db),
     current_admin=Depends(get_current_admin),
 ):
-    # Join con User para obtener email y nombre
-    from sqlalchemy.orm import joinedload
-    sites = db.query(WidgetSite).options(joinedload(WidgetSite.user)).all()
-
-    # Convertir a formato de respuesta
-    result = []
-    for site in sites:
-        result.append({
-            "id": site.id,
-            "user_id": site.user_id,
-            "user_email": site.user.email,
-            "user_name": site.user.full_name,
-            "site_id": site.site_id,
-            "domain_allowed": site.domain_allowed,
-            "is_active": site.is_active,
-            "created_at": site.created_at,
-        })
-
+    """Sitios paginados por cursor (header X-Next-Cursor); `format=ndjson` exporta todos."""
+    sort_column, descending = resolve_sort(SITE_SORTS, sort, order)
+    if format == "ndjson":
+        logger.info(f"Admin {current_admin.email} exported widget sites")
+        return ndjson_export(
+            lambda s: _sites_query(s, q, is_active).order_by(WidgetSite.id),
+            _site_row,
+            "widget_sites.ndjson",
+        )
+    rows = keyset_page(
+        _sites_query(db, q, is_active), response, sort_column, WidgetSite.id,
+        descending, cursor, limit, key=lambda row: (getattr(row[0], sort_column.key), row[0].id),
+    )
+    result = [_site_row(row) for row in rows]
     logger.info(f"Admin {current_admin.email} requested widget sites list ({len(result)} records)")
     return result
 
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from auth import decode_token
+from concurrency import session_manager
+from database import get_db
+from live_feed import live_feed
+from models import User
+
+router = APIRouter(tags=["Admin"])
+
+
+# ── Feed en vivo del dashboard ────────────────────────────────────────────────
+@router.websocket("/ws/admin/live")
+async def admin_live_feed(
+    websocket: WebSocket,
+    token: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Sesiones activas de este worker en vivo, en lugar de hacer polling a /stats.
+
+    Al conectar llega un `snapshot` con el estado de todas las sesiones; después,
+    lotes `events` con los cambios (start, stage, end), cada uno con el estado
+    completo de la sesión: cliente, voz, etapa, turnos y última latencia.
+    """
+    await websocket.accept()
+    try:
+        payload = decode_token(token or "")
+        admin = db.get(User, int(payload.get("sub")))
+    except (HTTPException, TypeError, ValueError):
+        admin = None
+    db.close()  # no se usa más: no retener la conexión mientras el socket vive
+    if not admin or not admin.is_admin or not admin.is_active:
+        await websocket.close(code=4401)
+        return
+
+    queue = live_feed.subscribe()
+
+    async def pump():
+        await websocket.send_text(json.dumps({
+            "type": "snapshot",
+            "sessions": session_manager.list_active(),
+            "max_sessions": session_manager.max_sessions,
+        }))
+        while True:
+            await websocket.send_text(await queue.get())
+
+    # El envío corre aparte; este loop solo espera el cierre del cliente, así un
+    # admin que se va se desuscribe enseguida aunque no haya eventos
+    sender = asyncio.create_task(pump())
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Feed en vivo del admin cerrado: {e}")
+    finally:
+        sender.cancel()
+        live_feed.unsubscribe(queue)
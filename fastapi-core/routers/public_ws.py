@@ -1,7 +1,8 @@
-import json
 import secrets
+import time
 from datetime import datetime, timezone
 import asyncio
+from contextlib import ExitStack
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from loguru import logger
@@ -9,34 +10,68 @@ from sqlalchemy.orm import Session
 
 from auth import decode_token
 from concurrency import session_manager
-from database import get_db
+from database import SessionLocal, get_db
+from framing import VoiceChannel
 from models import Voice, VoiceSession, User
+from config import settings
 from services import llm, stt_client, tts_client
+from services.audio_gate import audio_gate
+from services.canned_audio import canned_audio
+from services.capture import start_capture
+from services.faq_cache import faq_cache
+from services import rollups, search
+from services.transcripts import record_turn
+from tracing import tracer
 
 router = APIRouter(tags=["Public WebSocket"])
 
 
-# ── Public Voice WebSocket ────────────────────────────────────────────────────
-@router.websocket("/ws/public/voice/{voice_id}")
-async def public_voice_session(
-    websocket: WebSocket,
-    voice_id: int,
-    token: str | None = None,
-    db: Session = Depends(get_db),
-):
+def _elapsed_ms(start: float) -> int:
+    return int((time.perf_counter() - start) * 1000)
+
+
+class _Conversation:
     """
-    WebSocket público simplificado para el widget.
-    
-    Flujo:
-    1. Cliente se conecta y recibe session_ready
-    2. Cliente envía audio como bytes cuando el usuario habla
-    3. Backend procesa: STT → LLM → TTS
-    4. Backend envía transcripción, texto de respuesta y audio TTS
-    5. Cliente reproduce y vuelve a escuchar
+    Estado de una sesión del widget que sobrevive a la conexión. Si el socket se
+    cae sin end_session, queda en espera `session_resume_grace` segundos con su
+    slot; una reconexión con el resume token la retoma sin auth, INSERT ni saludo.
     """
-    await websocket.accept()
-    print(f"[WebSocket] Nueva conexión - Voice ID: {voice_id}")
 
+    def __init__(self, session_id: int, session_token: str, user_id: int | None, voice_id: int,
+                 master_prompt: str | None, capture, log):
+        # Ids y no instancias ORM: la sesión de DB de cada conexión muere con ella
+        self.session_id = session_id
+        self.session_token = session_token
+        self.user_id = user_id
+        self.voice_id = voice_id
+        self.master_prompt = master_prompt
+        self.capture = capture
+        self.log = log
+        self.conversation_history: list[dict] = []
+        self.full_transcript_parts: list[str] = []
+        self.turn_index = 0
+        self.resume_token: str | None = None
+        self.parked_at: float | None = None
+        self.parked_seconds = 0.0
+
+    def new_resume_token(self) -> str:
+        # Uno por conexión: el token de una conexión anterior ya no sirve
+        self.resume_token = secrets.token_urlsafe(24)
+        return self.resume_token
+
+    def park(self) -> None:
+        self.parked_at = time.time()
+
+    def reattach(self) -> None:
+        if self.parked_at is not None:
+            self.parked_seconds += time.time() - self.parked_at
+            self.parked_at = None
+
+
+async def _open_session(
+    channel: VoiceChannel, voice_id: int, token: str | None, db: Session, log
+) -> _Conversation | None:
+    """Auth, voz, slot y fila en voice_sessions. None si se rechazó (ya se avisó al cliente)."""
     # ── Auth opcional ──────────────────────────────────────────────────────────
     user = None
     master_prompt = None
@@ -55,44 +90,47 @@ async def public_voice_session(
                     )
                     if has_active_subscription or user.is_admin:
                         master_prompt = user.master_prompt
-                        logger.info(f"USER_EMAIL: {user.email}")
-                        logger.info(f"MASTER_PROMPT_LEN: {len(user.master_prompt) if user.master_prompt else 0}")
-                        print(f"[WebSocket] Usuario autenticado: {user.email}")
-                        print(f"[WebSocket] master_prompt loaded: '{master_prompt}' (len: {len(master_prompt) if master_prompt else 0})")
+                        log = log.bind(user_id=user.id)
+                        log.debug(f"Usuario autenticado | prompt={len(master_prompt or '')} chars")
                     else:
-                        await websocket.send_text(json.dumps({
+                        await channel.send_event({
                             "type": "error",
                             "message": "Suscripción expirada. Contacte soporte."
-                        }))
-                        await websocket.close()
-                        return
+                        })
+                        await channel.close()
+                        return None
                 else:
                     user = None
         except Exception as e:
-            print(f"[WebSocket] Error validando token: {e}")
+            log.warning(f"Token inválido, se continúa como anónimo: {e}")
             # Continue as anonymous
 
     # ── Validar voz ────────────────────────────────────────────────────────────
     voice = db.get(Voice, voice_id)
     if not voice or not voice.is_active:
-        await websocket.send_text(json.dumps({
+        await channel.send_event({
             "type": "error",
             "message": "Voz no disponible"
-        }))
-        await websocket.close()
-        return
+        })
+        await channel.close()
+        return None
 
     # ── Control de concurrencia ────────────────────────────────────────────────
     session_token = secrets.token_hex(16)
-    acquired = await session_manager.acquire(session_token)
+    acquired = await session_manager.acquire(
+        session_token,
+        user_id=user.id if user else None,
+        tenant=(user.company_name or user.email) if user else None,
+        voice=voice.name,
+    )
     
     if not acquired:
-        await websocket.send_text(json.dumps({
+        await channel.send_event({
             "type": "error",
             "message": "Servidor ocupado. Intente en unos momentos."
-        }))
-        await websocket.close()
-        return
+        })
+        await channel.close()
+        return None
 
     # ── Registrar sesión ───────────────────────────────────────────────────────
     db_session = VoiceSession(
@@ -105,84 +143,264 @@ async def public_voice_session(
     db.commit()
     db.refresh(db_session)
     
-    print(f"[WebSocket] Sesión creada: {session_token}")
+    log = log.bind(session=session_token)
+    log.info(f"Sesión creada | voz={voice.model_file}")
+    capture = start_capture(session_token, voice_id, user.id if user else None)
+    return _Conversation(
+        db_session.id, session_token, user.id if user else None, voice.id, master_prompt, capture, log
+    )
 
-    # ── Estado de la conversación ──────────────────────────────────────────────
-    conversation_history: list[dict] = []
-    full_transcript_parts: list[str] = []
+
+async def _finalize(db: Session, conv: _Conversation) -> None:
+    """Cierre definitivo: libera el slot y guarda duración, resumen, rollup e índice."""
+    await session_manager.release(conv.session_token)
+
+    # Si venció la espera, la sesión terminó cuando se cayó la conexión; el
+    # tiempo en espera entre reconexiones no cuenta como duración
+    if conv.parked_at is not None:
+        ended_at = datetime.fromtimestamp(conv.parked_at, timezone.utc)
+    else:
+        ended_at = datetime.now(timezone.utc)
+    db_session = db.get(VoiceSession, conv.session_id)
+    started_at = db_session.started_at.replace(tzinfo=timezone.utc)
+    duration = max(int((ended_at - started_at).total_seconds() - conv.parked_seconds), 0)
+    closed = {"status": "ended", "ended_at": ended_at, "duration_seconds": duration}
+
+    # Generar resumen si hay conversación
+    if sum(part.startswith("Usuario: ") for part in conv.full_transcript_parts) > 1:  # Más de un intercambio
+        try:
+            closed["summary"] = await llm.generate_summary("\n".join(conv.full_transcript_parts))
+        except Exception as e:
+            conv.log.bind(category="ws.error").warning(f"Error generando resumen: {e}")
+            closed["summary"] = None
+
+    # Commit y rollup en un hilo: el backfill puede tener tomado su lock
+    await rollups.record_session(conv.session_id, **closed)
+    await search.index_session(conv.session_id)
+    conv.log.info(f"Sesión guardada | duración={duration}s")
+
+    if conv.capture:
+        await conv.capture.close(closed["status"], duration)
+
+
+async def _expire(conv: _Conversation) -> None:
+    """La espera venció sin reconexión: cerrar con una conexión propia a la DB."""
+    db = SessionLocal()
+    try:
+        await _finalize(db, conv)
+    finally:
+        db.close()
+
+
+# ── Public Voice WebSocket ────────────────────────────────────────────────────
+@router.websocket("/ws/public/voice/{voice_id}")
+async def public_voice_session(
+    websocket: WebSocket,
+    voice_id: int,
+    token: str | None = None,
+    resume: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    WebSocket público simplificado para el widget.
+    
+    Flujo:
+    1. Cliente se conecta y recibe session_ready
+    2. Cliente envía audio como bytes cuando el usuario habla
+    3. Backend procesa: STT → LLM → TTS
+    4. Backend envía transcripción, texto de respuesta y audio TTS
+    5. Cliente reproduce y vuelve a escuchar
+
+    Si la conexión se cae, el cliente reconecta con `?resume=<resume_token>`
+    (llega en session_ready) y sigue la misma conversación.
+
+    Con el subprotocolo `venzio.v1` los mensajes van en frames binarios con
+    tipo, turno y secuencia (ver framing.py); sin él, JSON + audio crudo.
+    """
+    channel = await VoiceChannel.accept(websocket)
+    # Eventos estructurados: la categoría decide muestreo/rate limit (ver log_setup.py)
+    log = logger.bind(category="ws.session", voice_id=voice_id)
+    log.debug(f"Nueva conexión WS | framing={channel.version or 'no'}")
+
+    # ── Reanudación: el resume token devuelve estado y slot de la conexión caída ──
+    conv = session_manager.resume(resume) if resume else None
+    resumed = conv is not None
+    if conv is None:
+        conv = await _open_session(channel, voice_id, token, db, log)
+        if conv is None:
+            return
+    else:
+        conv.reattach()
+        conv.log.info(f"Sesión reanudada | turnos previos={conv.turn_index}")
+
+    # Búsquedas por PK (en una sesión nueva ya están en el identity map)
+    db_session = db.get(VoiceSession, conv.session_id)
+    user = db.get(User, conv.user_id) if conv.user_id else None
+    voice = db.get(Voice, conv.voice_id)
+    master_prompt = conv.master_prompt
+    session_token, capture, log = conv.session_token, conv.capture, conv.log
+    turn_log = log.bind(category="ws.turn")
+    error_log = log.bind(category="ws.error")
+
+    # ── Estado de la conversación (vuelve a conv al salir) ─────────────────────
+    conversation_history = conv.conversation_history
+    full_transcript_parts = conv.full_transcript_parts
+    turn_index = conv.turn_index
+    # Solo una caída de la conexión (sin end_session) deja la sesión en espera
+    dropped = False
+    session_manager.connect(session_token, websocket)
 
     try:
         # Confirmar sesión lista
-        await websocket.send_text(json.dumps({
+        await channel.send_event({
             "type": "session_ready",
             "session_token": session_token,
             "voice": voice.name,
-        }))
-        print(f"[WebSocket] session_ready enviado")
+            "resume_token": conv.new_resume_token(),
+            "resumed": resumed,
+            "framing": channel.version,
+        })
+
+        # Saludo pre-sintetizado: suena de inmediato, sin esperar al primer turno
+        greeting = None
+        if settings.greeting_enabled and user and not resumed:
+            greeting = canned_audio.greeting(user, voice.model_file)
+        if greeting:
+            greeting_text, greeting_audio = greeting
+            # Parte de la conversación: el LLM sabe que ya saludó y el resumen lo incluye
+            conversation_history.append({"role": "assistant", "content": greeting_text})
+            full_transcript_parts.append(f"Agente: {greeting_text}")
+            await channel.send_event({
+                "type": "reply_text",
+                "text": greeting_text
+            })
+            await channel.send_audio(greeting_audio)
 
         # ── Loop principal ─────────────────────────────────────────────────────
         while True:
             try:
                 # Recibir mensaje (puede ser texto o binario)
                 message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    log.info("Cliente desconectado")
+                    dropped = True
+                    break
+                try:
+                    received = channel.incoming(message)
+                except ValueError as e:
+                    log.warning(f"Mensaje inválido recibido: {e}")
+                    received = None
+                # Cualquier mensaje es señal de vida; solo el audio cuenta contra el idle
+                session_manager.seen(session_token, audio=channel.audio_received)
+                if received is None:
+                    continue
+                kind, payload = received
 
-                # ── Manejo de comandos de texto ────────────────────────────────────
-                if "text" in message:
-                    try:
-                        data = json.loads(message["text"])
-
-                        if data.get("type") == "end_session":
-                            print(f"[WebSocket] end_session recibido")
-                            break
-
-                        # Ignorar otros comandos por ahora
-                        print(f"[WebSocket] Comando recibido: {data.get('type')}")
+                # ── Manejo de comandos ─────────────────────────────────────────
+                if kind == "command":
+                    if payload.get("type") == "end_session":
+                        log.debug("end_session recibido")
+                        break
 
-                    except json.JSONDecodeError:
-                        print(f"[WebSocket] JSON inválido recibido")
+                    if payload.get("type") == "pong":
+                        session_manager.seen(session_token, pong=True)
+                        continue
 
+                    # Ignorar otros comandos por ahora
+                    log.debug(f"Comando ignorado: {payload.get('type')}")
                     continue
 
-                # ── Procesamiento de audio binario ──────────────────────────────
-                audio_bytes = message.get("bytes")
+                # ── Procesamiento de audio ─────────────────────────────────────
+                audio_bytes = payload
                 if not audio_bytes:
                     continue
 
-                print(f"[WebSocket] Audio recibido: {len(audio_bytes)} bytes")
-
             except WebSocketDisconnect:
-                print(f"[WebSocket] Cliente desconectado: {session_token}")
+                log.info("Cliente desconectado")
+                dropped = True
                 break
             except Exception as e:
-                print(f"[WebSocket] Error recibiendo mensaje: {e}")
+                error_log.warning(f"Error recibiendo mensaje: {e}")
                 break
 
+            # Registro del turno: tiempos por etapa y resultado (para captura/replay)
+            turn = {"offset": capture.offset() if capture else 0.0, "timings": {}, "outcome": "ok"}
+            usage: dict = {}
+            turn_start = time.perf_counter()
+            # Turno en el framing (0 queda para lo que no pertenece a un turno)
+            frame_turn = turn_index + 1
+            # Traza del turno (muestreada): un span por etapa, propagado a STT/TTS
+            trace = ExitStack()
+            turn_span = trace.enter_context(tracer.span(
+                "voice.turn", session=session_token, voice=voice.model_file,
+                tenant=user.id if user else 0,
+            ))
             try:
+                # ── 0. Filtro de silencio (sin salto de red) ───────────────────
+                # audio_bytes queda intacto: la captura guarda lo que mandó el cliente
+                with tracer.span("audio_gate", bytes_in=len(audio_bytes)):
+                    has_speech, speech_audio = audio_gate.check(audio_bytes)
+                if not has_speech:
+                    turn["outcome"] = "no_speech"
+                    await channel.send_event({
+                        "type": "error",
+                        "message": "No se detectó audio claro"
+                    }, frame_turn)
+                    continue
+
                 # ── 1. Transcripción (STT) ─────────────────────────────────────
-                print(f"[WebSocket] Iniciando STT... Audio buffer: {len(audio_bytes)} bytes")
-                user_text = await stt_client.transcribe(audio_bytes)
+                session_manager.stage(session_token, "stt")
+                stt_start = time.perf_counter()
+                with tracer.span("stt", bytes=len(speech_audio)):
+                    user_text = await stt_client.transcribe(speech_audio)
+                turn["timings"]["stt_ms"] = _elapsed_ms(stt_start)
+                turn["transcript"] = user_text
                 
                 if not user_text or len(user_text.strip()) < 2:
-                    print(f"[WebSocket] Audio sin contenido claro")
-                    await websocket.send_text(json.dumps({
+                    turn["outcome"] = "no_speech"
+                    await channel.send_event({
                         "type": "error",
                         "message": "No se detectó audio claro"
-                    }))
+                    }, frame_turn)
                     continue
 
-                print(f"[WebSocket] STT resultado: {user_text}")
+                turn_log.debug(f"STT: '{user_text}'")
                 
                 # Guardar transcripción
                 full_transcript_parts.append(f"Usuario: {user_text}")
                 
                 # Enviar transcripción al cliente
-                await websocket.send_text(json.dumps({
+                await channel.send_event({
                     "type": "final_transcript",
                     "text": user_text
-                }))
+                }, frame_turn)
+
+                # ── 2a. Caché FAQ (solo primer turno de clientes autenticados) ──
+                use_faq_cache = (
+                    settings.faq_cache_enabled and user is not None
+                    and all(m["role"] == "assistant" for m in conversation_history)
+                )
+                if use_faq_cache:
+                    with tracer.span("faq_cache.lookup") as span:
+                        cached = faq_cache.lookup(user.id, voice.model_file, master_prompt, user_text)
+                        if span:
+                            span.set("hit", bool(cached))
+                    if cached:
+                        reply_text, audio_response = cached
+                        turn["outcome"] = "faq_cache"
+                        turn["reply"] = reply_text
+                        conversation_history.append({"role": "user", "content": user_text})
+                        conversation_history.append({"role": "assistant", "content": reply_text})
+                        full_transcript_parts.append(f"Agente: {reply_text}")
+                        await channel.send_event({
+                            "type": "reply_text",
+                            "text": reply_text
+                        }, frame_turn)
+                        with tracer.span("ws.send", bytes=len(audio_response)):
+                            await channel.send_audio(audio_response, frame_turn)
+                        continue
 
                 # ── 2. Generar respuesta (LLM) ─────────────────────────────────
-                print(f"[WebSocket] Iniciando LLM...")
                 conversation_history.append({
                     "role": "user",
                     "content": user_text
@@ -191,12 +409,28 @@ async def public_voice_session(
                 # Limitar historial a los últimos 10 mensajes
                 conversation_history = conversation_history[-10:]
 
-                reply_text = await llm.chat_completion(
-                    messages=conversation_history,
-                    master_prompt=master_prompt
-                )
+                session_manager.stage(session_token, "llm")
+                llm_start = time.perf_counter()
+                with tracer.span("llm", messages=len(conversation_history)) as llm_span:
+                    llm_task = asyncio.create_task(llm.chat_completion(
+                        messages=conversation_history,
+                        master_prompt=master_prompt,
+                        user_id=user.id if user else None,
+                        usage=usage,
+                    ))
+                    # Si el LLM se demora, enviar un relleno pre-sintetizado mientras tanto
+                    done, _ = await asyncio.wait({llm_task}, timeout=settings.filler_delay)
+                    if not done and settings.filler_enabled:
+                        filler_audio = canned_audio.filler(voice.model_file)
+                        if filler_audio:
+                            await channel.send_audio(filler_audio, frame_turn)
+                            if llm_span:
+                                llm_span.set("filler_sent", True)
+                    reply_text = await llm_task
+                turn["timings"]["llm_ms"] = _elapsed_ms(llm_start)
+                turn["reply"] = reply_text
                 
-                print(f"[WebSocket] LLM resultado: {reply_text[:100]}...")
+                turn_log.debug(f"LLM: '{reply_text[:100]}'")
                 
                 # Guardar respuesta
                 conversation_history.append({
@@ -206,80 +440,93 @@ async def public_voice_session(
                 full_transcript_parts.append(f"Agente: {reply_text}")
 
                 # Enviar texto de respuesta
-                await websocket.send_text(json.dumps({
+                await channel.send_event({
                     "type": "reply_text",
                     "text": reply_text
-                }))
+                }, frame_turn)
 
                 # ── 3. Sintetizar audio (TTS) ──────────────────────────────────
-                print(f"[WebSocket] Iniciando TTS...")
-                
                 try:
-                    audio_response = await tts_client.synthesize(
-                        text=reply_text,
-                        voice_model=voice.model_file
-                    )
-                    
-                    print(f"[WebSocket] TTS generado: {len(audio_response)} bytes")
+                    session_manager.stage(session_token, "tts")
+                    tts_start = time.perf_counter()
+                    with tracer.span("tts", chars=len(reply_text)):
+                        audio_response = await tts_client.synthesize(
+                            text=reply_text,
+                            voice_model=voice.model_file
+                        )
+                    turn["timings"]["tts_ms"] = _elapsed_ms(tts_start)
+
+                    if use_faq_cache:
+                        faq_cache.store(user.id, voice.model_file, master_prompt, user_text, reply_text, audio_response)
                     
                     # Enviar audio al cliente
-                    await websocket.send_bytes(audio_response)
-                    print(f"[WebSocket] Audio TTS enviado")
+                    with tracer.span("ws.send", bytes=len(audio_response)):
+                        await channel.send_audio(audio_response, frame_turn)
                     
                 except Exception as e:
-                    print(f"[WebSocket] Error en TTS: {e}")
-                    await websocket.send_text(json.dumps({
+                    error_log.exception(f"Error en TTS: {e}")
+                    turn["outcome"] = "tts_error"
+                    await channel.send_event({
                         "type": "error",
                         "message": "Error generando audio de respuesta"
-                    }))
+                    }, frame_turn)
 
             except Exception as e:
-                print(f"[WebSocket] Error procesando audio: {e}")
-                import traceback
-                traceback.print_exc()
+                error_log.exception(f"Error procesando audio: {e}")
+                turn["outcome"] = "error"
                 
-                await websocket.send_text(json.dumps({
+                await channel.send_event({
                     "type": "error",
                     "message": f"Error procesando audio: {str(e)}"
-                }))
+                }, frame_turn)
+
+            finally:
+                turn["timings"]["total_ms"] = _elapsed_ms(turn_start)
+                if turn_span:
+                    turn_span.set("outcome", turn["outcome"])
+                    if turn["outcome"] in ("error", "tts_error"):
+                        turn_span.error = turn["outcome"]
+                trace.close()
+                timings = turn["timings"]
+                turn_log.bind(outcome=turn["outcome"], timings=timings, audio_bytes=len(audio_bytes)).info(
+                    f"Turno {turn['outcome']} | stt={timings.get('stt_ms')}ms llm={timings.get('llm_ms')}ms "
+                    f"tts={timings.get('tts_ms')}ms total={timings['total_ms']}ms"
+                )
+                session_manager.turn_done(
+                    session_token, timings["total_ms"] if turn["outcome"] in ("ok", "faq_cache") else None
+                )
+                await record_turn(db_session.id, turn_index, turn, usage)
+                turn_index += 1
+                if capture:
+                    await capture.record_turn(audio_bytes, turn)
 
     except WebSocketDisconnect:
-        print(f"[WebSocket] Desconexión durante procesamiento: {session_token}")
-        
+        log.info("Desconexión durante procesamiento")
+        dropped = True
+
+    except asyncio.CancelledError:
+        # El reaper (si cerrar el socket no alcanzó) o el apagado cancelan el
+        # handler: el finally guarda la sesión y la cancelación sigue su curso
+        log.warning("Sesión cancelada")
+        raise
+
     except Exception as e:
-        print(f"[WebSocket] Error crítico en sesión {session_token}: {e}")
-        import traceback
-        traceback.print_exc()
+        error_log.exception(f"Error crítico en sesión: {e}")
         
     finally:
         # ── Limpieza y cierre ──────────────────────────────────────────────────
-        print(f"[WebSocket] Cerrando sesión: {session_token}")
-        
-        # Liberar slot de concurrencia
-        await session_manager.release(session_token)
-        
-        # Actualizar registro en DB
-        ended_at = datetime.now(timezone.utc)
-        started_at = db_session.started_at.replace(tzinfo=timezone.utc)
-        duration = int((ended_at - started_at).total_seconds())
+        conv.conversation_history, conv.turn_index = conversation_history, turn_index
+        reaped = session_manager.disconnect(session_token)
+        if dropped and not reaped and settings.session_resume_grace > 0:
+            # Caída sin end_session: conservar estado y slot por si el cliente vuelve
+            conv.park()
+            session_manager.park(
+                session_token, conv.resume_token, conv, settings.session_resume_grace, _expire
+            )
+            log.info(f"Sesión en espera de reconexión ({settings.session_resume_grace}s)")
+        else:
+            await _finalize(db, conv)
 
-        db_session.status = "ended"
-        db_session.ended_at = ended_at
-        db_session.duration_seconds = duration
-        db_session.transcript = "\n".join(full_transcript_parts)
-
-        # Generar resumen si hay conversación
-        if len(full_transcript_parts) > 2:  # Más de un intercambio
-            try:
-                print(f"[WebSocket] Generando resumen...")
-                db_session.summary = await llm.generate_summary(db_session.transcript)
-            except Exception as e:
-                print(f"[WebSocket] Error generando resumen: {e}")
-                db_session.summary = None
-
-        db.commit()
-        print(f"[WebSocket] Sesión guardada - Duración: {duration}s")
-        
         # Cerrar WebSocket si aún está abierto
         try:
             await websocket.close()
@@ -1,5 +1,7 @@
+import asyncio
 import json
 import secrets
+import time
 import uuid
 from datetime import datetime, timezone
 
@@ -12,6 +14,9 @@ from concurrency import session_manager
 from database import get_db
 from models import User, VoiceSession, Voice
 from services import llm, stt_client, tts_client
+from services.audio_gate import audio_gate
+from services import rollups, search
+from services.transcripts import record_turn
 
 router = APIRouter(tags=["Sesiones de Voz"])
 
@@ -86,7 +91,12 @@ async def voice_session(
 
     # Verificar límite de sesiones concurrentes
     session_token = secrets.token_hex(16)
-    acquired = await session_manager.acquire(session_token)
+    acquired = await session_manager.acquire(
+        session_token,
+        user_id=user.id if user else None,
+        tenant=(user.company_name or user.email) if user else None,
+        voice=voice.name,
+    )
     if not acquired:
         await websocket.send_text(
             json.dumps({"type": "error", "message": "Servidor ocupado. Intente en unos momentos."})
@@ -112,6 +122,7 @@ async def voice_session(
     # Historial de conversación para el LLM
     conversation_history: list[dict] = []
     full_transcript_parts: list[str] = []
+    turn_index = 0
 
     logger.info(f"Sesión de voz iniciada: {session_token} | Voz: {voice.name}")
 
@@ -124,18 +135,25 @@ async def voice_session(
             })
         )
 
+        session_manager.connect(session_token, websocket)
         while True:
             # Recibir mensaje del cliente
             try:
                 message = await websocket.receive()
             except WebSocketDisconnect:
                 break
+            if message["type"] == "websocket.disconnect":
+                break
+            # Este endpoint no tiene framing: todo mensaje binario es audio del usuario
+            session_manager.seen(session_token, audio=bool(message.get("bytes")))
 
             # Comando de texto (control)
             if "text" in message:
                 data = json.loads(message["text"])
                 if data.get("type") == "end_session":
                     break
+                if data.get("type") == "pong":
+                    session_manager.seen(session_token, pong=True)
                 continue
 
             # Audio bytes – pipeline STT → LLM → TTS
@@ -143,10 +161,25 @@ async def voice_session(
             if not audio_bytes:
                 continue
 
+            turn = {"timings": {}, "outcome": "ok"}
+            usage: dict = {}
+            turn_start = time.perf_counter()
             try:
+                # 0. Filtro de silencio antes del STT
+                has_speech, audio_bytes = audio_gate.check(audio_bytes)
+                if not has_speech:
+                    turn["outcome"] = "no_speech"
+                    await websocket.send_text(
+                        json.dumps({"type": "error", "message": "No se detectó audio claro"})
+                    )
+                    continue
+
                 # 1. STT – Transcripción
+                session_manager.stage(session_token, "stt")
                 user_text = await stt_client.transcribe(audio_bytes)
+                turn["transcript"] = user_text
                 if not user_text:
+                    turn["outcome"] = "no_speech"
                     await websocket.send_text(
                         json.dumps({"type": "error", "message": "No se detectó audio claro"})
                     )
@@ -160,10 +193,14 @@ async def voice_session(
                 # 2. LLM – Respuesta
                 conversation_history.append({"role": "user", "content": user_text})
                 conversation_history = conversation_history[-10:]
+                session_manager.stage(session_token, "llm")
                 reply_text = await llm.chat_completion(
                     messages=conversation_history,
-                    master_prompt=master_prompt
+                    master_prompt=master_prompt,
+                    user_id=user.id if user else None,
+                    usage=usage,
                 )
+                turn["reply"] = reply_text
                 conversation_history.append({"role": "assistant", "content": reply_text})
                 conversation_history = conversation_history[-10:]
                 full_transcript_parts.append(f"Agente: {reply_text}")
@@ -173,33 +210,44 @@ async def voice_session(
                 )
 
                 # 3. TTS – Síntesis de voz
+                session_manager.stage(session_token, "tts")
                 audio_response = await tts_client.synthesize(reply_text, voice.model_file)
                 await websocket.send_bytes(audio_response)
 
             except RuntimeError as e:
+                turn["outcome"] = "error"
                 await websocket.send_text(
                     json.dumps({"type": "error", "message": str(e)})
                 )
+            finally:
+                turn["timings"]["total_ms"] = int((time.perf_counter() - turn_start) * 1000)
+                session_manager.turn_done(
+                    session_token, turn["timings"]["total_ms"] if turn["outcome"] == "ok" else None
+                )
+                await record_turn(db_session.id, turn_index, turn, usage)
+                turn_index += 1
 
     except WebSocketDisconnect:
         logger.info(f"Cliente desconectó: {session_token}")
+    except asyncio.CancelledError:
+        # Reaper o apagado: se guarda la sesión en el finally y se propaga
+        logger.warning(f"Sesión cancelada: {session_token}")
+        raise
     except Exception as e:
         logger.error(f"Error en sesión {session_token}: {e}")
     finally:
         # Cerrar sesión y guardar datos
+        session_manager.disconnect(session_token)
         await session_manager.release(session_token)
         ended_at = datetime.now(timezone.utc)
         duration = int((ended_at - db_session.started_at.replace(tzinfo=timezone.utc)).total_seconds())
 
-        db_session.status = "ended"
-        db_session.ended_at = ended_at
-        db_session.duration_seconds = duration
-        db_session.transcript = "\n".join(full_transcript_parts)
+        closed = {"status": "ended", "ended_at": ended_at, "duration_seconds": duration}
 
         # Generar resumen si hay conversación
         if full_transcript_parts:
             try:
-                db_session.summary = await llm.generate_summary(db_session.transcript)
+                closed["summary"] = await llm.generate_summary("\n".join(full_transcript_parts))
             except Exception:
                 pass
 
@@ -209,5 +257,6 @@ async def voice_session(
             user.minutes_used += minutes_this_session
             db.commit()
 
-        db.commit()
+        await rollups.record_session(db_session.id, **closed)
+        await search.index_session(db_session.id)
         logger.info(f"Sesión finalizada: {session_token} | Duración: {duration}s")
@@ -1,12 +1,13 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from auth import get_current_user
 from database import get_db
-from models import Payment, User, WidgetSite, UsageLog
+from models import Payment, User, Voice, VoiceSession, WidgetSite
+from services import archive, llm, rollups, search
+from services.canned_audio import canned_audio, greeting_text
 from urllib.parse import urlparse
 
 router = APIRouter(tags=["Usuarios"])
@@ -85,15 +86,8 @@ def get_my_profile(
             db.rollback()
             site = None
 
-    # Calcular consumo del mes
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-    usage_this_month = db.query(
-        func.coalesce(func.sum(UsageLog.minutes_used), 0)
-    ).filter(
-        UsageLog.user_id == current_user.id,
-        UsageLog.date >= start_of_month.strftime('%Y-%m-%d')
-    ).scalar()
+    # Consumo del mes desde el rollup diario
+    usage_this_month = rollups.totals(db, tenant_id=current_user.id, since=rollups.month_start())["minutes"]
 
     # Datos del plan
     plan_name = current_user.plan.name if current_user.plan else None
@@ -127,6 +121,7 @@ def get_my_profile(
 @router.put("/me", response_model=UserProfile)
 def update_my_profile(
     payload: UserUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -135,7 +130,15 @@ def update_my_profile(
             continue  # No actualizar si está vacío
         setattr(current_user, field, value)
     db.commit()
+    if payload.master_prompt is not None:
+        llm.invalidate_system_prompt(current_user.id)
     db.refresh(current_user)
+
+    # Re-sintetizar el saludo con los datos actualizados
+    voice_files = [v.model_file for v in db.query(Voice).filter(Voice.is_active == True).all()]
+    background_tasks.add_task(
+        canned_audio.prepare_greetings, current_user.id, greeting_text(current_user), voice_files
+    )
     return current_user
 
 
@@ -144,4 +147,32 @@ def get_my_payments(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    return db.query(Payment).filter(Payment.user_id == current_user.id).order_by(Payment.payment_date.desc()).all()
\ No newline at end of file
+    return db.query(Payment).filter(Payment.user_id == current_user.id).order_by(Payment.payment_date.desc()).all()
+
+
+@router.get("/me/sessions/search")
+def search_my_sessions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Búsqueda en las conversaciones del propio cliente (paginada con X-Next-Cursor)."""
+    return search.search(db, q, response, tenant_id=current_user.id, cursor=cursor, limit=limit)
+
+
+@router.get("/me/sessions/{session_id}")
+def get_my_session(
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Una conversación del cliente (lee del archivo frío si ya fue archivada)."""
+    session = db.query(VoiceSession).filter(
+        VoiceSession.id == session_id, VoiceSession.user_id == current_user.id
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    return {**archive.session_record(session), "archived": session.archive is not None}
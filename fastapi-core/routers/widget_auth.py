@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from auth import create_widget_token
 from database import get_db
 from models import WidgetSite, User, Voice
+from services.canned_audio import canned_audio
 
 router = APIRouter(tags=["Widget Auth"])
 
@@ -72,6 +73,9 @@ async def widget_auth(site_id: str, request: Request, db: Session = Depends(get_
     if not voice:
         raise HTTPException(status_code=500, detail="No hay voces activas disponibles")
 
+    # Agenda la síntesis del saludo si aún no existe, antes de que se abra el WebSocket
+    canned_audio.greeting(user, voice.model_file)
+
     # 5. Determinar nombre del agente
     agent_name = user.full_name or user.company_name or "Agente Venzio"
 
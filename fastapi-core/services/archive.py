@@ -0,0 +1,170 @@
+import asyncio
+import fcntl
+import json
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy.orm import Session, selectinload
+
+from config import settings
+from database import SessionLocal
+from models import SessionArchive, VoiceSession
+from services import search
+
+
+class ArchiveCorrupt(Exception):
+    """El frame leído del archivo no coincide con su encabezado (largo o CRC)."""
+
+
+class ArchiveStore:
+    """
+    Archivo frío append-only en disco local: un segmento por mes de inicio de
+    sesión (sessions-YYYY-MM.vza). Cada sesión es un frame independiente
+    [magic, largo, crc32, zlib(JSON)], así que una lectura es un seek + un
+    frame sin descomprimir el resto del segmento. Nunca se reescribe un frame.
+    """
+
+    HEADER = struct.Struct(">4sII")
+    MAGIC = b"VZA1"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def append(self, segment: str, record: dict) -> tuple[int, int]:
+        """Agrega un frame al final del segmento. Returns: (offset, largo del frame)."""
+        data = zlib.compress(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"), 9)
+        frame = self.HEADER.pack(self.MAGIC, len(data), zlib.crc32(data)) + data
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / segment, "ab") as f:
+            # Varios workers pueden archivar a la vez: el lock serializa los append
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return offset, len(frame)
+
+    def read(self, segment: str, offset: int, length: int) -> dict:
+        with open(self.directory / segment, "rb") as f:
+            f.seek(offset)
+            frame = f.read(length)
+        magic, size, crc = self.HEADER.unpack_from(frame)
+        data = frame[self.HEADER.size:]
+        if magic != self.MAGIC or len(data) != size or zlib.crc32(data) != crc:
+            raise ArchiveCorrupt(f"Frame inválido en {segment}@{offset}")
+        return json.loads(zlib.decompress(data))
+
+
+# Singleton global
+archive_store = ArchiveStore(settings.archive_dir)
+
+
+def session_record(session: VoiceSession) -> dict:
+    """
+    Sesión completa (metadatos, resumen, transcripción y métricas por turno).
+    Si está archivada se lee del archivo frío; si no, se arma desde la DB.
+    """
+    if session.archive is not None:
+        return session.archive.record()
+    transcript = session.transcript
+    return {
+        "session_id": session.id,
+        "session_token": session.session_token,
+        "tenant_id": session.user_id or 0,
+        "voice_id": session.voice_id,
+        "started_at": session.started_at,
+        "ended_at": session.ended_at,
+        "status": session.status,
+        "duration_seconds": session.duration_seconds,
+        "summary": session.summary,
+        "transcript": transcript.splitlines() if transcript else [],
+        "turns": [
+            {
+                "turn_index": turn.turn_index,
+                "outcome": turn.outcome,
+                "stt_ms": turn.stt_ms,
+                "llm_ms": turn.llm_ms,
+                "tts_ms": turn.tts_ms,
+                "total_ms": turn.total_ms,
+                "prompt_tokens": turn.prompt_tokens,
+                "completion_tokens": turn.completion_tokens,
+            }
+            for turn in session.turns
+        ],
+    }
+
+
+def archive_session(db: Session, session: VoiceSession) -> int:
+    """
+    Escribe la sesión en el archivo frío y deja en la DB solo el stub (metadatos
+    de voice_sessions + ubicación en session_archives). El frame se escribe antes
+    del commit: si la DB falla queda un frame huérfano, que es inofensivo.
+    Returns: bytes del frame.
+    """
+    record = session_record(session)
+    started = session.started_at or datetime.utcnow()
+    segment = f"sessions-{started:%Y-%m}.vza"
+    offset, length = archive_store.append(segment, record)
+    session.archive = SessionArchive(
+        session_id=session.id, tenant_id=session.user_id or 0,
+        segment=segment, offset=offset, length=length,
+    )
+    session.turns.clear()
+    session.compressed = None
+    session.legacy_transcript = None
+    session.summary = None
+    search.remove(db, [session.id])
+    return length
+
+
+def archive_sessions(older_than_days: int, batch: int = 100) -> dict:
+    """Archiva las sesiones terminadas hace más de `older_than_days` días."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    db = SessionLocal()
+    sessions = archived_bytes = 0
+    try:
+        while True:
+            pending = (
+                db.query(VoiceSession)
+                .options(selectinload(VoiceSession.turns), selectinload(VoiceSession.compressed))
+                .filter(
+                    VoiceSession.status != "active",
+                    VoiceSession.ended_at < cutoff.replace(tzinfo=None),
+                    ~VoiceSession.archive.has(),
+                )
+                .order_by(VoiceSession.id)
+                .limit(batch)
+                .all()
+            )
+            if not pending:
+                break
+            for session in pending:
+                archived_bytes += archive_session(db, session)
+                sessions += 1
+            db.commit()
+            db.expunge_all()
+            if len(pending) < batch:
+                break
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error archivando sesiones: {e}")
+    finally:
+        db.close()
+    if sessions:
+        logger.info(f"Sesiones archivadas: {sessions} | {archived_bytes} bytes en {settings.archive_dir}")
+    return {"sessions": sessions, "bytes": archived_bytes}
+
+
+async def archive_loop() -> None:
+    """Aplica la retención periódicamente en un hilo aparte (DB, zlib y fsync bloquean)."""
+    while True:
+        await asyncio.to_thread(archive_sessions, settings.archive_after_days)
+        await asyncio.sleep(settings.archive_interval)
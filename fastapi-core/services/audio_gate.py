@@ -0,0 +1,117 @@
+import io
+import wave
+
+import numpy as np
+from loguru import logger
+
+from config import settings
+
+
+class AudioGate:
+    """
+    Filtro de energía previo al STT. Analiza el WAV PCM16 del widget por
+    tramas y descarta los clips sin voz antes de cualquier salto de red.
+    Opcionalmente recorta el silencio inicial y final para achicar el payload.
+    Audios que no son WAV PCM16 pasan sin tocar.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self.trimmed = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def _decode(audio_bytes: bytes) -> tuple[np.ndarray, int, int] | None:
+        """Devuelve (muestras int16 [n, canales], sample_rate, canales) o None si no es WAV PCM16."""
+        if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+            return None
+        try:
+            with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+                if wav.getsampwidth() != 2:
+                    return None
+                channels = wav.getnchannels()
+                rate = wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError, ValueError):
+            return None
+        if channels < 1:
+            return None
+        # Un WAV truncado puede cortar en medio de una trama: descartar el resto
+        frame_bytes = 2 * channels
+        frames = frames[: len(frames) // frame_bytes * frame_bytes]
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)
+        return samples, rate, channels
+
+    @staticmethod
+    def _encode(samples: np.ndarray, rate: int, channels: int) -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(samples.astype("<i2").tobytes())
+        return buffer.getvalue()
+
+    @staticmethod
+    def frame_rms(samples: np.ndarray, rate: int) -> tuple[np.ndarray, int]:
+        """RMS normalizado (0-1) por trama de audio_gate_frame_ms, vectorizado. Devuelve (rms, tamaño de trama)."""
+        frame_len = max(int(rate * settings.audio_gate_frame_ms / 1000), 1)
+        mono = samples.mean(axis=1, dtype=np.float32) / 32768.0
+        n_frames = len(mono) // frame_len
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float32), frame_len
+        frames = mono[: n_frames * frame_len].reshape(n_frames, frame_len)
+        return np.sqrt(np.mean(frames * frames, axis=1)), frame_len
+
+    def check(self, audio_bytes: bytes) -> tuple[bool, bytes]:
+        """
+        Evalúa un clip antes de enviarlo al STT.
+        Returns:
+            (tiene_voz, audio a enviar — recortado si audio_trim_enabled)
+        """
+        if not settings.audio_gate_enabled:
+            return True, audio_bytes
+        decoded = self._decode(audio_bytes)
+        if decoded is None:
+            return True, audio_bytes
+
+        samples, rate, channels = decoded
+        self.checked += 1
+        rms, frame_len = self.frame_rms(samples, rate)
+        voiced = rms > settings.audio_gate_rms_threshold
+        voiced_ms = int(voiced.sum()) * settings.audio_gate_frame_ms
+        ratio = float(voiced.mean()) if len(voiced) else 0.0
+
+        if voiced_ms < settings.audio_gate_min_speech_ms or ratio < settings.audio_gate_min_speech_ratio:
+            self.rejected += 1
+            logger.debug(f"Audio descartado por silencio: voz={voiced_ms}ms ratio={ratio:.2f}")
+            return False, audio_bytes
+
+        if not settings.audio_trim_enabled:
+            return True, audio_bytes
+
+        # Recortar silencio inicial/final dejando un margen
+        idx = np.flatnonzero(voiced)
+        pad = int(settings.audio_trim_padding_ms / settings.audio_gate_frame_ms)
+        first = max(int(idx[0]) - pad, 0) * frame_len
+        last = min((int(idx[-1]) + 1 + pad) * frame_len, len(samples))
+        if first == 0 and last == len(samples):
+            return True, audio_bytes
+
+        trimmed = self._encode(samples[first:last], rate, channels)
+        self.trimmed += 1
+        self.bytes_saved += len(audio_bytes) - len(trimmed)
+        return True, trimmed
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "trimmed": self.trimmed,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+# Singleton global
+audio_gate = AudioGate()
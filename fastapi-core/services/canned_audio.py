@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+
+from loguru import logger
+
+from config import settings
+from services import tts_client
+
+
+def greeting_text(user) -> str:
+    """Frase de bienvenida del cliente a partir de su empresa o nombre."""
+    name = user.company_name or user.full_name or "nosotros"
+    return settings.greeting_template.format(name=name)
+
+
+class CannedAudio:
+    """
+    Audio pre-sintetizado listo para enviar: saludo por cliente y frases de
+    relleno por voz. Se genera en segundo plano cuando cambia el perfil del
+    cliente o la voz, nunca dentro del turno de conversación.
+    """
+
+    def __init__(self):
+        self._greetings: dict[tuple[int, str], tuple[str, bytes]] = {}  # (user_id, voz) -> (texto, wav)
+        self._fillers: dict[str, list[bytes]] = {}  # voz -> wavs
+        self._filler_cycle = itertools.count()
+        self._pending: set[tuple] = set()
+        self._tasks: set[asyncio.Task] = set()  # referencias: el loop solo guarda referencias débiles
+
+    # ── Lectura (hot path) ────────────────────────────────────────────────────
+    def greeting(self, user, voice_model: str) -> tuple[str, bytes] | None:
+        """
+        Devuelve (texto, audio) del saludo si ya está sintetizado para este texto y voz.
+        Si falta o quedó desactualizado, agenda su síntesis y devuelve None.
+        """
+        text = greeting_text(user)
+        entry = self._greetings.get((user.id, voice_model))
+        if entry and entry[0] == text:
+            return entry
+        self.schedule(self.prepare_greetings(user.id, text, [voice_model]))
+        return None
+
+    def filler(self, voice_model: str) -> bytes | None:
+        """Devuelve una frase de relleno de la voz (rotando) o None si aún no existe."""
+        fillers = self._fillers.get(voice_model)
+        if not fillers:
+            self.schedule(self.prepare_fillers(voice_model))
+            return None
+        return fillers[next(self._filler_cycle) % len(fillers)]
+
+    # ── Preparación (segundo plano) ───────────────────────────────────────────
+    def schedule(self, coro) -> None:
+        """Lanza una preparación en el event loop actual sin esperarla."""
+        try:
+            task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()  # Sin loop (p.ej. desde un hilo): se generará en el próximo acceso
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def prepare_greetings(self, user_id: int, text: str, voice_models: list[str]) -> None:
+        """Sintetiza el saludo del cliente para cada voz indicada."""
+        if not settings.greeting_enabled:
+            return
+        for voice_model in voice_models:
+            key = ("greeting", user_id, voice_model, text)
+            if key in self._pending:
+                continue
+            self._pending.add(key)
+            try:
+                audio = await tts_client.synthesize(text, voice_model)
+                self._greetings[(user_id, voice_model)] = (text, audio)
+                logger.debug(f"Saludo pre-sintetizado (user={user_id}, voz={voice_model})")
+            except Exception as e:
+                logger.warning(f"No se pudo pre-sintetizar el saludo de user={user_id}: {e}")
+            finally:
+                self._pending.discard(key)
+
+    async def prepare_fillers(self, voice_model: str) -> None:
+        """Sintetiza las frases de relleno de una voz."""
+        if not settings.filler_enabled:
+            return
+        key = ("fillers", voice_model)
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        try:
+            fillers = []
+            for phrase in settings.filler_phrases_list:
+                fillers.append(await tts_client.synthesize(phrase, voice_model))
+            self._fillers[voice_model] = fillers
+            logger.debug(f"Rellenos pre-sintetizados para voz {voice_model}: {len(fillers)}")
+        except Exception as e:
+            logger.warning(f"No se pudieron pre-sintetizar rellenos para {voice_model}: {e}")
+        finally:
+            self._pending.discard(key)
+
+    def forget_voice(self, voice_model: str) -> None:
+        """Descarta el audio de una voz (p.ej. al desactivarla o cambiar su modelo)."""
+        self._fillers.pop(voice_model, None)
+        for key in [k for k in self._greetings if k[1] == voice_model]:
+            del self._greetings[key]
+
+
+# Singleton global
+canned_audio = CannedAudio()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from config import settings
+
+CAPTURE_FORMAT = "venzio-capture/1"
+
+
+class SessionCapture:
+    """
+    Grabación opcional de una sesión de voz para reproducirla luego con
+    loadtest/replay.py. Formato en disco (un directorio por sesión):
+
+        {capture_dir}/{YYYY-MM-DD}/{session_token}/
+            session.json     metadatos + turnos (texto, timings, offsets)
+            turn_000.wav     audio entrante de cada turno
+            ...
+
+    La escritura de archivos se hace en un hilo para no bloquear el event loop.
+    """
+
+    def __init__(self, session_token: str, voice_id: int, user_id: int | None):
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self.dir = Path(settings.capture_dir) / day / session_token
+        self.started = time.perf_counter()
+        self.manifest = {
+            "format": CAPTURE_FORMAT,
+            "session_token": session_token,
+            "voice_id": voice_id,
+            "user_id": user_id,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "turns": [],
+        }
+
+    def offset(self) -> float:
+        """Segundos desde el inicio de la sesión."""
+        return round(time.perf_counter() - self.started, 3)
+
+    def _write(self, name: str, data: bytes) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / name).write_bytes(data)
+
+    async def record_turn(self, audio_bytes: bytes, turn: dict) -> None:
+        """Guarda el audio del turno y agrega su registro al manifiesto."""
+        index = len(self.manifest["turns"])
+        audio_name = f"turn_{index:03d}.wav"
+        try:
+            await asyncio.to_thread(self._write, audio_name, audio_bytes)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el audio capturado: {e}")
+            return
+        self.manifest["turns"].append({"index": index, "audio": audio_name, **turn})
+
+    async def close(self, status: str, duration_seconds: int) -> None:
+        """Escribe session.json con el resultado final de la sesión."""
+        if not self.manifest["turns"]:
+            return
+        self.manifest["status"] = status
+        self.manifest["duration_seconds"] = duration_seconds
+        data = json.dumps(self.manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        try:
+            await asyncio.to_thread(self._write, "session.json", data)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la captura de sesión: {e}")
+
+
+def start_capture(session_token: str, voice_id: int, user_id: int | None) -> SessionCapture | None:
+    """Devuelve una captura si está habilitada y la sesión cae en la muestra."""
+    if not settings.capture_enabled or random.random() >= settings.capture_sample_rate:
+        return None
+    return SessionCapture(session_token, voice_id, user_id)
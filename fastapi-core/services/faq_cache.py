@@ -0,0 +1,169 @@
+import hashlib
+import re
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+from loguru import logger
+
+from config import settings
+from services import llm
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni signos de puntuación, espacios colapsados."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+# Palabras que no cambian la pregunta (artículos, preposiciones, cortesía). Las
+# letras sueltas no están: "producto A" y "producto B" son preguntas distintas
+_FILLER_WORDS = frozenset("""
+    al con de del el en es la las lo los me mi para por se su un una unos unas
+    hola buenas buenos dias tardes noches favor gracias quiero quisiera saber
+""".split())
+
+
+def content_words(text: str) -> frozenset[str]:
+    """Palabras con contenido de la pregunta (normalizadas, sin relleno)."""
+    return frozenset(w for w in _normalize(text).split() if w not in _FILLER_WORDS)
+
+
+def embed(text: str, dim: int | None = None) -> np.ndarray:
+    """
+    Vector de n-gramas de caracteres con hashing (feature hashing), normalizado L2.
+    Barato, determinista y sin modelos externos: suficiente para detectar
+    preguntas repetidas con distinta puntuación o pequeñas variaciones.
+    """
+    dim = dim or settings.faq_cache_dim
+    vec = np.zeros(dim, dtype=np.float32)
+    padded = f" {_normalize(text)} "
+    n = 3
+    for i in range(max(len(padded) - n + 1, 1)):
+        h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+class _TenantIndex:
+    """Índice en memoria de un cliente: matriz de embeddings + respuestas listas para enviar."""
+
+    def __init__(self, prompt_hash: str, dim: int):
+        self.prompt_hash = prompt_hash
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.created = np.empty(0, dtype=np.float64)
+        self.words: list[frozenset[str]] = []
+        self.replies: list[str] = []
+        self.audios: list[bytes] = []
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self.vectors = self.vectors[mask]
+        self.created = self.created[mask]
+        idx = np.flatnonzero(mask)
+        self.words = [self.words[i] for i in idx]
+        self.replies = [self.replies[i] for i in idx]
+        self.audios = [self.audios[i] for i in idx]
+
+    def match(self, vec: np.ndarray, words: frozenset[str]) -> tuple[int, float] | None:
+        """
+        Entrada equivalente a la pregunta: (posición, score) o None. Además del
+        coseno de n-gramas pide las mismas palabras con contenido, porque dos
+        preguntas que difieren en un producto, plan o cantidad dan un coseno
+        alto y no tienen la misma respuesta.
+        """
+        if not self.replies:
+            return None
+        scores = self.vectors @ vec
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < settings.faq_cache_threshold:
+                return None
+            if self.words[i] == words:
+                return int(i), float(scores[i])
+        return None
+
+    def expire(self, now: float, ttl: float) -> None:
+        alive = (now - self.created) < ttl
+        if not alive.all():
+            self._keep(alive)
+
+
+class FAQCache:
+    """
+    Caché semántica de respuestas por cliente para preguntas de primer turno.
+    Cada entrada guarda el texto de respuesta y su audio ya sintetizado.
+    El índice de cada cliente va atado al hash de su system prompt: si el
+    master_prompt cambia (en este worker o en otro) las respuestas viejas no se usan.
+    """
+
+    def __init__(self):
+        self._tenants: dict[tuple[int, str], _TenantIndex] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _index(self, user_id: int, voice_model: str, master_prompt: str | None) -> _TenantIndex:
+        key = (user_id, voice_model)
+        prompt_hash = hashlib.sha256(llm.build_system_prompt(master_prompt).encode("utf-8")).hexdigest()
+        index = self._tenants.get(key)
+        if index is None or index.prompt_hash != prompt_hash:
+            index = _TenantIndex(prompt_hash, settings.faq_cache_dim)
+            self._tenants[key] = index
+        return index
+
+    def lookup(self, user_id: int, voice_model: str, master_prompt: str | None,
+               question: str) -> tuple[str, bytes] | None:
+        """
+        Busca una pregunta equivalente ya respondida con el mismo prompt.
+        Returns:
+            (texto de respuesta, audio WAV) o None si no hay coincidencia
+        """
+        index = self._index(user_id, voice_model, master_prompt)
+        index.expire(time.time(), settings.faq_cache_ttl_seconds)
+        found = index.match(embed(question), content_words(question))
+        if found is None:
+            self.misses += 1
+            return None
+
+        best, score = found
+        self.hits += 1
+        logger.debug(f"FAQ cache hit (user={user_id}, score={score:.3f})")
+        return index.replies[best], index.audios[best]
+
+    def store(self, user_id: int, voice_model: str, master_prompt: str | None,
+              question: str, reply: str, audio: bytes) -> None:
+        """Guarda una respuesta de primer turno con su audio sintetizado."""
+        index = self._index(user_id, voice_model, master_prompt)
+        vec = embed(question)
+        words = content_words(question)
+        if index.match(vec, words) is not None:
+            return  # Ya hay una respuesta equivalente
+
+        if len(index.replies) >= settings.faq_cache_max_entries:
+            # Descartar la entrada más antigua
+            keep = np.ones(len(index.replies), dtype=bool)
+            keep[int(np.argmin(index.created))] = False
+            index._keep(keep)
+
+        index.vectors = np.vstack([index.vectors, vec[None, :]])
+        index.created = np.append(index.created, time.time())
+        index.words.append(words)
+        index.replies.append(reply)
+        index.audios.append(audio)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": sum(len(i.replies) for i in self._tenants.values()),
+        }
+
+
+# Singleton global
+faq_cache = FAQCache()
@@ -1,9 +1,24 @@
+import asyncio
+import random
+import time
+from collections import deque
 from typing import List, Optional
 from openai import AsyncOpenAI
 from loguru import logger
 from config import settings
 
-client = AsyncOpenAI(api_key=settings.openai_api_key)
+client = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+
+# Cliente secundario (otro modelo y/o endpoint) para cuando el principal se demora
+fallback_client: AsyncOpenAI | None = None
+if settings.llm_fallback_model:
+    if settings.llm_fallback_base_url or settings.llm_fallback_api_key:
+        fallback_client = AsyncOpenAI(
+            api_key=settings.llm_fallback_api_key or settings.openai_api_key,
+            base_url=settings.llm_fallback_base_url or None,
+        )
+    else:
+        fallback_client = client
 
 # Instrucciones base que SIEMPRE se aplican — no negociables
 BASE_INSTRUCTIONS = """Eres un agente de ventas virtual que atiende consultas por voz para un negocio específico.
@@ -28,11 +43,80 @@ def build_system_prompt(master_prompt: str | None = None) -> str:
     return system_prompt
 
 
+# ── Caché de system prompts compilados por cliente ───────────────────────────
+# user_id -> (versión, master_prompt fuente, mensaje system ya construido)
+_prompt_cache: dict[int, tuple[int, str | None, dict]] = {}
+# user_id -> versión actual; se incrementa cada vez que cambia el master_prompt
+_prompt_versions: dict[int, int] = {}
+
+
+def invalidate_system_prompt(user_id: int) -> int:
+    """
+    Invalida el system prompt compilado de un cliente.
+    Debe llamarse siempre que se modifique su master_prompt.
+    Returns:
+        nueva versión del prompt del cliente
+    """
+    version = _prompt_versions.get(user_id, 0) + 1
+    _prompt_versions[user_id] = version
+    _prompt_cache.pop(user_id, None)
+    return version
+
+
+def prompt_version(user_id: int) -> int:
+    """Devuelve la versión actual del prompt de un cliente (0 si nunca cambió)."""
+    return _prompt_versions.get(user_id, 0)
+
+
+def get_system_message(master_prompt: str | None = None, user_id: int | None = None) -> dict:
+    """
+    Devuelve el mensaje system compilado, reutilizando la caché del cliente.
+    Sin user_id se compila en el momento (sin caché).
+    Si el master_prompt recibido no coincide con el compilado, se recompila.
+    """
+    if user_id is None:
+        return {"role": "system", "content": build_system_prompt(master_prompt)}
+
+    version = _prompt_versions.get(user_id, 0)
+    cached = _prompt_cache.get(user_id)
+    if cached and cached[0] == version and cached[1] == master_prompt:
+        return cached[2]
+
+    system_message = {"role": "system", "content": build_system_prompt(master_prompt)}
+    _prompt_cache[user_id] = (version, master_prompt, system_message)
+    return system_message
+
+
+def build_messages(system_message: dict, messages: list[dict]) -> list[dict]:
+    """
+    Construye la lista de mensajes en forma canónica: system primero y
+    luego el historial con solo role/content, siempre en el mismo orden.
+    Un prefijo idéntico entre turnos permite que OpenAI reutilice su prompt cache.
+    """
+    return [system_message] + [
+        {"role": m["role"], "content": m["content"]} for m in messages
+    ]
+
+
+def _log_prompt_sample(system_message: dict, messages: list[dict], user_id: int | None) -> None:
+    """Hook de depuración: registra el prompt completo solo para una muestra de llamadas."""
+    rate = settings.llm_prompt_log_sample_rate
+    if rate <= 0 or random.random() >= rate:
+        return
+    logger.bind(category="llm.prompt").debug(
+        f"LLM prompt (user={user_id}, v={prompt_version(user_id) if user_id else 0}, "
+        f"{len(messages)} mensajes): '{system_message['content']}'"
+    )
+
+
 async def chat_completion(
     messages: list[dict],
     master_prompt: str | None = None,
     max_tokens: Optional[int] = None,
     temperature: Optional[float] = None,
+    user_id: int | None = None,
+    usage: dict | None = None,
+    tail_control: bool = True,
 ) -> str:
     """
     Llama a GPT-4o mini con historial de conversación y devuelve la respuesta.
@@ -41,35 +125,184 @@ async def chat_completion(
         master_prompt: prompt maestro personalizado (opcional)
         max_tokens: límite de tokens (usa config por defecto)
         temperature: temperatura (usa config por defecto)
+        user_id: cliente dueño del prompt, para cachear el system prompt compilado
+        usage: si se pasa, se completa con prompt_tokens/completion_tokens de la respuesta
+        tail_control: hedging/fallback y estadísticas de latencia; False para
+            llamadas fuera de la conversación (no cuentan para el p95 de los turnos)
     Returns:
         string con la respuesta del LLM
     """
-    system_prompt = build_system_prompt(master_prompt)
-
-    # Logging para verificar que master_prompt llega correctamente
-    logger.info(f"MASTER_PROMPT: '{master_prompt}'")
-    logger.info(f"SYSTEM_PROMPT: '{system_prompt[:300]}...'")
+    system_message = get_system_message(master_prompt, user_id)
+    _log_prompt_sample(system_message, messages, user_id)
 
-    full_messages = [
-        {"role": "system", "content": system_prompt},
-    ] + messages
+    full_messages = build_messages(system_message, messages)
 
+    params = {
+        "messages": full_messages,
+        "max_tokens": max_tokens or settings.llm_max_tokens,
+        "temperature": temperature if temperature is not None else settings.llm_temperature,
+    }
     try:
-        response = await client.chat.completions.create(
-            model=settings.llm_model,
-            messages=full_messages,
-            max_tokens=max_tokens or settings.llm_max_tokens,
-            temperature=temperature if temperature is not None else settings.llm_temperature,
-            timeout=settings.llm_timeout,
-        )
-        reply = response.choices[0].message.content or ""
+        if tail_control:
+            reply, tokens = await _completion_with_tail_control(**params)
+        else:
+            reply, tokens = await _create(client, settings.llm_model, False, **params)
         logger.debug(f"LLM reply ({len(reply)} chars): '{reply[:100]}...'")
+        if usage is not None:
+            usage.update(tokens)
         return reply.strip()
+    except asyncio.TimeoutError as e:
+        logger.error(f"LLM sin respuesta tras {settings.llm_timeout}s")
+        raise RuntimeError("El asistente tardó demasiado en responder") from e
     except Exception as e:
         logger.error(f"Error en LLM: {e}")
         raise RuntimeError(f"Error al comunicarse con el LLM: {e}") from e
 
 
+# ── Control de latencia de cola: hedging + fallback ─────────────────────────
+class _LLMStats:
+    """Latencias recientes del modelo principal y contadores de hedging/fallback."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.fallback_wins = 0
+        self.last_activity = 0.0
+
+    def percentile(self, q: float) -> float | None:
+        """Percentil q (0-1) de las latencias recientes; None si hay pocas muestras."""
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def hedge_delay(self) -> float:
+        p = self.percentile(settings.llm_hedge_percentile)
+        return max(p if p is not None else settings.llm_hedge_min_delay, settings.llm_hedge_min_delay)
+
+    def as_dict(self) -> dict:
+        p95 = self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else 0.0,
+            "fallbacks": self.fallbacks,
+            "fallback_wins": self.fallback_wins,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+llm_stats = _LLMStats()
+
+
+async def _create(api: AsyncOpenAI, model: str, record: bool, **kwargs) -> tuple[str, dict]:
+    start = time.monotonic()
+    try:
+        response = await api.chat.completions.create(
+            model=model,
+            timeout=settings.llm_timeout,
+            **kwargs,
+        )
+    except asyncio.CancelledError:
+        # Perdió contra otra petición o venció el timeout: tardó al menos esto.
+        # Sin esta muestra (censurada) el p95 solo vería las respuestas rápidas
+        if record:
+            llm_stats.latencies.append(time.monotonic() - start)
+        raise
+    if record:
+        llm_stats.latencies.append(time.monotonic() - start)
+    tokens = getattr(response, "usage", None)
+    usage = {
+        "prompt_tokens": tokens.prompt_tokens,
+        "completion_tokens": tokens.completion_tokens,
+    } if tokens else {}
+    return response.choices[0].message.content or "", usage
+
+
+async def _completion_with_tail_control(**kwargs) -> tuple[str, dict]:
+    """
+    Lanza la petición principal y, si tarda más que el p95 reciente, una
+    segunda idéntica (hedge); pasado llm_fallback_after se suma el modelo
+    secundario. Gana la primera respuesta correcta y el resto se cancela.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + settings.llm_timeout
+    hedge_at = start + llm_stats.hedge_delay() if settings.llm_hedge_enabled else None
+    fallback_at = start + settings.llm_fallback_after if fallback_client else None
+
+    llm_stats.calls += 1
+    llm_stats.last_activity = time.monotonic()
+    tasks = {asyncio.create_task(_create(client, settings.llm_model, True, **kwargs)): "primary"}
+    last_error: BaseException | None = None
+
+    try:
+        while True:
+            now = loop.time()
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                llm_stats.hedged += 1
+                tasks[asyncio.create_task(_create(client, settings.llm_model, True, **kwargs))] = "hedge"
+            if fallback_at is not None and (now >= fallback_at or not tasks):
+                fallback_at = None
+                llm_stats.fallbacks += 1
+                tasks[asyncio.create_task(
+                    _create(fallback_client, settings.llm_fallback_model, False, **kwargs)
+                )] = "fallback"
+            if not tasks:
+                raise last_error
+            if now >= deadline:
+                raise asyncio.TimeoutError()
+
+            wake = min(t for t in (hedge_at, fallback_at, deadline) if t is not None)
+            done, _ = await asyncio.wait(
+                tasks, timeout=max(wake - now, 0), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                kind = tasks.pop(task)
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    logger.warning(f"LLM ({kind}) falló: {last_error}")
+                    continue
+                if kind == "hedge":
+                    llm_stats.hedge_wins += 1
+                elif kind == "fallback":
+                    llm_stats.fallback_wins += 1
+                return task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        llm_stats.last_activity = time.monotonic()
+
+
+# ── Conexión caliente con el proveedor ───────────────────────────────────────
+async def warmup() -> None:
+    """Abre la conexión HTTP con el proveedor (TLS incluido) antes del primer turno."""
+    apis = {id(client): client}
+    if fallback_client:
+        apis[id(fallback_client)] = fallback_client
+    for api in apis.values():
+        try:
+            await api.models.list(timeout=10)
+        except Exception as e:
+            logger.warning(f"No se pudo precalentar la conexión LLM: {e}")
+    llm_stats.last_activity = time.monotonic()
+
+
+async def keepalive_loop() -> None:
+    """Mantiene viva la conexión con un ping ligero cuando el worker está ocioso."""
+    interval = settings.llm_keepalive_interval
+    while True:
+        await asyncio.sleep(interval)
+        if time.monotonic() - llm_stats.last_activity >= interval:
+            await warmup()
+
+
 async def generate_summary(transcript: str) -> str:
     """Genera un resumen ejecutivo de la conversación para enviar vía webhook."""
     messages = [
@@ -87,4 +320,5 @@ async def generate_summary(transcript: str) -> str:
         master_prompt="Eres un analista de ventas. Responde en español con bullet points simples.",
         max_tokens=300,
         temperature=0.3,
+        tail_control=False,
     )
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import DailyStats, SessionArchive, SessionTurn, VoiceSession
+
+ERROR_OUTCOMES = ("error", "tts_error")
+# Turnos con respuesta: entran al promedio de latencia
+ANSWERED_OUTCOMES = ("ok", "faq_cache")
+
+FIELDS = ("sessions", "seconds", "turns", "errors", "latency_ms_sum", "latency_samples")
+
+# Serializa el cierre de sesiones con el backfill: sin él, una sesión que se
+# cierra mientras se recalcula su día se pierde (el backfill borra la fila que
+# acaba de incrementar) o se cuenta dos veces
+_lock = threading.Lock()
+
+
+def _turn_totals():
+    """Subconsulta por sesión: turnos, errores y latencia de los turnos respondidos."""
+    answered = SessionTurn.outcome.in_(ANSWERED_OUTCOMES) & SessionTurn.total_ms.isnot(None)
+    return (
+        select(
+            SessionTurn.session_id.label("session_id"),
+            func.count(SessionTurn.id).label("turns"),
+            func.sum(case((SessionTurn.outcome.in_(ERROR_OUTCOMES), 1), else_=0)).label("errors"),
+            func.sum(case((answered, SessionTurn.total_ms), else_=0)).label("latency_ms_sum"),
+            func.sum(case((answered, 1), else_=0)).label("latency_samples"),
+        )
+        .group_by(SessionTurn.session_id)
+        .subquery()
+    )
+
+
+async def record_session(session_id: int, **fields) -> None:
+    """
+    Guarda el cierre de la sesión (`fields`: status, ended_at, duración,
+    resumen) y la suma al rollup de su día y cliente. Se llama una vez al cerrar
+    la sesión; el UPDATE con incrementos es seguro entre workers. Cierre e
+    incremento van juntos bajo el lock del backfill, así un recálculo ve la
+    sesión contada una sola vez; corre en un hilo con su propia conexión para
+    que el event loop nunca espere ese lock.
+    """
+    await asyncio.to_thread(_close_session, session_id, fields)
+
+
+def _close_session(session_id: int, fields: dict) -> None:
+    with _lock:
+        db = SessionLocal()
+        try:
+            session = db.get(VoiceSession, session_id)
+            for field, value in fields.items():
+                setattr(session, field, value)
+            db.commit()
+            _record(db, session)
+        finally:
+            db.close()
+
+
+def _record(db: Session, session: VoiceSession) -> None:
+    turns = _turn_totals()
+    row = db.execute(
+        select(turns.c.turns, turns.c.errors, turns.c.latency_ms_sum, turns.c.latency_samples)
+        .where(turns.c.session_id == session.id)
+    ).first()
+    delta = {
+        "sessions": 1,
+        "seconds": session.duration_seconds or 0,
+        "turns": row.turns if row else 0,
+        "errors": int(row.errors or 0) if row else 0,
+        "latency_ms_sum": int(row.latency_ms_sum or 0) if row else 0,
+        "latency_samples": int(row.latency_samples or 0) if row else 0,
+    }
+    day = (session.started_at or datetime.utcnow()).strftime("%Y-%m-%d")
+    try:
+        _increment(db, day, session.user_id or 0, delta)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudo actualizar el rollup de la sesión {session.session_token}: {e}")
+
+
+def _increment(db: Session, day: str, tenant_id: int, delta: dict) -> None:
+    where = (DailyStats.day == day) & (DailyStats.tenant_id == tenant_id)
+    values = {field: getattr(DailyStats, field) + amount for field, amount in delta.items()}
+    for _ in range(2):
+        if db.execute(update(DailyStats).where(where).values(**values)).rowcount:
+            db.commit()
+            return
+        try:
+            db.add(DailyStats(day=day, tenant_id=tenant_id, **delta))
+            db.commit()
+            return
+        except IntegrityError:
+            # Otro worker creó la fila entre el UPDATE y el INSERT: reintentar el UPDATE
+            db.rollback()
+
+
+def backfill(since: str | None = None) -> dict:
+    """
+    Recalcula el rollup desde voice_sessions + session_turns (todas las fechas
+    o desde `since`, YYYY-MM-DD). Reemplaza las filas del rango: sirve para la
+    carga inicial y para reparar diferencias. Los días con sesiones archivadas
+    ya no tienen sus turnos en la DB, así que el rango empieza después de ellos.
+    Cada día se recalcula en su propia transacción bajo el lock de
+    `record_session`, así el cierre de sesiones solo espera un día a la vez.
+    """
+    db = SessionLocal()
+    try:
+        archived_until = (
+            db.query(func.max(VoiceSession.started_at))
+            .join(SessionArchive, SessionArchive.session_id == VoiceSession.id)
+            .scalar()
+        )
+        if archived_until is not None:
+            horizon = (archived_until.date() + timedelta(days=1)).isoformat()
+            if not since or since < horizon:
+                logger.info(f"Backfill del rollup limitado a {horizon} (días anteriores archivados)")
+                since = horizon
+        session_days = db.query(func.date(VoiceSession.started_at)).filter(VoiceSession.status != "active")
+        stale_days = db.query(DailyStats.day)
+        if since:
+            session_days = session_days.filter(VoiceSession.started_at >= datetime.fromisoformat(since))
+            stale_days = stale_days.filter(DailyStats.day >= since)
+        days = sorted({str(d)[:10] for (d,) in session_days.distinct()} | {d for (d,) in stale_days.distinct()})
+
+        rows = 0
+        for day in days:
+            with _lock:
+                rows += _backfill_day(db, day)
+        logger.info(f"Rollup diario recalculado: {rows} filas en {len(days)} días (desde {since or 'el inicio'})")
+        return {"rows": rows, "since": since}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error en backfill del rollup diario: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def _backfill_day(db: Session, day: str) -> int:
+    """Reemplaza las filas de un día por lo que dicen sus sesiones (una transacción)."""
+    start = datetime.combine(date.fromisoformat(day), datetime.min.time())
+    turns = _turn_totals()
+    query = (
+        select(
+            func.coalesce(VoiceSession.user_id, 0).label("tenant_id"),
+            func.count(VoiceSession.id).label("sessions"),
+            func.coalesce(func.sum(VoiceSession.duration_seconds), 0).label("seconds"),
+            func.coalesce(func.sum(turns.c.turns), 0).label("turns"),
+            func.coalesce(func.sum(turns.c.errors), 0).label("errors"),
+            func.coalesce(func.sum(turns.c.latency_ms_sum), 0).label("latency_ms_sum"),
+            func.coalesce(func.sum(turns.c.latency_samples), 0).label("latency_samples"),
+        )
+        .outerjoin(turns, turns.c.session_id == VoiceSession.id)
+        .where(
+            VoiceSession.status != "active",
+            VoiceSession.started_at >= start,
+            VoiceSession.started_at < start + timedelta(days=1),
+        )
+        .group_by(func.coalesce(VoiceSession.user_id, 0))
+    )
+    db.query(DailyStats).filter(DailyStats.day == day).delete(synchronize_session=False)
+    rows = db.execute(query).all()
+    for row in rows:
+        db.add(DailyStats(
+            day=day, tenant_id=row.tenant_id,
+            **{field: int(getattr(row, field) or 0) for field in FIELDS},
+        ))
+    db.commit()
+    return len(rows)
+
+
+def totals(db: Session, tenant_id: int | None = None, since: str | None = None) -> dict:
+    """Suma del rollup (opcionalmente de un cliente y desde un día)."""
+    query = db.query(*(func.coalesce(func.sum(getattr(DailyStats, f)), 0) for f in FIELDS))
+    if tenant_id is not None:
+        query = query.filter(DailyStats.tenant_id == tenant_id)
+    if since:
+        query = query.filter(DailyStats.day >= since)
+    return _present(dict(zip(FIELDS, (int(v) for v in query.one()))))
+
+
+def daily(db: Session, date_from: str, date_to: str, tenant_id: int | None = None) -> list[dict]:
+    """Serie por día (todos los clientes sumados, o uno solo)."""
+    query = (
+        db.query(DailyStats.day, *(func.sum(getattr(DailyStats, f)) for f in FIELDS))
+        .filter(DailyStats.day >= date_from, DailyStats.day <= date_to)
+        .group_by(DailyStats.day)
+        .order_by(DailyStats.day)
+    )
+    if tenant_id is not None:
+        query = query.filter(DailyStats.tenant_id == tenant_id)
+    return [
+        {"day": row[0], **_present(dict(zip(FIELDS, (int(v or 0) for v in row[1:]))))}
+        for row in query.all()
+    ]
+
+
+def _present(raw: dict) -> dict:
+    return {
+        "sessions": raw["sessions"],
+        "minutes": round(raw["seconds"] / 60, 1),
+        "turns": raw["turns"],
+        "errors": raw["errors"],
+        "avg_latency_ms": round(raw["latency_ms_sum"] / raw["latency_samples"]) if raw["latency_samples"] else None,
+    }
+
+
+def month_start() -> str:
+    return datetime.utcnow().date().replace(day=1).isoformat()
+
+
+def days_ago(days: int) -> str:
+    return (datetime.utcnow().date() - timedelta(days=days)).isoformat()
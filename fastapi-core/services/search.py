@@ -0,0 +1,286 @@
+import asyncio
+import re
+
+from fastapi import HTTPException, Response
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.orm import Session, selectinload
+
+from config import settings
+from database import SessionLocal, engine
+from models import VoiceSession
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+# Índice de búsqueda: una fila por sesión terminada (texto de la conversación y
+# resumen). En SQLite es una tabla virtual FTS5 con rowid = voice_sessions.id; en
+# Postgres una tabla con tsvector generado (resumen con peso A, transcripción B)
+# e índice GIN. No es un modelo ORM porque create_all no sabe crear ninguna de las dos.
+INDEX_TABLE = "session_search"
+# Marcadores de los fragmentos: texto plano, seguros de mostrar sin escapar HTML
+HIGHLIGHT = ("«", "»")
+
+_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def _language() -> str:
+    # Va interpolado en el DDL de Postgres: solo nombres de configuración válidos
+    if not re.fullmatch(r"[a-z_]+", settings.search_language):
+        raise ValueError(f"search_language inválido: {settings.search_language!r}")
+    return settings.search_language
+
+
+def ensure_index() -> None:
+    """Crea el índice si no existe (se llama al arrancar, después de init_db)."""
+    with engine.begin() as conn:
+        if _dialect(conn) == "sqlite":
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+                "transcript, summary, tenant_id UNINDEXED, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+            # Ranking por defecto de la columna `rank`: BM25 con el resumen pesando el doble
+            conn.execute(text(
+                f"INSERT INTO {INDEX_TABLE}({INDEX_TABLE}, rank) VALUES('rank', 'bm25(1.0, 2.0, 0.0)')"
+            ))
+        else:
+            language = _language()
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+                "session_id INTEGER PRIMARY KEY REFERENCES voice_sessions(id) ON DELETE CASCADE, "
+                "tenant_id INTEGER NOT NULL DEFAULT 0, "
+                "transcript TEXT NOT NULL DEFAULT '', "
+                "summary TEXT NOT NULL DEFAULT '', "
+                "document tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{language}', summary), 'A') || "
+                f"setweight(to_tsvector('{language}', transcript), 'B')) STORED)"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document ON {INDEX_TABLE} USING GIN (document)"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_tenant ON {INDEX_TABLE} (tenant_id)"
+            ))
+
+
+def is_empty(db: Session) -> bool:
+    return db.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first() is None
+
+
+def _upsert(db: Session, session: VoiceSession) -> bool:
+    transcript = session.transcript or ""
+    summary = session.summary or ""
+    if not transcript and not summary:
+        return False
+    params = {
+        "id": session.id,
+        "tenant": session.user_id or 0,
+        "transcript": transcript,
+        "summary": summary,
+    }
+    if _dialect(db.get_bind()) == "sqlite":
+        db.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :id"), params)
+        db.execute(text(
+            f"INSERT INTO {INDEX_TABLE}(rowid, transcript, summary, tenant_id) "
+            "VALUES (:id, :transcript, :summary, :tenant)"
+        ), params)
+    else:
+        db.execute(text(
+            f"INSERT INTO {INDEX_TABLE}(session_id, tenant_id, transcript, summary) "
+            "VALUES (:id, :tenant, :transcript, :summary) "
+            "ON CONFLICT (session_id) DO UPDATE SET tenant_id = EXCLUDED.tenant_id, "
+            "transcript = EXCLUDED.transcript, summary = EXCLUDED.summary"
+        ), params)
+    return True
+
+
+def remove(db: Session, session_ids: list[int]) -> None:
+    """Saca sesiones del índice (sin commit: va en la transacción de quien llama)."""
+    key = "rowid" if _dialect(db.get_bind()) == "sqlite" else "session_id"
+    for session_id in session_ids:
+        db.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE {key} = :id"), {"id": session_id})
+
+
+async def index_session(session_id: int) -> None:
+    """
+    Indexa una sesión terminada (transcripción + resumen). Se llama al cerrarla,
+    en un hilo con su propia conexión (no frena el event loop).
+    """
+    await asyncio.to_thread(_index_session, session_id)
+
+
+def _index_session(session_id: int) -> None:
+    db = SessionLocal()
+    try:
+        if _upsert(db, db.get(VoiceSession, session_id)):
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudo indexar la sesión {session_id}: {e}")
+    finally:
+        db.close()
+
+
+def reindex(batch: int = 500) -> dict:
+    """
+    Reconstruye el índice desde voice_sessions (sesiones terminadas y no
+    archivadas, por lotes de id). Sirve para la carga inicial y para reparar diferencias.
+    """
+    db = SessionLocal()
+    indexed = last_id = 0
+    try:
+        while True:
+            sessions = (
+                db.query(VoiceSession)
+                .options(selectinload(VoiceSession.turns), selectinload(VoiceSession.compressed))
+                .filter(
+                    VoiceSession.status != "active",
+                    VoiceSession.id > last_id,
+                    ~VoiceSession.archive.has(),
+                )
+                .order_by(VoiceSession.id)
+                .limit(batch)
+                .all()
+            )
+            if not sessions:
+                break
+            indexed += sum(_upsert(db, session) for session in sessions)
+            db.commit()
+            last_id = sessions[-1].id
+            db.expunge_all()
+        logger.info(f"Índice de búsqueda reconstruido: {indexed} sesiones")
+        return {"indexed": indexed}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error reconstruyendo el índice de búsqueda: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def fts_query(q: str) -> str:
+    """
+    Consulta del usuario → sintaxis FTS5 sin operadores sueltos: cada palabra o
+    "frase entre comillas" se cita (todas deben aparecer) y `palabra*` busca por prefijo.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(q):
+        prefix = bool(word) and word.endswith("*")
+        term = (phrase or word).replace('"', "").rstrip("*").strip()
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search(
+    db: Session,
+    q: str,
+    response: Response,
+    tenant_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = 20,
+) -> list[dict]:
+    """
+    Sesiones que coinciden con `q`, de mayor a menor relevancia (BM25 en SQLite,
+    ts_rank_cd en Postgres), con fragmentos resaltados de transcripción y resumen.
+    Paginación por keyset sobre (score, id) con el header X-Next-Cursor.
+    """
+    sqlite = _dialect(db.get_bind()) == "sqlite"
+    query = fts_query(q) if sqlite else q.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="La búsqueda está vacía")
+
+    params = {"q": query, "limit": limit + 1}
+    if sqlite:
+        # `rank` es BM25 (más negativo = mejor): se invierte para ordenar igual que Postgres
+        ranked = (
+            f"SELECT rowid AS session_id, -rank AS score FROM {INDEX_TABLE} "
+            f"WHERE {INDEX_TABLE} MATCH :q"
+        )
+        if tenant_id is not None:
+            ranked += " AND tenant_id = :tenant"
+    else:
+        params["language"] = _language()
+        ranked = (
+            f"SELECT session_id, ts_rank_cd(document, query, 32)::float8 AS score "
+            f"FROM {INDEX_TABLE}, websearch_to_tsquery(CAST(:language AS regconfig), :q) query "
+            "WHERE document @@ query"
+        )
+        if tenant_id is not None:
+            ranked += " AND tenant_id = :tenant"
+    if tenant_id is not None:
+        params["tenant"] = tenant_id
+
+    after = ""
+    if cursor:
+        params["score"], params["last_id"] = decode_cursor(cursor)
+        after = "WHERE score < :score OR (score = :score AND session_id > :last_id) "
+    page_sql = (
+        f"SELECT session_id, score FROM ({ranked}) ranked {after}"
+        "ORDER BY score DESC, session_id LIMIT :limit"
+    )
+    try:
+        rows = db.execute(text(page_sql), params).all()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Búsqueda inválida {q!r}: {e}")
+        raise HTTPException(status_code=400, detail="No se pudo interpretar la búsqueda")
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].score, rows[-1].session_id])
+    if not rows:
+        return []
+
+    # Fragmentos solo para las filas de la página (ts_headline/snippet son lo caro)
+    ids = [row.session_id for row in rows]
+    snippets = _snippets(db, sqlite, params, ids)
+    sessions = {
+        s.id: s for s in
+        db.query(VoiceSession).options(selectinload(VoiceSession.voice)).filter(VoiceSession.id.in_(ids)).all()
+    }
+    results = []
+    for row in rows:
+        session = sessions.get(row.session_id)
+        if session is None:
+            continue
+        transcript_snippet, summary_snippet = snippets.get(row.session_id, (None, None))
+        results.append({
+            "session_id": session.id,
+            "session_token": session.session_token,
+            "user_id": session.user_id,
+            "voice": session.voice.name if session.voice else None,
+            "started_at": session.started_at,
+            "duration_seconds": session.duration_seconds,
+            "score": round(row.score, 4),
+            "transcript_snippet": transcript_snippet or None,
+            "summary_snippet": summary_snippet or None,
+        })
+    return results
+
+
+def _snippets(db: Session, sqlite: bool, params: dict, ids: list[int]) -> dict:
+    tokens = settings.search_snippet_tokens
+    placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+    params = {**params, **{f"id{i}": session_id for i, session_id in enumerate(ids)}}
+    start, stop = HIGHLIGHT
+    if sqlite:
+        sql = (
+            f"SELECT rowid, "
+            f"snippet({INDEX_TABLE}, 0, '{start}', '{stop}', '…', {tokens}), "
+            f"snippet({INDEX_TABLE}, 1, '{start}', '{stop}', '…', {tokens}) "
+            f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :q AND rowid IN ({placeholders})"
+        )
+    else:
+        options = f"StartSel={start}, StopSel={stop}, MaxWords={tokens}, MinWords={max(tokens // 3, 1)}, MaxFragments=2"
+        sql = (
+            f"SELECT session_id, "
+            f"ts_headline(CAST(:language AS regconfig), transcript, query, '{options}'), "
+            f"ts_headline(CAST(:language AS regconfig), summary, query, '{options}') "
+            f"FROM {INDEX_TABLE}, websearch_to_tsquery(CAST(:language AS regconfig), :q) query "
+            f"WHERE session_id IN ({placeholders})"
+        )
+    return {row[0]: (row[1], row[2]) for row in db.execute(text(sql), params).all()}
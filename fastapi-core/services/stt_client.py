@@ -1,36 +1,228 @@
+import asyncio
+import random
+import statistics
+import time
+
 import httpx
 from loguru import logger
 from config import settings
+from tracing import tracer
+
+HEALTH_TIMEOUT = 2.0
+# Bytes por segundo del WAV del widget (16 kHz, mono, 16 bits): normaliza la
+# latencia por largo del audio para comparar réplicas entre sí
+AUDIO_BYTES_PER_SECOND = 32000
+EWMA_ALPHA = 0.2
+OUTLIER_MIN_SAMPLES = 10
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _Replica:
+    """Una réplica de stt-service: carga, circuit breaker y latencia reciente."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0           # pedidos en curso desde este worker
+        self.remote_depth = 0          # cola de la réplica por otros workers (último /health)
+        self.state = CLOSED
+        self.failures = 0              # fallas seguidas
+        self.opened_at = 0.0
+        self.probing = False           # half-open: un solo pedido de prueba a la vez
+        self.ejected_until = 0.0
+        self.latency: float | None = None  # EWMA de segundos por segundo de audio
+        self.samples = 0
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+
+    @property
+    def load(self) -> int:
+        return self.outstanding + self.remote_depth
+
+    def available(self, now: float) -> bool:
+        if self.ejected_until > now:
+            return False
+        if self.state == OPEN and now - self.opened_at >= settings.stt_breaker_cooldown:
+            self.state = HALF_OPEN
+            logger.info(f"Réplica STT en half-open, probando: {self.url}")
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return self.state == CLOSED
+
+    def succeeded(self, seconds: float | None = None, audio_seconds: float = 1.0) -> None:
+        """La réplica respondió; `seconds` alimenta la latencia (None: error del pedido, no se mide)."""
+        if self.state != CLOSED:
+            logger.info(f"Réplica STT recuperada: {self.url}")
+        self.state = CLOSED
+        self.failures = 0
+        if seconds is None:
+            return
+        cost = seconds / audio_seconds
+        self.latency = cost if self.latency is None else EWMA_ALPHA * cost + (1 - EWMA_ALPHA) * self.latency
+        self.samples += 1
+
+    def failed(self, now: float) -> None:
+        self.errors += 1
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= settings.stt_breaker_failures:
+            if self.state != OPEN:
+                logger.warning(f"Circuit breaker abierto para la réplica STT: {self.url}")
+            self.state = OPEN
+            self.opened_at = now
+
+
+class STTPool:
+    """
+    Réplicas de stt-service con balanceo por menor cantidad de pedidos
+    pendientes: los propios en curso más la cola que informa cada réplica en
+    /health (pedidos de otros workers). Cada réplica tiene un circuit breaker
+    (se abre tras `stt_breaker_failures` fallas seguidas y, pasado
+    `stt_breaker_cooldown`, deja pasar un pedido de prueba) y detección de
+    outliers: una réplica cuya latencia por segundo de audio supera
+    `stt_outlier_factor` veces la mediana de las demás queda fuera
+    `stt_outlier_ejection` segundos, sin sacar nunca más de la mitad del pool.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [_Replica(url) for url in dict.fromkeys(urls)]
+
+    def pick(self, exclude: set[str]) -> _Replica | None:
+        now = time.monotonic()
+        candidates = [r for r in self.replicas if r.url not in exclude and r.available(now)]
+        if not candidates:
+            return None
+        least = min(r.load for r in candidates)
+        replica = random.choice([r for r in candidates if r.load == least])
+        if replica.state == HALF_OPEN:
+            replica.probing = True
+        return replica
+
+    def check_outlier(self, replica: _Replica) -> None:
+        if replica.samples < OUTLIER_MIN_SAMPLES:
+            return
+        now = time.monotonic()
+        peers = [
+            r.latency for r in self.replicas
+            if r is not replica and r.samples >= OUTLIER_MIN_SAMPLES and r.ejected_until <= now
+        ]
+        if not peers:
+            return
+        ejected = sum(r.ejected_until > now for r in self.replicas)
+        if (ejected + 1) * 2 > len(self.replicas):
+            return
+        median = statistics.median(peers)
+        if replica.latency > settings.stt_outlier_factor * median:
+            logger.warning(
+                f"Réplica STT lenta, fuera por {settings.stt_outlier_ejection}s: {replica.url} "
+                f"({replica.latency:.2f} vs mediana {median:.2f} s por s de audio)"
+            )
+            replica.ejected_until = now + settings.stt_outlier_ejection
+            replica.ejections += 1
+            # Vuelve sin historial: se la juzga por lo que haga después de volver
+            replica.latency, replica.samples = None, 0
+
+    async def poll(self) -> None:
+        """Lee la cola de cada réplica (GET /health)."""
+        async with httpx.AsyncClient(timeout=HEALTH_TIMEOUT) as client:
+            async def probe(replica: _Replica) -> None:
+                outstanding = replica.outstanding
+                try:
+                    response = await client.get(f"{replica.url}/health")
+                    depth = int(response.json().get("queue_depth", 0))
+                except (httpx.HTTPError, ValueError):
+                    return  # las fallas las cuenta el breaker con tráfico real
+                # La cola informada incluye nuestros pedidos en curso: no contarlos dos veces
+                replica.remote_depth = max(depth - outstanding, 0)
+
+            await asyncio.gather(*(probe(r) for r in self.replicas))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "url": r.url,
+                    "state": r.state,
+                    "ejected": r.ejected_until > now,
+                    "outstanding": r.outstanding,
+                    "remote_depth": r.remote_depth,
+                    "latency_per_audio_s": round(r.latency, 3) if r.latency is not None else None,
+                    "requests": r.requests,
+                    "errors": r.errors,
+                    "ejections": r.ejections,
+                }
+                for r in self.replicas
+            ],
+        }
+
+
+# Singleton global
+stt_pool = STTPool(settings.stt_service_urls_list)
+
+
+async def health_loop() -> None:
+    """Actualiza la cola de las réplicas periódicamente (solo con más de una)."""
+    while True:
+        await stt_pool.poll()
+        await asyncio.sleep(settings.stt_health_interval)
 
 
 async def transcribe(audio_bytes: bytes, filename: str = "audio.wav") -> str:
     """
-    Envía audio al microservicio STT y devuelve la transcripción.
+    Envía audio al microservicio STT (réplica menos cargada) y devuelve la transcripción.
     Args:
         audio_bytes: bytes de audio (WAV/WebM/OGG)
         filename: nombre de archivo para el multipart
     Returns:
         texto transcripto
     """
-    url = f"{settings.stt_service_url}/transcribe"
-    try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            files = {"audio": (filename, audio_bytes, "audio/wav")}
-            response = await client.post(url, files=files)
-            response.raise_for_status()
-            data = response.json()
+    audio_seconds = max(len(audio_bytes) / AUDIO_BYTES_PER_SECOND, 0.5)
+    tried: set[str] = set()
+    while True:
+        replica = stt_pool.pick(tried)
+        if replica is None:
+            raise RuntimeError("Servicio STT no disponible")
+        tried.add(replica.url)
+        url = f"{replica.url}/transcribe"
+        replica.outstanding += 1
+        replica.requests += 1
+        start = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                files = {"audio": (filename, audio_bytes, "audio/wav")}
+                response = await client.post(url, files=files, headers=tracer.inject())
+                response.raise_for_status()
+                data = response.json()
+            replica.succeeded(time.monotonic() - start, audio_seconds)
+            stt_pool.check_outlier(replica)
             text = data.get("text", "").strip()
             logger.debug(f"STT result: '{text[:100]}...'")
             return text
-    except httpx.ConnectError:
-        logger.error(f"No se puede conectar al servicio STT: {url}")
-        raise RuntimeError("Servicio STT no disponible")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"STT error {e.response.status_code}: {e.response.text}")
-        raise RuntimeError(f"Error en STT: {e.response.text}")
-    except Exception as e:
-        logger.error(f"Error inesperado en STT client: {e}")
-        raise
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # Ni llegó a la réplica: se reintenta en otra
+            replica.failed(time.monotonic())
+            logger.error(f"No se puede conectar al servicio STT: {url}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code < 500:
+                # Error del pedido (audio vacío o inválido): no es culpa de la réplica
+                replica.succeeded()
+                logger.error(f"STT error {e.response.status_code}: {e.response.text}")
+                raise RuntimeError(f"Error en STT: {e.response.text}")
+            replica.failed(time.monotonic())
+            logger.error(f"STT error {e.response.status_code} en {url}: {e.response.text}")
+        except httpx.TimeoutException:
+            # Reintentar tras un timeout duplicaría la espera del usuario
+            replica.failed(time.monotonic())
+            logger.error(f"Timeout del servicio STT: {url}")
+            raise RuntimeError("Servicio STT no disponible")
+        except Exception as e:
+            replica.failed(time.monotonic())
+            logger.error(f"Error inesperado en STT client: {e}")
+            raise
+        finally:
+            replica.outstanding -= 1
+            replica.probing = False
 
 
 async def stream_partial(audio_bytes: bytes, filename: str = "audio.wav") -> str:
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import SessionTranscript, SessionTurn, VoiceSession
+
+
+async def record_turn(session_id: int, turn_index: int, turn: dict, usage: dict | None = None) -> None:
+    """
+    Persiste un turno apenas termina, para que un worker caído no pierda la
+    conversación. `turn` es el registro que arma el loop del WebSocket
+    (outcome, transcript, reply, timings). El commit corre en un hilo con su
+    propia conexión: no frena el event loop de las demás sesiones.
+    """
+    await asyncio.to_thread(_save_turn, session_id, turn_index, turn, usage or {})
+
+
+def _save_turn(session_id: int, turn_index: int, turn: dict, usage: dict) -> None:
+    timings = turn.get("timings", {})
+    db = SessionLocal()
+    try:
+        db.add(SessionTurn(
+            session_id=session_id,
+            turn_index=turn_index,
+            outcome=turn.get("outcome", "ok"),
+            user_text=turn.get("transcript") or None,
+            reply_text=turn.get("reply") or None,
+            stt_ms=timings.get("stt_ms"),
+            llm_ms=timings.get("llm_ms"),
+            tts_ms=timings.get("tts_ms"),
+            total_ms=timings.get("total_ms"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudo guardar el turno {turn_index} de la sesión {session_id}: {e}")
+    finally:
+        db.close()
+
+
+def compact_session(db: Session, session: VoiceSession) -> int:
+    """
+    Mueve los textos de una sesión terminada a SessionTranscript (zlib) y los
+    borra de las filas en claro; los turnos conservan timings y tokens.
+    Returns: bytes de texto compactados (0 si ya estaba compactada).
+    """
+    if session.compressed is not None:
+        return 0
+    if session.legacy_transcript is not None:
+        lines = session.legacy_transcript.splitlines()
+    else:
+        lines = [line for turn in session.turns for line in turn.lines()]
+    data, raw_bytes = SessionTranscript.pack(lines)
+    session.compressed = SessionTranscript(session_id=session.id, data=data, raw_bytes=raw_bytes)
+    session.legacy_transcript = None
+    for turn in session.turns:
+        turn.user_text = None
+        turn.reply_text = None
+    return raw_bytes
+
+
+def compact_transcripts(older_than_days: int, batch: int = 200) -> dict:
+    """Compacta las sesiones terminadas hace más de `older_than_days` días."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    db = SessionLocal()
+    sessions = raw_total = 0
+    try:
+        while True:
+            pending = (
+                db.query(VoiceSession)
+                .outerjoin(SessionTranscript, SessionTranscript.session_id == VoiceSession.id)
+                .filter(
+                    VoiceSession.status != "active",
+                    VoiceSession.ended_at < cutoff.replace(tzinfo=None),
+                    SessionTranscript.session_id.is_(None),
+                    VoiceSession.id.in_(db.query(SessionTurn.session_id))
+                    | VoiceSession.legacy_transcript.isnot(None),
+                )
+                .limit(batch)
+                .all()
+            )
+            if not pending:
+                break
+            for session in pending:
+                raw_total += compact_session(db, session)
+                sessions += 1
+            db.commit()
+            if len(pending) < batch:
+                break
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error compactando transcripciones: {e}")
+    finally:
+        db.close()
+    if sessions:
+        logger.info(f"Transcripciones compactadas: {sessions} sesiones | {raw_total} bytes de texto")
+    return {"sessions": sessions, "raw_bytes": raw_total}
+
+
+async def compaction_loop() -> None:
+    """Compacta periódicamente en un hilo aparte (la consulta y zlib bloquean)."""
+    while True:
+        await asyncio.to_thread(compact_transcripts, settings.transcript_compress_after_days)
+        await asyncio.sleep(settings.transcript_compact_interval)
@@ -1,6 +1,114 @@
+import asyncio
+import bisect
+import hashlib
+from collections import Counter
+
 import httpx
 from loguru import logger
 from config import settings
+from tracing import tracer
+
+HEALTH_TIMEOUT = 2.0
+
+
+def _ring_hash(value: str) -> int:
+    # Estable entre procesos (hash() de Python cambia en cada arranque)
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Anillo de hashing consistente con nodos virtuales. Agregar o quitar una
+    réplica solo mueve las claves del tramo que le toca (~1/N), el resto sigue
+    en la misma réplica.
+    """
+
+    def __init__(self, nodes: list[str], vnodes: int = 100):
+        self.nodes = list(dict.fromkeys(nodes))
+        points = sorted((_ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def lookup(self, key: str) -> list[str]:
+        """Todas las réplicas en orden de preferencia para `key` (la primera es la dueña)."""
+        order: list[str] = []
+        if not self._owners:
+            return order
+        start = bisect.bisect(self._hashes, _ring_hash(key))
+        for i in range(len(self._owners)):
+            node = self._owners[(start + i) % len(self._owners)]
+            if node not in order:
+                order.append(node)
+                if len(order) == len(self.nodes):
+                    break
+        return order
+
+
+class TTSPool:
+    """
+    Réplicas de tts-service con ruteo por voz: cada `model_file` va siempre a
+    la misma réplica (la dueña en el anillo), así cada nodo mantiene en memoria
+    solo los .onnx de sus voces. Si la dueña está caída (health check o error
+    de conexión) se usa la siguiente del anillo; las voces de las réplicas
+    sanas no se mueven.
+    """
+
+    def __init__(self, urls: list[str], vnodes: int):
+        self.ring = HashRing(urls, vnodes)
+        self.healthy = {url: True for url in self.ring.nodes}
+        self.requests: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.failovers = 0
+
+    def candidates(self, voice: str) -> list[str]:
+        """Réplicas a probar para la voz: sanas en orden del anillo y, al final, las caídas."""
+        order = self.ring.lookup(voice)
+        return [u for u in order if self.healthy[u]] + [u for u in order if not self.healthy[u]]
+
+    def mark(self, url: str, healthy: bool) -> None:
+        if self.healthy.get(url, healthy) != healthy:
+            if healthy:
+                logger.info(f"Réplica TTS recuperada: {url}")
+            else:
+                logger.warning(f"Réplica TTS fuera de servicio: {url}")
+        self.healthy[url] = healthy
+
+    async def check(self) -> None:
+        """Health check de todas las réplicas (GET /health)."""
+        async with httpx.AsyncClient(timeout=HEALTH_TIMEOUT) as client:
+            async def probe(url: str) -> None:
+                try:
+                    response = await client.get(f"{url}/health")
+                    self.mark(url, response.status_code == 200)
+                except httpx.HTTPError:
+                    self.mark(url, False)
+
+            await asyncio.gather(*(probe(url) for url in self.ring.nodes))
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [
+                {
+                    "url": url,
+                    "healthy": self.healthy[url],
+                    "requests": self.requests[url],
+                    "failures": self.failures[url],
+                }
+                for url in self.ring.nodes
+            ],
+            "failovers": self.failovers,
+        }
+
+
+# Singleton global
+tts_pool = TTSPool(settings.tts_service_urls_list, settings.tts_ring_vnodes)
+
+
+async def health_loop() -> None:
+    """Revisa las réplicas periódicamente y rehabilita las que vuelven."""
+    while True:
+        await tts_pool.check()
+        await asyncio.sleep(settings.tts_health_interval)
 
 
 async def synthesize(text: str, voice_model: str | None = None) -> bytes:
@@ -8,25 +116,38 @@ async def synthesize(text: str, voice_model: str | None = None) -> bytes:
     Envía texto al microservicio TTS y devuelve los bytes de audio WAV.
     Args:
         text: texto a sintetizar
-        voice_model: nombre del archivo .onnx de la voz a usar
+        voice_model: nombre del archivo .onnx de la voz a usar (decide la réplica)
     Returns:
         bytes de audio WAV
     """
-    voice = voice_model or settings.default_voice
-    url = f"{settings.tts_service_url}/synthesize"
-    try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            params = {"text": text, "voice": voice}
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            logger.debug(f"TTS sintetizó {len(response.content)} bytes para: '{text[:60]}...'")
-            return response.content
-    except httpx.ConnectError:
-        logger.error(f"No se puede conectar al servicio TTS: {url}")
-        raise RuntimeError("Servicio TTS no disponible")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"TTS error {e.response.status_code}: {e.response.text}")
-        raise RuntimeError(f"Error en TTS: {e.response.text}")
-    except Exception as e:
-        logger.error(f"Error inesperado en TTS client: {e}")
-        raise
+    voice = voice_model or settings.default_voice_file
+    candidates = tts_pool.candidates(voice)
+    for attempt, base_url in enumerate(candidates):
+        url = f"{base_url}/synthesize"
+        tts_pool.requests[base_url] += 1
+        if attempt:
+            tts_pool.failovers += 1
+        try:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                params = {"text": text, "voice": voice}
+                response = await client.get(url, params=params, headers=tracer.inject())
+                response.raise_for_status()
+                logger.debug(f"TTS sintetizó {len(response.content)} bytes para: '{text[:60]}...'")
+                return response.content
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # Réplica caída: pasar a la siguiente del anillo (el health check la rehabilita)
+            tts_pool.failures[base_url] += 1
+            tts_pool.mark(base_url, False)
+            logger.error(f"No se puede conectar al servicio TTS: {url}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 503:
+                tts_pool.failures[base_url] += 1
+                tts_pool.mark(base_url, False)
+                logger.error(f"Servicio TTS no disponible: {url}")
+                continue
+            logger.error(f"TTS error {e.response.status_code}: {e.response.text}")
+            raise RuntimeError(f"Error en TTS: {e.response.text}")
+        except Exception as e:
+            logger.error(f"Error inesperado en TTS client: {e}")
+            raise
+    raise RuntimeError("Servicio TTS no disponible")
@@ -0,0 +1,35 @@
+from services.faq_cache import FAQCache, content_words
+
+PROMPT = "Vendemos los productos A y B."
+
+
+def _cache_with(question: str) -> FAQCache:
+    cache = FAQCache()
+    cache.store(1, "voz.onnx", PROMPT, question, "respuesta", b"RIFF")
+    return cache
+
+
+def test_same_question_with_different_wording_hits():
+    cache = _cache_with("¿Cuál es el precio del producto A?")
+    assert cache.lookup(1, "voz.onnx", PROMPT, "cual es el precio del producto A") == ("respuesta", b"RIFF")
+    assert cache.lookup(1, "voz.onnx", PROMPT, "Hola, ¿cuál es el precio del producto A?") is not None
+
+
+def test_near_duplicate_questions_do_not_match():
+    cache = _cache_with("¿Cuál es el precio del producto A?")
+    for question in (
+        "¿Cuál es el precio del producto B?",
+        "¿Cuál es el precio del plan anual?",
+        "¿Cuál es el precio de 3 productos A?",
+        "¿Cuál es el precio del producto A en marzo?",
+    ):
+        assert cache.lookup(1, "voz.onnx", PROMPT, question) is None, question
+
+
+def test_prompt_change_discards_cached_answers():
+    cache = _cache_with("¿Cuál es el precio del producto A?")
+    assert cache.lookup(1, "voz.onnx", PROMPT + " Ahora con envío gratis.", "¿Cuál es el precio del producto A?") is None
+
+
+def test_content_words_keep_single_letters():
+    assert content_words("el producto A") != content_words("el producto B")
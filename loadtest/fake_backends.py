@@ -0,0 +1,196 @@
+"""
+Servidores falsos y deterministas de stt-service, tts-service y la API de OpenAI
+para pruebas de carga de fastapi-core sin GPU, modelos ni costo de API.
+
+Uso:
+    python fake_backends.py --stt-latency lognormal:0.35:0.4 \\
+        --tts-latency lognormal:0.25:0.3 --llm-latency lognormal:0.8:0.5
+
+Luego levantar fastapi-core apuntando a ellos:
+    STT_SERVICE_URL=http://127.0.0.1:9001 TTS_SERVICE_URL=http://127.0.0.1:9002 \\
+    OPENAI_BASE_URL=http://127.0.0.1:9003/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+Distribuciones de latencia (segundos): fixed:S | uniform:A:B | lognormal:MEDIANA:SIGMA
+"""
+import argparse
+import asyncio
+import io
+import math
+import random
+import struct
+import time
+import wave
+
+import uvicorn
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import Response
+
+TRANSCRIPTS = [
+    "¿Cuánto cuesta el plan básico?",
+    "¿Dónde están ubicados?",
+    "¿Tienen envío a domicilio?",
+    "Quiero hablar con un asesor",
+    "¿Cuál es el horario de atención?",
+]
+
+REPLIES = [
+    "El plan básico cuesta veintinueve dólares al mes e incluye ciento veinte minutos.",
+    "Estamos en el centro de la ciudad, atendemos de lunes a viernes.",
+    "Sí, hacemos envíos a todo el país en un plazo de dos a cuatro días hábiles.",
+    "Claro, un asesor se comunicará contigo a la brevedad.",
+]
+
+
+class Latency:
+    """Distribución de latencia con semilla propia para resultados reproducibles."""
+
+    def __init__(self, spec: str, seed: int):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return self.rng.lognormvariate(math.log(median), sigma)
+        raise ValueError(f"Distribución desconocida: {self.kind}")
+
+    async def wait(self) -> None:
+        await asyncio.sleep(self.sample())
+
+
+def tone_wav(seconds: float, rate: int = 22050) -> bytes:
+    """WAV PCM16 mono con un tono suave, válido para el reproductor del widget."""
+    n = int(seconds * rate)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"".join(
+            struct.pack("<h", int(3000 * math.sin(2 * math.pi * 220 * i / rate))) for i in range(n)
+        ))
+    return buffer.getvalue()
+
+
+def stt_app(latency: Latency) -> FastAPI:
+    app = FastAPI(title="Fake STT")
+    state = {"n": 0, "queue_depth": 0}
+
+    @app.get("/health")
+    def health():
+        return {
+            "status": "ok", "service": "stt", "model": "fake", "language": "es",
+            "queue_depth": state["queue_depth"], "concurrency": 1,
+        }
+
+    @app.post("/transcribe")
+    async def transcribe(audio: UploadFile = File(...)):
+        state["queue_depth"] += 1
+        try:
+            await audio.read()
+            await latency.wait()
+        finally:
+            state["queue_depth"] -= 1
+        text = TRANSCRIPTS[state["n"] % len(TRANSCRIPTS)]
+        state["n"] += 1
+        return {"text": text, "language": "es"}
+
+    return app
+
+
+def tts_app(latency: Latency) -> FastAPI:
+    app = FastAPI(title="Fake TTS")
+    cache: dict[int, bytes] = {}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "service": "tts", "engine": "fake"}
+
+    @app.get("/synthesize")
+    async def synthesize(text: str, voice: str = "fake.onnx"):
+        await latency.wait()
+        # ~60 ms de audio por carácter, como una voz a ritmo normal
+        seconds = round(min(len(text) * 0.06, 20.0), 1)
+        key = int(seconds * 10)
+        if key not in cache:
+            cache[key] = tone_wav(seconds)
+        return Response(content=cache[key], media_type="audio/wav")
+
+    return app
+
+
+def openai_app(latency: Latency) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    state = {"n": 0}
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        await latency.wait()
+        reply = REPLIES[state["n"] % len(REPLIES)]
+        state["n"] += 1
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-fake-{state['n']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(reply) // 4,
+                "total_tokens": (prompt_chars + len(reply)) // 4,
+            },
+        }
+
+    return app
+
+
+async def serve(args) -> None:
+    servers = [
+        uvicorn.Server(uvicorn.Config(
+            stt_app(Latency(args.stt_latency, args.seed)), host=args.host, port=args.stt_port, log_level="warning"
+        )),
+        uvicorn.Server(uvicorn.Config(
+            tts_app(Latency(args.tts_latency, args.seed + 1)), host=args.host, port=args.tts_port, log_level="warning"
+        )),
+        uvicorn.Server(uvicorn.Config(
+            openai_app(Latency(args.llm_latency, args.seed + 2)), host=args.host, port=args.llm_port, log_level="warning"
+        )),
+    ]
+    print(
+        f"Fake STT :{args.stt_port} ({args.stt_latency}) | "
+        f"Fake TTS :{args.tts_port} ({args.tts_latency}) | "
+        f"Fake OpenAI :{args.llm_port}/v1 ({args.llm_latency})"
+    )
+    await asyncio.gather(*(s.serve() for s in servers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backends falsos para pruebas de carga de Venzio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--stt-port", type=int, default=9001)
+    parser.add_argument("--tts-port", type=int, default=9002)
+    parser.add_argument("--llm-port", type=int, default=9003)
+    parser.add_argument("--stt-latency", default="lognormal:0.35:0.4")
+    parser.add_argument("--tts-latency", default="lognormal:0.25:0.3")
+    parser.add_argument("--llm-latency", default="lognormal:0.8:0.5")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Generador de carga para el WebSocket público de voz (/ws/public/voice/{voice_id}).
+
+Abre N sesiones concurrentes como lo hace el widget (token vía /widget/auth),
+envía clips WAV y mide por turno:
+- turn_latency: envío del audio → audio de la respuesta
+- time_to_first_audio: envío del audio → primer audio recibido (incluye rellenos)
+- transcript_latency: envío del audio → final_transcript
+y la tasa de errores por tipo.
+
+Uso:
+    python loadgen.py --base-url http://127.0.0.1:8000 --site-id venzio_xxx \\
+        --sessions 20 --turns 5 --ramp 10 --json report.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import struct
+import sys
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import websockets
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: list[float]) -> dict:
+    def r(v):
+        return round(v * 1000, 1) if v is not None else None
+    return {
+        "count": len(values),
+        "p50_ms": r(percentile(values, 0.50)),
+        "p95_ms": r(percentile(values, 0.95)),
+        "p99_ms": r(percentile(values, 0.99)),
+        "max_ms": r(max(values)) if values else None,
+    }
+
+
+def synthetic_utterances(seed: int, count: int = 3) -> list[bytes]:
+    """Clips WAV PCM16 16 kHz con ruido modulado que supera el filtro de silencio."""
+    rng = random.Random(seed)
+    clips = []
+    for i in range(count):
+        seconds = 1.5 + i * 0.75
+        n = int(16000 * seconds)
+        frames = b"".join(
+            struct.pack("<h", int(6000 * math.sin(j / 40) * rng.uniform(-1, 1))) for j in range(n)
+        )
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(frames)
+        clips.append(buffer.getvalue())
+    return clips
+
+
+def load_utterances(audio_dir: str | None, seed: int) -> list[bytes]:
+    if not audio_dir:
+        return synthetic_utterances(seed)
+    files = sorted(Path(audio_dir).glob("*.wav"))
+    if not files:
+        raise SystemExit(f"No hay archivos .wav en {audio_dir}")
+    return [f.read_bytes() for f in files]
+
+
+class Results:
+    def __init__(self):
+        self.connect: list[float] = []
+        self.turn: list[float] = []
+        self.first_audio: list[float] = []
+        self.transcript: list[float] = []
+        self.turns_ok = 0
+        self.turns_total = 0
+        self.sessions_ok = 0
+        self.errors: Counter = Counter()
+
+    def report(self, args, wall: float) -> dict:
+        sessions_failed = args.sessions - self.sessions_ok
+        return {
+            "config": {
+                "sessions": args.sessions,
+                "turns": args.turns,
+                "ramp_seconds": args.ramp,
+                "think_time": args.think_time,
+            },
+            "wall_seconds": round(wall, 2),
+            "sessions_ok": self.sessions_ok,
+            "session_error_rate": round(sessions_failed / args.sessions, 4) if args.sessions else 0.0,
+            "turns_ok": self.turns_ok,
+            "turns_total": self.turns_total,
+            "turn_error_rate": round(1 - self.turns_ok / self.turns_total, 4) if self.turns_total else 0.0,
+            "errors": dict(self.errors),
+            "connect_latency": summarize(self.connect),
+            "turn_latency": summarize(self.turn),
+            "time_to_first_audio": summarize(self.first_audio),
+            "transcript_latency": summarize(self.transcript),
+        }
+
+
+async def drain(ws, seconds: float) -> None:
+    """Descarta lo que llegue en `seconds` (p.ej. el saludo pre-sintetizado)."""
+    deadline = time.perf_counter() + seconds
+    while (remaining := deadline - time.perf_counter()) > 0:
+        try:
+            await asyncio.wait_for(ws.recv(), timeout=remaining)
+        except asyncio.TimeoutError:
+            return
+
+
+async def run_turn(ws, audio: bytes, results: Results, timeout: float) -> None:
+    results.turns_total += 1
+    t0 = time.perf_counter()
+    await ws.send(audio)
+    got_reply_text = False
+    first_audio = None
+    deadline = t0 + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            results.errors["turn_timeout"] += 1
+            return
+        try:
+            message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+        except asyncio.TimeoutError:
+            results.errors["turn_timeout"] += 1
+            return
+        now = time.perf_counter()
+
+        if isinstance(message, bytes):
+            if first_audio is None:
+                first_audio = now - t0
+            if got_reply_text:
+                results.turn.append(now - t0)
+                results.first_audio.append(first_audio)
+                results.turns_ok += 1
+                return
+            continue
+
+        data = json.loads(message)
+        kind = data.get("type")
+        if kind == "final_transcript":
+            results.transcript.append(now - t0)
+        elif kind == "reply_text":
+            got_reply_text = True
+        elif kind == "error":
+            results.errors[f"turn_error:{data.get('message', '')[:40]}"] += 1
+            return
+
+
+async def run_session(idx: int, args, http: httpx.AsyncClient, utterances: list[bytes], results: Results) -> None:
+    await asyncio.sleep(args.ramp * idx / max(args.sessions, 1))
+    t0 = time.perf_counter()
+    try:
+        auth = await http.get("/widget/auth", params={"site_id": args.site_id}, headers={"origin": args.origin})
+        auth.raise_for_status()
+    except httpx.HTTPError as e:
+        results.errors[f"auth:{type(e).__name__}"] += 1
+        return
+    data = auth.json()
+
+    ws_url = f"{args.ws_url}/ws/public/voice/{data['voice_id']}?token={data['token']}"
+    try:
+        async with websockets.connect(ws_url, max_size=None, open_timeout=args.timeout) as ws:
+            ready = json.loads(await asyncio.wait_for(ws.recv(), timeout=args.timeout))
+            if ready.get("type") != "session_ready":
+                results.errors[f"rejected:{ready.get('message', '')[:40]}"] += 1
+                return
+            results.connect.append(time.perf_counter() - t0)
+            await drain(ws, args.greeting_wait)
+
+            for turn in range(args.turns):
+                await run_turn(ws, utterances[(idx + turn) % len(utterances)], results, args.timeout)
+                if args.think_time:
+                    await asyncio.sleep(args.think_time)
+
+            await ws.send(json.dumps({"type": "end_session"}))
+            results.sessions_ok += 1
+    except (OSError, websockets.WebSocketException, asyncio.TimeoutError) as e:
+        results.errors[f"session:{type(e).__name__}"] += 1
+
+
+async def main_async(args) -> dict:
+    utterances = load_utterances(args.audio_dir, args.seed)
+    results = Results()
+    limits = httpx.Limits(max_connections=args.sessions)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(i, args, http, utterances, results) for i in range(args.sessions)))
+        wall = time.perf_counter() - start
+    return results.report(args, wall)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga del WebSocket de voz de Venzio")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--ws-url", default=None, help="por defecto se deriva de --base-url")
+    parser.add_argument("--site-id", required=True)
+    parser.add_argument("--origin", default="https://venzio.online")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--ramp", type=float, default=5.0, help="segundos para abrir todas las sesiones")
+    parser.add_argument("--think-time", type=float, default=0.5, help="pausa entre turnos (s)")
+    parser.add_argument("--greeting-wait", type=float, default=0.5, help="espera tras session_ready (s)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--audio-dir", default=None, help="carpeta con .wav; si falta se generan clips sintéticos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="ruta del reporte JSON")
+    args = parser.parse_args()
+    args.ws_url = args.ws_url or args.base_url.replace("http", "ws", 1)
+
+    report = asyncio.run(main_async(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if report["sessions_ok"] == 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
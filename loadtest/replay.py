@@ -0,0 +1,204 @@
+"""
+Reproduce sesiones capturadas (CAPTURE_ENABLED=true en fastapi-core) contra
+un build y compara las distribuciones de latencia con una línea base.
+
+Por turno se miden, desde el cliente:
+- stt:   envío del audio → final_transcript
+- llm:   final_transcript → reply_text
+- tts:   reply_text → audio de la respuesta
+- total: envío del audio → audio de la respuesta
+
+Línea base (--baseline): el reporte JSON de un replay anterior, medido igual
+desde el cliente; solo contra él se detectan regresiones. Sin --baseline el
+reporte trae `client_vs_server`: lo medido contra los timings que grabó el
+servidor en la captura. No es una comparación pareja (el cliente suma red y
+framing), así que es informativa y nunca marca regresión.
+
+Uso:
+    python replay.py ../fastapi-core/data/captures --site-id venzio_xxx \\
+        --speed 4 --json new.json --baseline old.json --threshold 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import websockets
+
+from loadgen import drain, summarize
+
+STAGES = ("stt", "llm", "tts", "total")
+
+
+def load_captures(root: str) -> list[tuple[dict, Path]]:
+    """Devuelve (manifiesto, directorio) de cada sesión capturada bajo `root`."""
+    captures = []
+    for manifest_path in sorted(Path(root).rglob("session.json")):
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("format") != "venzio-capture/1":
+            continue
+        captures.append((manifest, manifest_path.parent))
+    return captures
+
+
+def captured_baseline(captures: list[tuple[dict, Path]]) -> dict:
+    """Distribuciones por etapa a partir de los timings grabados en el servidor."""
+    samples = {stage: [] for stage in STAGES}
+    for manifest, _ in captures:
+        for turn in manifest["turns"]:
+            if turn.get("outcome") != "ok":
+                continue
+            for stage in STAGES:
+                value = turn["timings"].get(f"{stage}_ms")
+                if value is not None:
+                    samples[stage].append(value / 1000)
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+async def replay_turn(ws, audio: bytes, samples: dict, errors: Counter, timeout: float) -> None:
+    t0 = time.perf_counter()
+    await ws.send(audio)
+    marks: dict[str, float] = {}
+    deadline = t0 + timeout
+    while (remaining := deadline - time.perf_counter()) > 0:
+        try:
+            message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        now = time.perf_counter() - t0
+        if isinstance(message, bytes):
+            if "reply" in marks:
+                transcript = marks.get("transcript", 0.0)
+                samples["stt"].append(transcript)
+                samples["llm"].append(marks["reply"] - transcript)
+                samples["tts"].append(now - marks["reply"])
+                samples["total"].append(now)
+                return
+            continue
+        data = json.loads(message)
+        kind = data.get("type")
+        if kind == "final_transcript":
+            marks["transcript"] = now
+        elif kind == "reply_text":
+            marks["reply"] = now
+        elif kind == "error":
+            errors[f"turn_error:{data.get('message', '')[:40]}"] += 1
+            return
+    errors["turn_timeout"] += 1
+
+
+async def replay_session(manifest: dict, directory: Path, args, http: httpx.AsyncClient,
+                         samples: dict, errors: Counter, slots: asyncio.Semaphore) -> None:
+    async with slots:
+        try:
+            auth = await http.get("/widget/auth", params={"site_id": args.site_id}, headers={"origin": args.origin})
+            auth.raise_for_status()
+        except httpx.HTTPError as e:
+            errors[f"auth:{type(e).__name__}"] += 1
+            return
+        data = auth.json()
+        ws_url = f"{args.ws_url}/ws/public/voice/{data['voice_id']}?token={data['token']}"
+        try:
+            async with websockets.connect(ws_url, max_size=None, open_timeout=args.timeout) as ws:
+                ready = json.loads(await asyncio.wait_for(ws.recv(), timeout=args.timeout))
+                if ready.get("type") != "session_ready":
+                    errors[f"rejected:{ready.get('message', '')[:40]}"] += 1
+                    return
+                await drain(ws, args.greeting_wait)
+                start = time.perf_counter()
+                for turn in manifest["turns"]:
+                    if args.speed > 0:
+                        wait = turn["offset"] / args.speed - (time.perf_counter() - start)
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                    audio = (directory / turn["audio"]).read_bytes()
+                    await replay_turn(ws, audio, samples, errors, args.timeout)
+                await ws.send(json.dumps({"type": "end_session"}))
+        except (OSError, websockets.WebSocketException, asyncio.TimeoutError) as e:
+            errors[f"session:{type(e).__name__}"] += 1
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> tuple[dict, list[str]]:
+    """Diferencias por etapa y percentil; regresión si p95 empeora más de `threshold` %."""
+    diff, regressions = {}, []
+    for stage in STAGES:
+        cur, base = current.get(stage, {}), baseline.get(stage, {})
+        diff[stage] = {}
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            c, b = cur.get(key), base.get(key)
+            if c is None or b is None:
+                continue
+            pct = round((c - b) / b * 100, 1) if b else 0.0
+            diff[stage][key] = {"baseline": b, "current": c, "delta_ms": round(c - b, 1), "delta_pct": pct}
+            if key == "p95_ms" and pct > threshold:
+                regressions.append(f"{stage} p95 {b}ms → {c}ms (+{pct}%)")
+    return diff, regressions
+
+
+async def main_async(args) -> dict:
+    captures = load_captures(args.captures)
+    if not captures:
+        raise SystemExit(f"No hay capturas en {args.captures}")
+
+    samples = {stage: [] for stage in STAGES}
+    errors: Counter = Counter()
+    slots = asyncio.Semaphore(args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            replay_session(m, d, args, http, samples, errors, slots) for m, d in captures
+        ))
+        wall = time.perf_counter() - started
+
+    turns = sum(len(m["turns"]) for m, _ in captures)
+    stages = {stage: summarize(values) for stage, values in samples.items()}
+    report = {
+        "config": {"speed": args.speed, "concurrency": args.concurrency, "sessions": len(captures)},
+        "wall_seconds": round(wall, 2),
+        "turns_total": turns,
+        "turns_ok": len(samples["total"]),
+        "errors": dict(errors),
+        "stages": stages,
+    }
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["stages"]
+        report["diff"], report["regressions"] = compare(stages, baseline, args.threshold)
+    else:
+        # Cliente (replay) contra servidor (captura): la diferencia incluye red y
+        # framing, no sirve para decidir una regresión
+        report["client_vs_server"], _ = compare(stages, captured_baseline(captures), args.threshold)
+        report["regressions"] = []
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay de sesiones capturadas de Venzio")
+    parser.add_argument("captures", help="directorio raíz de capturas (se busca session.json recursivamente)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--ws-url", default=None, help="por defecto se deriva de --base-url")
+    parser.add_argument("--site-id", required=True)
+    parser.add_argument("--origin", default="https://venzio.online")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = ritmo original, 4 = 4x, 0 = sin pausas")
+    parser.add_argument("--concurrency", type=int, default=10, help="sesiones reproducidas a la vez")
+    parser.add_argument("--greeting-wait", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--baseline", default=None,
+                        help="reporte JSON de un replay previo; sin él solo se informa cliente vs. servidor")
+    parser.add_argument("--threshold", type=float, default=10.0, help="% de empeoramiento de p95 tolerado")
+    parser.add_argument("--json", default=None, help="ruta del reporte JSON")
+    args = parser.parse_args()
+    args.ws_url = args.ws_url or args.base_url.replace("http", "ws", 1)
+
+    report = asyncio.run(main_async(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(2 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Colector OTLP/HTTP mínimo (solo JSON) para ver las trazas de Venzio sin
+desplegar Jaeger/Tempo. Guarda cada lote recibido en un JSONL con el mismo
+formato que TRACE_EXPORTER=file, y arma la cascada de una traza a pedido.
+
+Uso:
+    python trace_collector.py --port 4318 --out traces.jsonl
+    # en los tres servicios:
+    TRACING_ENABLED=true TRACE_EXPORTER=otlp OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces
+
+    # cascada de las trazas más lentas de un archivo (colector o exporter file):
+    python trace_collector.py --show traces.jsonl --slowest 5
+"""
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+
+def flatten(payload: dict) -> list[dict]:
+    """Spans de un payload OTLP/JSON, con el nombre del servicio y tiempos en ms."""
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        service = next(
+            (a["value"].get("stringValue") for a in resource_spans.get("resource", {}).get("attributes", [])
+             if a["key"] == "service.name"),
+            "?",
+        )
+        for scope in resource_spans.get("scopeSpans", []):
+            for span in scope.get("spans", []):
+                spans.append({
+                    "service": service,
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId"),
+                    "name": span["name"],
+                    "start_ms": int(span["startTimeUnixNano"]) / 1e6,
+                    "end_ms": int(span["endTimeUnixNano"]) / 1e6,
+                    "error": span.get("status", {}).get("message"),
+                })
+    return spans
+
+
+def load_traces(path: Path) -> dict[str, list[dict]]:
+    traces = defaultdict(list)
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                for span in flatten(json.loads(line)):
+                    traces[span["trace_id"]].append(span)
+    return traces
+
+
+def waterfall(spans: list[dict]) -> list[str]:
+    """Árbol de spans con desfase y duración relativos al inicio de la traza."""
+    start = min(s["start_ms"] for s in spans)
+    children = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for span in sorted(spans, key=lambda s: s["start_ms"]):
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children[parent].append(span)
+
+    lines = []
+
+    def walk(parent, depth):
+        for span in children[parent]:
+            mark = f"  ✗ {span['error']}" if span["error"] else ""
+            lines.append(
+                f"{span['start_ms'] - start:8.1f}ms {span['end_ms'] - span['start_ms']:8.1f}ms  "
+                f"{'  ' * depth}{span['name']} [{span['service']}]{mark}"
+            )
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 0)
+    return lines
+
+
+def create_app(out: Path) -> FastAPI:
+    app = FastAPI(title="Venzio trace collector")
+
+    @app.post("/v1/traces")
+    async def receive(request: Request):
+        payload = await request.json()
+        with out.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        return {"partialSuccess": {}}
+
+    @app.get("/traces/{trace_id}")
+    def show(trace_id: str):
+        spans = load_traces(out).get(trace_id)
+        if not spans:
+            raise HTTPException(status_code=404, detail="Traza no encontrada")
+        return {"trace_id": trace_id, "waterfall": waterfall(spans)}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Colector OTLP/JSON local para Venzio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", default="traces.jsonl")
+    parser.add_argument("--show", default=None, help="JSONL a resumir en vez de levantar el colector")
+    parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.show:
+        traces = load_traces(Path(args.show))
+        ranked = sorted(
+            traces.items(),
+            key=lambda t: max(s["end_ms"] for s in t[1]) - min(s["start_ms"] for s in t[1]),
+            reverse=True,
+        )
+        for trace_id, spans in ranked[:args.slowest]:
+            print(f"── {trace_id}")
+            print("\n".join(waterfall(spans)))
+        return
+
+    uvicorn.run(create_app(Path(args.out)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmark de STT: factor de tiempo real (RTF), WER, memoria pico y tiempo de
+carga en frío sobre una grilla de modelos, compute types, hilos y VAD.
+
+Fixtures: un directorio con pares `nombre.wav` + `nombre.txt` (transcripción de
+referencia en español). También acepta .webm/.ogg/.mp3 como hace /transcribe.
+
+Cada combinación (modelo, compute_type, hilos) corre en un proceso nuevo para
+que la carga en frío y la memoria pico sean comparables entre sí.
+
+Uso:
+    python benchmark.py --fixtures benchmarks/es --models base,small \\
+        --compute-types int8,int8_float32,float32 --threads 2,4,8 \\
+        --vad-silence 200,500 --beam-sizes 1 --json stt_report.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import statistics
+import sys
+import time
+import unicodedata
+from itertools import product
+from pathlib import Path
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".ogg", ".mp3")
+
+
+def normalize_text(text: str) -> list[str]:
+    """Minúsculas, sin puntuación (se conservan tildes y ñ), separado en palabras."""
+    text = unicodedata.normalize("NFC", text.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    return text.split()
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple[int, int]:
+    """Distancia de edición por palabras. Returns: (errores, palabras de referencia)."""
+    ref, hyp = normalize_text(reference), normalize_text(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_fixtures(directory: str) -> list[dict]:
+    fixtures = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference = path.with_suffix(".txt")
+        if not reference.exists():
+            print(f"⚠ {path.name} sin {reference.name}, se omite", file=sys.stderr)
+            continue
+        fixtures.append({
+            "name": path.name,
+            "audio": path.read_bytes(),
+            "reference": reference.read_text(encoding="utf-8").strip(),
+        })
+    if not fixtures:
+        raise SystemExit(f"No hay fixtures (audio + .txt) en {directory}")
+    return fixtures
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_config(job: dict) -> list[dict]:
+    """Corre en un proceso hijo: carga el modelo una vez y recorre la grilla de VAD/beam."""
+    from loguru import logger
+    logger.remove()
+    from engine import decode_audio, load_model, run_whisper
+
+    base = {
+        "model": job["model"],
+        "compute_type": job["compute_type"],
+        "cpu_threads": job["cpu_threads"],
+    }
+    try:
+        start = time.perf_counter()
+        model = load_model(
+            job["model"], download_root=job["download_root"], device=job["device"],
+            compute_type=job["compute_type"], cpu_threads=job["cpu_threads"],
+        )
+        cold_load = time.perf_counter() - start
+    except Exception as e:
+        return [{**base, "error": f"carga: {e}"}]
+
+    decoded = [(f, decode_audio(f["audio"])) for f in job["fixtures"]]
+    # Calentamiento: la primera inferencia incluye inicializaciones perezosas
+    run_whisper(model, decoded[0][1], job["language"])
+
+    results = []
+    for beam_size, min_silence in product(job["beam_sizes"], job["vad_silence"]):
+        rtfs, latencies, errors, words, audio_seconds = [], [], 0, 0, 0.0
+        for fixture, samples in decoded:
+            for _ in range(job["repeats"]):
+                start = time.perf_counter()
+                text, duration = run_whisper(
+                    model, samples, job["language"], beam_size=beam_size, min_silence_ms=min_silence
+                )
+                elapsed = time.perf_counter() - start
+                seconds = len(samples) / 16000
+                latencies.append(elapsed)
+                rtfs.append(elapsed / seconds if seconds else 0.0)
+            e, w = word_errors(fixture["reference"], text)
+            errors += e
+            words += w
+            audio_seconds += seconds
+        results.append({
+            **base,
+            "beam_size": beam_size,
+            "vad_min_silence_ms": min_silence,
+            "cold_load_s": round(cold_load, 2),
+            "audio_seconds": round(audio_seconds, 1),
+            "rtf_mean": round(statistics.fmean(rtfs), 4),
+            "rtf_max": round(max(rtfs), 4),
+            "latency_ms_mean": round(statistics.fmean(latencies) * 1000, 1),
+            "wer": round(errors / words, 4) if words else None,
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+    return results
+
+
+def recommend(results: list[dict], wer_tolerance: float) -> dict | None:
+    """Config más rápida cuya WER no supera la mejor WER + tolerancia."""
+    valid = [r for r in results if "error" not in r and r["wer"] is not None]
+    if not valid:
+        return None
+    best_wer = min(r["wer"] for r in valid)
+    candidates = [r for r in valid if r["wer"] <= best_wer + wer_tolerance]
+    return min(candidates, key=lambda r: (r["rtf_mean"], r["peak_rss_mb"]))
+
+
+def _csv(value: str, cast=str) -> list:
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de stt-service (faster-whisper)")
+    parser.add_argument("--fixtures", required=True, help="directorio con audio + .txt de referencia")
+    parser.add_argument("--models", default="base,small")
+    parser.add_argument("--compute-types", default="int8,float32")
+    parser.add_argument("--threads", default="2,4")
+    parser.add_argument("--vad-silence", default="200,500", help="min_silence_duration_ms")
+    parser.add_argument("--beam-sizes", default="1")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--language", default="es")
+    parser.add_argument("--repeats", type=int, default=1, help="repeticiones por fixture")
+    parser.add_argument("--wer-tolerance", type=float, default=0.02)
+    parser.add_argument("--model-path", default=os.environ.get("WHISPER_MODEL_PATH", "models"))
+    parser.add_argument("--json", default="stt_benchmark.json")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    jobs = [
+        {
+            "model": model,
+            "compute_type": compute_type,
+            "cpu_threads": threads,
+            "device": args.device,
+            "download_root": args.model_path,
+            "language": args.language,
+            "fixtures": fixtures,
+            "vad_silence": _csv(args.vad_silence, int),
+            "beam_sizes": _csv(args.beam_sizes, int),
+            "repeats": args.repeats,
+        }
+        for model, compute_type, threads in product(
+            _csv(args.models), _csv(args.compute_types), _csv(args.threads, int)
+        )
+    ]
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for job in jobs:
+        label = f"{job['model']}/{job['compute_type']}/{job['cpu_threads']}t"
+        print(f"▶ {label} ...", file=sys.stderr)
+        with ctx.Pool(1) as pool:
+            rows = pool.apply(run_config, (job,))
+        for row in rows:
+            if "error" in row:
+                print(f"  ✗ {row['error']}", file=sys.stderr)
+            else:
+                print(
+                    f"  beam={row['beam_size']} vad={row['vad_min_silence_ms']}ms "
+                    f"RTF={row['rtf_mean']} WER={row['wer']} RSS={row['peak_rss_mb']}MB "
+                    f"carga={row['cold_load_s']}s",
+                    file=sys.stderr,
+                )
+        results.extend(rows)
+
+    report = {
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "fixtures": len(fixtures),
+        "results": results,
+        "recommended": recommend(results, args.wer_tolerance),
+    }
+    Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(json.dumps(report["recommended"], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
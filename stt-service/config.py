@@ -5,6 +5,19 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class STTSettings(BaseSettings):
     whisper_model: str = "base"
     whisper_language: str = "es"
+    whisper_device: str = "cpu"
+    whisper_compute_type: str = "int8"       # Óptimo para CPU; ver benchmark.py
+    whisper_cpu_threads: int = 4
+    whisper_beam_size: int = 1
+    whisper_vad_min_silence_ms: int = 200
+    whisper_concurrency: int = 1             # transcripciones simultáneas (el resto espera en cola)
+
+    # Tracing: con traceparent muestreado se sigue la decisión del core
+    tracing_enabled: bool = False
+    trace_sample_rate: float = 0.0           # trazas propias (llamadas sin traceparent)
+    trace_exporter: str = "file"
+    trace_file: str = "logs/traces.jsonl"
+    otlp_endpoint: str = "http://otel-collector:4318/v1/traces"
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
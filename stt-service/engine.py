@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+from faster_whisper import WhisperModel
+from loguru import logger
+from pydub import AudioSegment
+
+SAMPLE_RATE = 16000
+
+
+class InvalidAudioError(ValueError):
+    """El audio no se pudo decodificar: error del pedido, no del servicio."""
+
+
+def decode_audio(audio_bytes: bytes) -> np.ndarray:
+    """
+    Convierte audio bytes a numpy array usando pydub.
+    Formato: mono, 16000Hz, float32 normalizado.
+    """
+    try:
+        # Crear AudioSegment desde bytes - ffmpeg auto-detecta formato
+        audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
+        audio = audio.set_frame_rate(SAMPLE_RATE).set_channels(1)
+
+        samples = np.array(audio.get_array_of_samples())
+
+        if audio.sample_width == 2:
+            samples = samples.astype(np.float32) / 32768.0
+        elif audio.sample_width == 4:
+            samples = samples.astype(np.float32) / 2147483648.0
+        else:
+            samples = samples.astype(np.float32)
+
+        return np.ascontiguousarray(samples)
+
+    except Exception as e:
+        logger.error(f"Error procesando audio con ffmpeg: {e}")
+        raise InvalidAudioError(f"Audio inválido o corrupto: {e}") from e
+
+
+def load_model(model_name: str, download_root: str, device: str = "cpu",
+               compute_type: str = "int8", cpu_threads: int = 4) -> WhisperModel:
+    """Carga un modelo faster-whisper con los parámetros de cómputo indicados."""
+    return WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        download_root=download_root,
+    )
+
+
+def run_whisper(model: WhisperModel, samples: np.ndarray, language: str,
+                beam_size: int = 1, min_silence_ms: int = 200) -> tuple[str, float]:
+    """
+    Transcribe un array de muestras. Returns:
+        (texto, duración del audio en segundos)
+    """
+    segments, info = model.transcribe(
+        samples,
+        language=language,
+        beam_size=beam_size,
+        vad_filter=True,           # Filtra silencios
+        vad_parameters={"min_silence_duration_ms": min_silence_ms},
+    )
+    text_parts = [seg.text.strip() for seg in segments]
+    return " ".join(text_parts).strip(), info.duration
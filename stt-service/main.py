@@ -1,9 +1,15 @@
+import asyncio
 import sys
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Header, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
 from loguru import logger
 
+from config import settings
+from engine import InvalidAudioError
+from profiler import ProfilerBusy, profiler
+from tracing import tracer
 from transcriber import transcriber
 
 # ── Logging ───────────────────────────────────────────────────────────────────
@@ -13,21 +19,57 @@ logger.add(sys.stdout, level="INFO", format="<green>{time:HH:mm:ss}</green> | <l
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tracer.configure(
+        "venzio-stt", settings.tracing_enabled, settings.trace_sample_rate,
+        exporter=settings.trace_exporter, path=settings.trace_file, endpoint=settings.otlp_endpoint,
+    )
     logger.info("🎙 STT Service listo (faster-whisper / español)")
     yield
+    tracer.shutdown()
     logger.info("🛑 STT Service detenido")
 
 
 app = FastAPI(title="Venzio STT Service", version="1.0.0", lifespan=lifespan)
 
+# Whisper corre en un hilo aparte para que /health responda durante una
+# transcripción; `queue_depth` (en curso + en espera) lo usa fastapi-core para
+# mandar cada pedido a la réplica menos cargada
+_whisper_slots = asyncio.Semaphore(settings.whisper_concurrency)
+_queue_depth = 0
+
+
+# Límite del profiler; el endpoint solo es accesible desde la red interna (vía fastapi-core)
+PROFILE_MAX_SECONDS = 60
+
+
+@app.post("/debug/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, hz: int = 100):
+    """Perfil de muestreo del proceso por `seconds` segundos, en formato collapsed stacks."""
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    hz = min(max(hz, 1), 1000)
+    try:
+        return await asyncio.to_thread(profiler.run, seconds, hz)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "stt", "model": "whisper", "language": "es"}
+    return {
+        "status": "ok",
+        "service": "stt",
+        "model": "whisper",
+        "language": "es",
+        "queue_depth": _queue_depth,
+        "concurrency": settings.whisper_concurrency,
+    }
 
 
 @app.post("/transcribe")
-async def transcribe_audio(audio: UploadFile = File(...)):
+async def transcribe_audio(
+    audio: UploadFile = File(...),
+    traceparent: str | None = Header(None),
+):
     """
     Recibe un archivo de audio y devuelve la transcripción en español.
     Acepta: WAV, WebM, OGG, MP3.
@@ -39,9 +81,19 @@ async def transcribe_audio(audio: UploadFile = File(...)):
     if not audio_bytes:
         raise HTTPException(status_code=400, detail="El archivo de audio está vacío")
 
+    global _queue_depth
+    _queue_depth += 1
     try:
-        text = transcriber.transcribe(audio_bytes)
+        with tracer.span("stt.transcribe", parent=tracer.extract(traceparent), bytes=len(audio_bytes)):
+            async with _whisper_slots:
+                text = await asyncio.to_thread(transcriber.transcribe, audio_bytes)
         return {"text": text, "language": "es"}
+    except InvalidAudioError as e:
+        # 4xx: el cliente no reintenta en otra réplica ni la penaliza por un clip roto
+        logger.warning(f"Audio inválido: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error en transcripción: {e}")
         raise HTTPException(status_code=500, detail=f"Error al transcribir: {str(e)}")
+    finally:
+        _queue_depth -= 1
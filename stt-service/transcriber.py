@@ -1,10 +1,8 @@
-import io
 import os
-import numpy as np
-from faster_whisper import WhisperModel
 from loguru import logger
-from pydub import AudioSegment
 from config import settings
+from engine import InvalidAudioError, decode_audio, load_model, run_whisper
+from tracing import tracer
 
 
 class WhisperTranscriber:
@@ -24,41 +22,19 @@ class WhisperTranscriber:
         model_name = settings.whisper_model
         model_path = os.environ.get("WHISPER_MODEL_PATH", "models")
         logger.info(f"Cargando modelo Whisper '{model_name}' desde '{model_path}'...")
-        self.model = WhisperModel(
+        self.model = load_model(
             model_name,
-            device="cpu",
-            compute_type="int8",           # Óptimo para CPU
-            cpu_threads=4,
             download_root=model_path,
+            device=settings.whisper_device,
+            compute_type=settings.whisper_compute_type,
+            cpu_threads=settings.whisper_cpu_threads,
         )
         self.language = settings.whisper_language  # "es"
         self._initialized = True
-        logger.info(f"✅ Whisper listo | modelo={model_name} | idioma={self.language}")
-
-    def _convert_to_wav(self, audio_bytes: bytes) -> np.ndarray:
-        """
-        Convierte audio bytes a numpy array usando pydub.
-        Formato: mono, 16000Hz, float32 normalizado.
-        """
-        try:
-            # Crear AudioSegment desde bytes - ffmpeg auto-detecta formato
-            audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-            audio = audio.set_frame_rate(16000).set_channels(1)
-
-            samples = np.array(audio.get_array_of_samples())
-
-            if audio.sample_width == 2:
-                samples = samples.astype(np.float32) / 32768.0
-            elif audio.sample_width == 4:
-                samples = samples.astype(np.float32) / 2147483648.0
-            else:
-                samples = samples.astype(np.float32)
-
-            return np.ascontiguousarray(samples)
-
-        except Exception as e:
-            logger.error(f"Error procesando audio con ffmpeg: {e}")
-            raise RuntimeError(f"Audio inválido o corrupto: {e}")
+        logger.info(
+            f"✅ Whisper listo | modelo={model_name} | idioma={self.language} | "
+            f"compute={settings.whisper_compute_type} | threads={settings.whisper_cpu_threads}"
+        )
 
     def transcribe(self, audio_bytes: bytes) -> str:
         """
@@ -72,23 +48,27 @@ class WhisperTranscriber:
 
         # Convertir a numpy array usando pydub
         try:
-            samples = self._convert_to_wav(audio_bytes)
+            with tracer.span("stt.decode"):
+                samples = decode_audio(audio_bytes)
             logger.debug(f"Conversión a numpy array exitosa: {len(samples)} samples")
+        except InvalidAudioError:
+            raise
         except Exception as e:
             logger.error(f"Error procesando audio: {e}")
-            raise RuntimeError(f"Audio inválido o corrupto: {e}")
+            raise InvalidAudioError(f"Audio inválido o corrupto: {e}") from e
 
         # Transcribir directamente desde numpy array
-        segments, info = self.model.transcribe(
-            samples,
-            language=self.language,
-            beam_size=1,
-            vad_filter=True,           # Filtra silencios
-            vad_parameters={"min_silence_duration_ms": 200},
-        )
-        text_parts = [seg.text.strip() for seg in segments]
-        result = " ".join(text_parts).strip()
-        logger.debug(f"STT transcribió {info.duration:.1f}s → '{result[:100]}'")
+        with tracer.span("stt.whisper", samples=len(samples)) as span:
+            result, duration = run_whisper(
+                self.model,
+                samples,
+                language=self.language,
+                beam_size=settings.whisper_beam_size,
+                min_silence_ms=settings.whisper_vad_min_silence_ms,
+            )
+            if span:
+                span.set("audio_seconds", round(duration, 2))
+        logger.debug(f"STT transcribió {duration:.1f}s → '{result[:100]}'")
         return result
 
 
@@ -0,0 +1,148 @@
+"""
+Benchmark de TTS: latencia en frío y en caliente, factor de tiempo real (RTF),
+bytes generados y tiempo de CPU por voz, largo de texto y concurrencia.
+
+Recorre las voces .onnx instaladas en PIPER_MODELS_DIR (o --voices) y un corpus
+de respuestas en español de cortas a largas, usando el mismo
+PiperSynthesizer.synthesize que atiende /synthesize.
+
+Uso:
+    python benchmark.py --concurrency 1,2,4 --repeats 3 --json tts_report.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+
+from synthesizer import synthesizer
+
+CORPUS = {
+    "corto": "Claro, con gusto.",
+    "medio": "El plan básico cuesta veintinueve dólares al mes e incluye ciento veinte minutos de conversación.",
+    "largo": (
+        "Nuestro plan profesional incluye seiscientos minutos mensuales, hasta veinte sesiones simultáneas "
+        "y soporte prioritario. Si lo contratas hoy, la activación es inmediata y puedes cancelarlo cuando "
+        "quieras sin costo adicional. ¿Te gustaría que un asesor te contacte para ayudarte con la configuración?"
+    ),
+}
+
+
+def wav_seconds(audio: bytes) -> float:
+    with wave.open(io.BytesIO(audio), "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def cpu_seconds() -> float:
+    """CPU de este proceso + hijos ya terminados (Piper corre como subproceso)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def timed_synthesis(text: str, voice: str) -> tuple[float, bytes]:
+    start = time.perf_counter()
+    audio = synthesizer.synthesize(text, voice)
+    return time.perf_counter() - start, audio
+
+
+def bench_voice(voice: str, corpus: dict, repeats: int, concurrency: list[int]) -> dict:
+    result = {"voice": voice, "texts": {}, "concurrency": []}
+
+    for label, text in corpus.items():
+        cpu_before = cpu_seconds()
+        cold, audio = timed_synthesis(text, voice)
+        warm = [timed_synthesis(text, voice)[0] for _ in range(repeats)]
+        cpu_used = cpu_seconds() - cpu_before
+        seconds = wav_seconds(audio)
+        warm_mean = statistics.fmean(warm) if warm else cold
+        result["texts"][label] = {
+            "chars": len(text),
+            "audio_seconds": round(seconds, 2),
+            "bytes": len(audio),
+            "cold_ms": round(cold * 1000, 1),
+            "warm_ms_mean": round(warm_mean * 1000, 1),
+            "warm_ms_max": round(max(warm) * 1000, 1) if warm else None,
+            "rtf_cold": round(cold / seconds, 4) if seconds else None,
+            "rtf_warm": round(warm_mean / seconds, 4) if seconds else None,
+            "cpu_ms_per_call": round(cpu_used / (1 + repeats) * 1000, 1),
+        }
+
+    # Concurrencia: N síntesis simultáneas del texto medio
+    text = corpus.get("medio") or next(iter(corpus.values()))
+    for workers in concurrency:
+        calls = workers * max(repeats, 1)
+        cpu_before = cpu_seconds()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(lambda _: timed_synthesis(text, voice), range(calls)))
+        wall = time.perf_counter() - start
+        latencies = sorted(r[0] for r in runs)
+        audio_total = sum(wav_seconds(r[1]) for r in runs)
+        result["concurrency"].append({
+            "workers": workers,
+            "calls": calls,
+            "wall_s": round(wall, 2),
+            "throughput_per_s": round(calls / wall, 2),
+            "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1),
+            "latency_ms_p95": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)] * 1000, 1),
+            "audio_seconds_per_wall_second": round(audio_total / wall, 2),
+            "cpu_s": round(cpu_seconds() - cpu_before, 2),
+        })
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de tts-service (Piper)")
+    parser.add_argument("--voices", default=None, help="archivos .onnx separados por coma (por defecto, todos)")
+    parser.add_argument("--corpus", default=None, help="JSON {etiqueta: texto}; por defecto corto/medio/largo")
+    parser.add_argument("--repeats", type=int, default=3, help="síntesis en caliente por texto")
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--json", default="tts_benchmark.json")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    if args.voices:
+        voices = [v.strip() for v in args.voices.split(",") if v.strip()]
+    else:
+        voices = sorted(p.name for p in Path(synthesizer.models_dir).glob("*.onnx"))
+    if not voices:
+        raise SystemExit(f"No hay voces .onnx en {synthesizer.models_dir}")
+    corpus = json.loads(Path(args.corpus).read_text(encoding="utf-8")) if args.corpus else CORPUS
+    concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    results = []
+    for voice in voices:
+        print(f"▶ {voice} ...", file=sys.stderr)
+        try:
+            results.append(bench_voice(voice, corpus, args.repeats, concurrency))
+        except Exception as e:
+            results.append({"voice": voice, "error": str(e)})
+            print(f"  ✗ {e}", file=sys.stderr)
+
+    report = {
+        "host": {
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "corpus": {label: len(text) for label, text in corpus.items()},
+        "results": results,
+    }
+    Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class TTSSettings(BaseSettings):
+    # Tracing: con traceparent muestreado se sigue la decisión del core
+    tracing_enabled: bool = False
+    trace_sample_rate: float = 0.0           # trazas propias (llamadas sin traceparent)
+    trace_exporter: str = "file"
+    trace_file: str = "logs/traces.jsonl"
+    otlp_endpoint: str = "http://otel-collector:4318/v1/traces"
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+settings = TTSSettings()
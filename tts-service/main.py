@@ -1,11 +1,15 @@
+import asyncio
 import sys
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
 from loguru import logger
 
+from config import settings
+from profiler import ProfilerBusy, profiler
 from synthesizer import synthesizer
+from tracing import tracer
 
 logger.remove()
 logger.add(sys.stdout, level="INFO", format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | {message}")
@@ -13,14 +17,34 @@ logger.add(sys.stdout, level="INFO", format="<green>{time:HH:mm:ss}</green> | <l
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tracer.configure(
+        "venzio-tts", settings.tracing_enabled, settings.trace_sample_rate,
+        exporter=settings.trace_exporter, path=settings.trace_file, endpoint=settings.otlp_endpoint,
+    )
     logger.info("🔊 TTS Service listo (Piper TTS / español)")
     yield
+    tracer.shutdown()
     logger.info("🛑 TTS Service detenido")
 
 
 app = FastAPI(title="Venzio TTS Service", version="1.0.0", lifespan=lifespan)
 
 
+# Límite del profiler; el endpoint solo es accesible desde la red interna (vía fastapi-core)
+PROFILE_MAX_SECONDS = 60
+
+
+@app.post("/debug/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, hz: int = 100):
+    """Perfil de muestreo del proceso por `seconds` segundos, en formato collapsed stacks."""
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    hz = min(max(hz, 1), 1000)
+    try:
+        return await asyncio.to_thread(profiler.run, seconds, hz)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "tts", "engine": "piper"}
@@ -30,6 +54,7 @@ def health():
 def synthesize(
     text: str,
     voice: str = "es_ES-davefx-medium.onnx",
+    traceparent: str | None = Header(None),
 ):
     """
     Sintetiza el texto dado y devuelve audio WAV.
@@ -40,7 +65,8 @@ def synthesize(
         raise HTTPException(status_code=400, detail="El texto no puede estar vacío")
 
     try:
-        audio_bytes = synthesizer.synthesize(text, voice)
+        with tracer.span("tts.synthesize", parent=tracer.extract(traceparent), voice=voice, chars=len(text)):
+            audio_bytes = synthesizer.synthesize(text, voice)
         return Response(
             content=audio_bytes,
             media_type="audio/wav",
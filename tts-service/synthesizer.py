@@ -4,6 +4,8 @@ import subprocess
 import tempfile
 from loguru import logger
 
+from tracing import tracer
+
 
 class PiperSynthesizer:
     """
@@ -52,18 +54,20 @@ class PiperSynthesizer:
                 "--model", model_path,
                 "--output_file", out_path,
             ]
-            result = subprocess.run(
-                cmd,
-                input=text,
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-            if result.returncode != 0:
-                raise RuntimeError(f"Error en Piper: {result.stderr}")
+            with tracer.span("tts.piper", model=voice_model_file):
+                result = subprocess.run(
+                    cmd,
+                    input=text,
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                )
+                if result.returncode != 0:
+                    raise RuntimeError(f"Error en Piper: {result.stderr}")
 
-            with open(out_path, "rb") as f:
-                audio_bytes = f.read()
+            with tracer.span("tts.read_wav"):
+                with open(out_path, "rb") as f:
+                    audio_bytes = f.read()
 
             logger.debug(f"TTS sintetizó {len(text)} chars → {len(audio_bytes)} bytes WAV")
             return audio_bytes
@@ -0,0 +1,224 @@
+# Archivo compartido: la fuente es fastapi-core/tracing.py. stt-service/ y
+# tts-service/ tienen copias idénticas porque cada servicio se construye con su
+# propio contexto de Docker; editar la de fastapi-core y volver a copiarla.
+
+import contextvars
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from loguru import logger
+
+# Span activo del contexto actual (tarea asyncio o hilo)
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: str | None, name: str, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: str | None = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": k, "value": {"intValue": str(v)} if isinstance(v, int) and not isinstance(v, bool)
+                 else {"doubleValue": v} if isinstance(v, float)
+                 else {"stringValue": str(v)}}
+                for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+# Marca de traza no muestreada: los spans hijos heredan la decisión (no se
+# graban ni propagan) en vez de sortear de nuevo como si fueran raíz
+_UNSAMPLED = Span("", None, "unsampled", {})
+
+
+class Tracer:
+    """
+    Tracing mínimo compatible con W3C Trace Context y OTLP/JSON, sin dependencias.
+
+    - `span(nombre)` abre un span hijo del activo, o una traza nueva muestreada
+      con `sample_rate` si no hay ninguno.
+    - `inject()` / `extract()` propagan el contexto vía el header `traceparent`.
+    - Los spans terminados se exportan en un hilo aparte, en lotes, a un archivo
+      JSONL (un payload OTLP por línea) o a un colector OTLP/HTTP.
+    Si la traza no está muestreada, los spans no cuestan más que un contextvar:
+    la raíz deja una marca y sus hijos no se graban ni propagan `traceparent`.
+    """
+
+    def __init__(self):
+        self.service_name = "venzio"
+        self.enabled = False
+        self.sample_rate = 0.0
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=10000)
+        self._exporter = None
+
+    def configure(self, service_name: str, enabled: bool, sample_rate: float, exporter: str = "file",
+                  path: str = "logs/traces.jsonl", endpoint: str = "") -> None:
+        self.service_name = service_name
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        if not enabled or self._exporter:
+            return
+        if exporter == "otlp":
+            send = lambda payload: self._post(endpoint, payload)  # noqa: E731
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            send = lambda payload: self._append(path, payload)  # noqa: E731
+        self._exporter = threading.Thread(target=self._export_loop, args=(send,), name="trace-exporter", daemon=True)
+        self._exporter.start()
+        logger.info(f"Tracing activo | servicio={service_name} | exporter={exporter} | muestreo={sample_rate}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Exporta los spans pendientes y detiene el hilo exportador."""
+        if not self._exporter:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._exporter.join(timeout)
+        self._exporter = None
+
+    # ── Propagación ───────────────────────────────────────────────────────────
+    @staticmethod
+    def extract(traceparent: str | None) -> tuple[str, str] | None:
+        """Parsea `traceparent`. Devuelve (trace_id, span_id padre) si la traza viene muestreada."""
+        if not traceparent:
+            return None
+        parts = traceparent.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            sampled = int(parts[3], 16) & 1
+        except ValueError:
+            return None
+        return (parts[1], parts[2]) if sampled else None
+
+    @staticmethod
+    def inject(headers: dict | None = None) -> dict:
+        """Agrega `traceparent` del span activo (si lo hay) a los headers."""
+        headers = dict(headers or {})
+        span = _current.get()
+        if span is not None and span is not _UNSAMPLED:
+            headers["traceparent"] = f"00-{span.trace_id}-{span.span_id}-01"
+        return headers
+
+    # ── Spans ─────────────────────────────────────────────────────────────────
+    @contextmanager
+    def span(self, name: str, parent: tuple[str, str] | None = None, **attributes):
+        """
+        Abre un span. `parent` (de `extract`) lo cuelga de una traza remota;
+        sin padre activo ni remoto se decide el muestreo de una traza nueva.
+        """
+        if not self.enabled:
+            yield None
+            return
+        current = _current.get()
+        if parent is not None:
+            span = Span(parent[0], parent[1], name, attributes)
+        elif current is _UNSAMPLED:
+            yield None
+            return
+        elif current is not None:
+            span = Span(current.trace_id, current.span_id, name, attributes)
+        elif random.random() < self.sample_rate:
+            span = Span(secrets.token_hex(16), None, name, attributes)
+        else:
+            token = _current.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                pass  # Nunca bloquear el hot path por el exportador
+
+    # ── Exportación (hilo aparte) ─────────────────────────────────────────────
+    def _payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "venzio"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+
+    @staticmethod
+    def _append(path: str, payload: dict) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _post(endpoint: str, payload: dict) -> None:
+        request = urllib.request.Request(
+            endpoint, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+    def _export_loop(self, send) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            batch = [first] if first is not None else []
+            stopping = first is None
+            deadline = time.monotonic() + 1.0
+            while not stopping and len(batch) < 512 and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    span = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                else:
+                    batch.append(span)
+            if not batch:
+                continue
+            try:
+                send(self._payload(batch))
+            except Exception as e:
+                logger.warning(f"No se pudieron exportar {len(batch)} spans: {e}")
+
+
+# Singleton global; cada servicio lo configura en su lifespan
+tracer = Tracer()
@@ -0,0 +1,68 @@
+/**
+ * Build del widget: une los módulos ES (desde widget.js) en widget.bundle.js,
+ * un script clásico autocontenido que embed.js carga con <script>.
+ *
+ *   node widget/build.mjs
+ *
+ * Sin dependencias: cada módulo queda en su propia función (sus nombres
+ * internos no chocan con los de otros) y los imports se resuelven contra los
+ * exports de los módulos ya evaluados. Solo soporta la sintaxis que usan estos
+ * archivos: `import { A, B } from './x.js';` y `export { A, B };`.
+ * Cualquier cambio en widget/*.js requiere volver a correrlo y commitear el bundle.
+ */
+import { readFileSync, writeFileSync } from 'node:fs';
+import { dirname, join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+
+const DIR = dirname(fileURLToPath(import.meta.url));
+const ENTRY = 'widget.js';
+const OUTPUT = 'widget.bundle.js';
+
+const IMPORT = /^import\s*\{([^}]*)\}\s*from\s*['"]\.\/([\w.-]+)['"];?\s*$/;
+const EXPORT = /^export\s*\{([^}]*)\};?\s*$/;
+
+const names = (list) => list.split(',').map(name => name.trim()).filter(Boolean);
+const moduleVar = (file) => `__venzio_${file.replace(/\.js$/, '').replace(/\W/g, '_')}`;
+
+const modules = [];   // en orden de dependencias
+const seen = new Set();
+
+function load(file) {
+    if (seen.has(file)) return;
+    seen.add(file);
+    const imports = [];
+    const exports = [];
+    const body = [];
+    for (const line of readFileSync(join(DIR, file), 'utf8').split('\n')) {
+        let match;
+        if ((match = line.match(IMPORT))) {
+            imports.push({ file: match[2], names: names(match[1]) });
+        } else if ((match = line.match(EXPORT))) {
+            exports.push(...names(match[1]));
+        } else if (/^\s*(import|export)\b/.test(line)) {
+            throw new Error(`${file}: sintaxis de módulo no soportada: ${line.trim()}`);
+        } else {
+            body.push(line);
+        }
+    }
+    imports.forEach(dep => load(dep.file));
+    modules.push({ file, imports, exports, body });
+}
+
+load(ENTRY);
+
+const parts = [`// Generado por widget/build.mjs a partir de ${ENTRY}. No editar a mano.`, '(() => {'];
+for (const mod of modules) {
+    parts.push(`// ── ${mod.file} ──`);
+    parts.push(`const ${moduleVar(mod.file)} = (() => {`);
+    for (const dep of mod.imports) {
+        parts.push(`const { ${dep.names.join(', ')} } = ${moduleVar(dep.file)};`);
+    }
+    parts.push(mod.body.join('\n').trim());
+    parts.push(`return { ${mod.exports.join(', ')} };`);
+    parts.push('})();');
+}
+parts.push('})();', '');
+
+writeFileSync(join(DIR, OUTPUT), parts.join('\n'));
+console.log(`${OUTPUT}: ${modules.map(mod => mod.file).join(' → ')}`);
@@ -32,6 +32,8 @@ const CONFIG = {
     websocket: {
         maxAttempts: 3,
         delayMs: 2000,
+        framing: true,      // framing binario venzio.v1 (si el servidor no lo acepta, JSON)
+        chunkBytes: 16384,  // tamaño de los trozos de audio enviados con framing
     },
 
     // API settings
@@ -5,11 +5,42 @@
 
 import { CONFIG } from './config.js';
 
+// Framing binario versionado (ver fastapi-core/framing.py): cada mensaje binario es
+// [versión u8][tipo u8][turno u32][seq u32][payload], big-endian. Se negocia como
+// subprotocolo; los mensajes de texto siguen siendo JSON.
+const FRAMING_PROTOCOL = 'venzio.v1';
+const FRAMING_VERSION = 1;
+const HEADER_BYTES = 10;
+const FRAME = {
+    AUDIO: 0x01,
+    AUDIO_END: 0x02,
+    TRANSCRIPT: 0x10,
+    REPLY_TEXT: 0x11,
+    ERROR: 0x12,
+    EVENT: 0x20,
+};
+
 class WebSocketClient {
     constructor() {
         this.ws = null;
         this.isConnected = false;
 
+        // Reanudación: si la conexión se cae, reconectar con el resume token de la
+        // sesión para seguir la misma conversación (el servidor la espera un rato)
+        this.voiceId = null;
+        this.token = null;
+        this.resumeToken = null;
+        this.closing = false;
+
+        // Framing: negociado en cada conexión (un servidor viejo no lo acepta)
+        this.framed = false;
+        this.sendSeq = 0;
+        this.recvSeq = null;
+        this.sendTurn = 0;
+        this.audioTurn = null;
+        this.audioParts = [];
+        this.textDecoder = new TextDecoder();
+
         // Callbacks
         this.onTranscript = null; // (text: string) => void
         this.onReply = null;     // (text: string) => void
@@ -22,15 +53,33 @@ class WebSocketClient {
     async connect(voiceId, token) {
         if (this.isConnected) return;
 
+        this.voiceId = voiceId;
+        this.token = token;
+        this.resumeToken = null;
+        this.closing = false;
+        return this._open(false);
+    }
+
+    async _open(resuming) {
         try {
-            const wsUrl = `${CONFIG.api.wsBaseUrl}/ws/public/voice/${voiceId}?token=${token}`;
-            this.ws = new WebSocket(wsUrl);
+            let wsUrl = `${CONFIG.api.wsBaseUrl}/ws/public/voice/${this.voiceId}?token=${this.token}`;
+            if (resuming) wsUrl += `&resume=${encodeURIComponent(this.resumeToken)}`;
+            this.ws = CONFIG.websocket.framing
+                ? new WebSocket(wsUrl, [FRAMING_PROTOCOL])
+                : new WebSocket(wsUrl);
+            this.ws.binaryType = 'arraybuffer';
 
             return new Promise((resolve, reject) => {
                 this.ws.onopen = () => {
-                    console.log('[WebSocket] Connected');
+                    console.log(resuming ? '[WebSocket] Reconnected' : '[WebSocket] Connected');
                     this.isConnected = true;
-                    if (this.onConnected) this.onConnected();
+                    this.framed = this.ws.protocol === FRAMING_PROTOCOL;
+                    this.sendSeq = 0;
+                    this.recvSeq = null;
+                    this.audioTurn = null;
+                    this.audioParts = [];
+                    // Al reanudar el pipeline de audio nunca se detuvo
+                    if (!resuming && this.onConnected) this.onConnected();
                     resolve();
                 };
 
@@ -40,13 +89,21 @@ class WebSocketClient {
 
                 this.ws.onerror = (error) => {
                     console.error('[WebSocket] Error:', error);
-                    if (this.onError) this.onError('Connection error');
+                    if (!resuming && this.onError) this.onError('Connection error');
                     reject(error);
                 };
 
-                this.ws.onclose = () => {
-                    console.log('[WebSocket] Disconnected');
+                this.ws.onclose = (event) => {
+                    const wasConnected = this.isConnected;
                     this.isConnected = false;
+                    // 4408: el servidor cerró la sesión (inactividad o duración máxima), no reanudar
+                    if (wasConnected && !this.closing && this.resumeToken && event.code !== 4408) {
+                        console.log('[WebSocket] Connection lost, resuming session');
+                        this._resume();
+                        return;
+                    }
+                    if (resuming) return; // el loop de _resume decide
+                    console.log('[WebSocket] Disconnected');
                     if (this.onDisconnected) this.onDisconnected();
                 };
             });
@@ -57,7 +114,24 @@ class WebSocketClient {
         }
     }
 
+    async _resume() {
+        for (let attempt = 1; attempt <= CONFIG.websocket.maxAttempts; attempt++) {
+            await new Promise(r => setTimeout(r, CONFIG.websocket.delayMs * attempt));
+            if (this.closing) return;
+            try {
+                await this._open(true);
+                return;
+            } catch (error) {
+                console.warn(`[WebSocket] Resume attempt ${attempt} failed`);
+            }
+        }
+        this.resumeToken = null;
+        console.log('[WebSocket] Disconnected');
+        if (this.onDisconnected) this.onDisconnected();
+    }
+
     disconnect() {
+        this.closing = true;
         if (this.ws && this.isConnected) {
             this.ws.close();
         }
@@ -71,7 +145,17 @@ class WebSocketClient {
 
         try {
             console.log(`[WebSocket] Sending audio: ${audioBuffer.byteLength} bytes`);
-            this.ws.send(audioBuffer);
+            if (!this.framed) {
+                this.ws.send(audioBuffer);
+                return;
+            }
+            // Con framing: trozos AUDIO del turno y un AUDIO_END que dispara el proceso
+            const turn = ++this.sendTurn;
+            const bytes = new Uint8Array(audioBuffer);
+            for (let start = 0; start < bytes.length; start += CONFIG.websocket.chunkBytes) {
+                this.ws.send(this._frame(FRAME.AUDIO, turn, bytes.subarray(start, start + CONFIG.websocket.chunkBytes)));
+            }
+            this.ws.send(this._frame(FRAME.AUDIO_END, turn));
         } catch (error) {
             console.error('[WebSocket] Error sending audio:', error);
             if (this.onError) this.onError('Error sending audio');
@@ -79,6 +163,7 @@ class WebSocketClient {
     }
 
     sendEndSession() {
+        this.closing = true;
         if (!this.isConnected || !this.ws) return;
 
         try {
@@ -88,13 +173,28 @@ class WebSocketClient {
         }
     }
 
+    _frame(type, turn, payload = null) {
+        const length = payload ? payload.byteLength : 0;
+        const frame = new Uint8Array(HEADER_BYTES + length);
+        const view = new DataView(frame.buffer);
+        view.setUint8(0, FRAMING_VERSION);
+        view.setUint8(1, type);
+        view.setUint32(2, turn);
+        view.setUint32(6, this.sendSeq);
+        this.sendSeq = (this.sendSeq + 1) >>> 0;
+        if (payload) frame.set(payload, HEADER_BYTES);
+        return frame.buffer;
+    }
+
     _handleMessage(event) {
-        if (event.data instanceof Blob) {
+        if (event.data instanceof ArrayBuffer) {
+            if (this.framed) {
+                this._handleFrame(event.data);
+                return;
+            }
             // Binary audio data
-            event.data.arrayBuffer().then(audioBuffer => {
-                console.log(`[WebSocket] Received audio: ${audioBuffer.byteLength} bytes`);
-                if (this.onAudio) this.onAudio(audioBuffer);
-            });
+            console.log(`[WebSocket] Received audio: ${event.data.byteLength} bytes`);
+            if (this.onAudio) this.onAudio(event.data);
         } else {
             // Text message
             try {
@@ -106,10 +206,87 @@ class WebSocketClient {
         }
     }
 
+    _handleFrame(buffer) {
+        if (buffer.byteLength < HEADER_BYTES) {
+            console.error('[WebSocket] Short frame:', buffer.byteLength);
+            return;
+        }
+        const view = new DataView(buffer);
+        if (view.getUint8(0) !== FRAMING_VERSION) {
+            console.error('[WebSocket] Unsupported framing version:', view.getUint8(0));
+            return;
+        }
+        const type = view.getUint8(1);
+        const turn = view.getUint32(2);
+        const seq = view.getUint32(6);
+        const payload = new Uint8Array(buffer, HEADER_BYTES);
+
+        if (this.recvSeq !== null && seq !== this.recvSeq) {
+            // Falta o sobra un frame: el clip a medias ya no es reproducible
+            console.warn(`[WebSocket] Frame seq ${seq}, expected ${this.recvSeq}`);
+            this.audioParts = [];
+        }
+        this.recvSeq = (seq + 1) >>> 0;
+
+        switch (type) {
+            case FRAME.AUDIO:
+                if (turn !== this.audioTurn) {
+                    this.audioTurn = turn;
+                    this.audioParts = [];
+                }
+                this.audioParts.push(payload);
+                break;
+
+            case FRAME.AUDIO_END: {
+                if (turn !== this.audioTurn || !this.audioParts.length) break;
+                const size = this.audioParts.reduce((total, part) => total + part.byteLength, 0);
+                const audio = new Uint8Array(size);
+                let offset = 0;
+                for (const part of this.audioParts) {
+                    audio.set(part, offset);
+                    offset += part.byteLength;
+                }
+                this.audioParts = [];
+                console.log(`[WebSocket] Received audio: ${size} bytes (turn ${turn})`);
+                if (this.onAudio) this.onAudio(audio.buffer);
+                break;
+            }
+
+            case FRAME.TRANSCRIPT:
+                this._handleTextMessage({ type: 'final_transcript', text: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.REPLY_TEXT:
+                this._handleTextMessage({ type: 'reply_text', text: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.ERROR:
+                this._handleTextMessage({ type: 'error', message: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.EVENT:
+                try {
+                    this._handleTextMessage(JSON.parse(this.textDecoder.decode(payload)));
+                } catch (error) {
+                    console.error('[WebSocket] Error parsing event frame:', error);
+                }
+                break;
+
+            default:
+                console.log('[WebSocket] Unknown frame type:', type);
+        }
+    }
+
     _handleTextMessage(msg) {
         switch (msg.type) {
             case 'session_ready':
-                console.log('[WebSocket] Session ready:', msg.voice);
+                console.log('[WebSocket] Session ready:', msg.voice, msg.resumed ? '(resumed)' : '');
+                this.resumeToken = msg.resume_token || null;
+                break;
+
+            case 'ping':
+                // Heartbeat: sin pong el servidor da la conexión por perdida y libera el slot
+                try { this.ws.send(JSON.stringify({ type: 'pong' })); } catch (error) { /* cerrándose */ }
                 break;
 
             case 'final_transcript':
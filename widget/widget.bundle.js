@@ -1,4 +1,149 @@
-(()=>{var o={audio:{sampleRate:16e3,channels:1,bitDepth:16},vad:{threshold:.01,minSpeechMs:200,silenceMs:700},prebuffer:{durationMs:300},recording:{maxRecordingMs:15e3},websocket:{maxAttempts:3,delayMs:2e3},api:{baseUrl:"https://venzio.online",wsBaseUrl:"wss://venzio.online"}};var l=class{constructor(){this.audioContext=null,this.audioStream=null,this.workletNode=null,this.isCapturing=!1,this.onAudioFrame=null}async start(){if(console.log("[Venzio][DEBUG] starting audio capture"),!this.isCapturing)try{this.audioStream=await navigator.mediaDevices.getUserMedia({audio:{echoCancellation:!0,noiseSuppression:!0,autoGainControl:!0,channelCount:o.audio.channels,sampleRate:o.audio.sampleRate}}),this.audioContext=new AudioContext({sampleRate:o.audio.sampleRate}),this.audioContext.state==="suspended"&&await this.audioContext.resume(),await this.audioContext.audioWorklet.addModule(this._createWorkletUrl()),this.workletNode=new AudioWorkletNode(this.audioContext,"audio-capture-processor"),this.workletNode.port.onmessage=s=>{this.onAudioFrame&&s.data.samples&&this.onAudioFrame(s.data.samples)},this.audioContext.createMediaStreamSource(this.audioStream).connect(this.workletNode);let t=this.audioContext.createGain();t.gain.value=0,this.workletNode.connect(t),t.connect(this.audioContext.destination),this.isCapturing=!0,console.log("[AudioCapture] Started")}catch(e){throw console.error("[AudioCapture] Error starting:",e),e}}stop(){this.isCapturing&&(this.audioStream&&this.audioStream.getTracks().forEach(e=>e.stop()),this.workletNode&&(this.workletNode.disconnect(),this.workletNode=null),this.audioContext&&(this.audioContext.close(),this.audioContext=null),this.isCapturing=!1,console.log("[AudioCapture] Stopped"))}_createWorkletUrl(){let e=`
+// Generado por widget/build.mjs a partir de widget.js. No editar a mano.
+(() => {
+// ── config.js ──
+const __venzio_config = (() => {
+/**
+ * Venzio Widget Configuration
+ * Configuraciones técnicas obligatorias para el sistema de voz
+ */
+
+const CONFIG = {
+    // Audio settings
+    audio: {
+        sampleRate: 16000,
+        channels: 1,
+        bitDepth: 16,
+    },
+
+    // VAD settings
+    vad: {
+        threshold: 0.01,
+        minSpeechMs: 200,
+        silenceMs: 700,
+    },
+
+    // Prebuffer settings
+    prebuffer: {
+        durationMs: 300,
+    },
+
+    // Recording settings
+    recording: {
+        maxRecordingMs: 15000,
+    },
+
+    // WebSocket settings
+    websocket: {
+        maxAttempts: 3,
+        delayMs: 2000,
+        framing: true,      // framing binario venzio.v1 (si el servidor no lo acepta, JSON)
+        chunkBytes: 16384,  // tamaño de los trozos de audio enviados con framing
+    },
+
+    // API settings
+    api: {
+        baseUrl: 'https://venzio.online',
+        wsBaseUrl: 'wss://venzio.online',
+    },
+};
+return { CONFIG };
+})();
+// ── audio_capture.js ──
+const __venzio_audio_capture = (() => {
+const { CONFIG } = __venzio_config;
+/**
+ * Audio Capture Module
+ * Captura audio continuamente del micrófono usando AudioWorklet
+ */
+
+
+class AudioCapture {
+    constructor() {
+        this.audioContext = null;
+        this.audioStream = null;
+        this.workletNode = null;
+        this.isCapturing = false;
+        this.onAudioFrame = null; // callback: (samples: Float32Array) => void
+    }
+
+    async start() {
+        console.log('[Venzio][DEBUG] starting audio capture');
+
+        if (this.isCapturing) return;
+
+        try {
+            // Get microphone access
+            this.audioStream = await navigator.mediaDevices.getUserMedia({
+                audio: {
+                    echoCancellation: true,
+                    noiseSuppression: true,
+                    autoGainControl: true,
+                    channelCount: CONFIG.audio.channels,
+                    sampleRate: CONFIG.audio.sampleRate,
+                }
+            });
+
+            // Create AudioContext
+            this.audioContext = new AudioContext({ sampleRate: CONFIG.audio.sampleRate });
+            if (this.audioContext.state === 'suspended') {
+                await this.audioContext.resume();
+            }
+
+            // Load AudioWorklet
+            await this.audioContext.audioWorklet.addModule(this._createWorkletUrl());
+
+            // Create worklet node
+            this.workletNode = new AudioWorkletNode(this.audioContext, 'audio-capture-processor');
+
+            // Handle messages from worklet
+            this.workletNode.port.onmessage = (event) => {
+                if (this.onAudioFrame && event.data.samples) {
+                    this.onAudioFrame(event.data.samples);
+                }
+            };
+
+            // Connect microphone to worklet
+            const source = this.audioContext.createMediaStreamSource(this.audioStream);
+            source.connect(this.workletNode);
+
+            // Connect worklet to destination (silent)
+            const gainNode = this.audioContext.createGain();
+            gainNode.gain.value = 0;
+            this.workletNode.connect(gainNode);
+            gainNode.connect(this.audioContext.destination);
+
+            this.isCapturing = true;
+            console.log('[AudioCapture] Started');
+
+        } catch (error) {
+            console.error('[AudioCapture] Error starting:', error);
+            throw error;
+        }
+    }
+
+    stop() {
+        if (!this.isCapturing) return;
+
+        if (this.audioStream) {
+            this.audioStream.getTracks().forEach(track => track.stop());
+        }
+
+        if (this.workletNode) {
+            this.workletNode.disconnect();
+            this.workletNode = null;
+        }
+
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
+
+        this.isCapturing = false;
+        console.log('[AudioCapture] Stopped');
+    }
+
+    _createWorkletUrl() {
+        const workletCode = `
             class AudioCaptureProcessor extends AudioWorkletProcessor {
                 process(inputs, outputs, parameters) {
                     const input = inputs[0];
@@ -13,7 +158,880 @@
             }
 
             registerProcessor('audio-capture-processor', AudioCaptureProcessor);
-        `,t=new Blob([e],{type:"application/javascript"});return URL.createObjectURL(t)}};var d=class{constructor(){this.onVoiceStart=null,this.onVoiceEnd=null,this.isVoiceActive=!1,this.voiceStartTime=null,this.lastVoiceTime=null,this.silenceTimer=null,this.threshold=o.vad.threshold,this.minSpeechMs=o.vad.minSpeechMs,this.silenceMs=o.vad.silenceMs}processAudioFrame(e){let t=this._calculateRMS(e),s=Date.now();t>this.threshold?(this.lastVoiceTime=s,this.isVoiceActive||(this.voiceStartTime?s-this.voiceStartTime>this.minSpeechMs&&this._triggerVoiceStart():this.voiceStartTime=s),this.silenceTimer&&(clearTimeout(this.silenceTimer),this.silenceTimer=null)):this.isVoiceActive&&!this.silenceTimer&&(this.silenceTimer=setTimeout(()=>{this._triggerVoiceEnd()},this.silenceMs))}reset(){this.isVoiceActive=!1,this.voiceStartTime=null,this.lastVoiceTime=null,this.silenceTimer&&(clearTimeout(this.silenceTimer),this.silenceTimer=null)}_calculateRMS(e){let t=0;for(let s=0;s<e.length;s++)t+=e[s]*e[s];return Math.sqrt(t/e.length)}_triggerVoiceStart(){this.isVoiceActive||(this.isVoiceActive=!0,console.log("[VAD] Voice start detected"),this.onVoiceStart&&this.onVoiceStart())}_triggerVoiceEnd(){this.isVoiceActive&&(this.isVoiceActive=!1,this.voiceStartTime=null,this.lastVoiceTime=null,console.log("[VAD] Voice end detected"),this.onVoiceEnd&&this.onVoiceEnd())}};var g=class{constructor(e=16e3,t=1){this.sampleRate=e,this.numChannels=t}encode(e){let t=new ArrayBuffer(44+e.length*2),s=new DataView(t);this._writeString(s,0,"RIFF"),s.setUint32(4,36+e.length*2,!0),this._writeString(s,8,"WAVE"),this._writeString(s,12,"fmt "),s.setUint32(16,16,!0),s.setUint16(20,1,!0),s.setUint16(22,this.numChannels,!0),s.setUint32(24,this.sampleRate,!0),s.setUint32(28,this.sampleRate*2*this.numChannels,!0),s.setUint16(32,this.numChannels*2,!0),s.setUint16(34,16,!0),this._writeString(s,36,"data"),s.setUint32(40,e.length*2,!0);let n=44;for(let c=0;c<e.length;c++,n+=2){let r=Math.max(-1,Math.min(1,e[c]));s.setInt16(n,r<0?r*32768:r*32767,!0)}return t}_writeString(e,t,s){for(let n=0;n<s.length;n++)e.setUint8(t+n,s.charCodeAt(n))}},f=class{constructor(e){this.buffer=new Float32Array(e),this.size=e,this.writeIndex=0,this.isFull=!1}push(e){this.buffer[this.writeIndex]=e,this.writeIndex=(this.writeIndex+1)%this.size,this.writeIndex===0&&(this.isFull=!0)}getContents(){if(!this.isFull)return this.buffer.slice(0,this.writeIndex);let e=new Float32Array(this.size),t=this.buffer.slice(this.writeIndex),s=this.buffer.slice(0,this.writeIndex);return e.set(t),e.set(s,t.length),e}},h=class{constructor(){this.onAudioReady=null,this.wavEncoder=new g(o.audio.sampleRate,o.audio.channels);let e=Math.floor(o.audio.sampleRate*o.prebuffer.durationMs/1e3);this.prebuffer=new f(e),this.recordingBuffer=[],this.isRecording=!1,this.maxRecordingSamples=Math.floor(o.audio.sampleRate*o.recording.maxRecordingMs/1e3)}processAudioFrame(e){for(let t=0;t<e.length;t++)this.prebuffer.push(e[t]);if(this.isRecording){for(let t=0;t<e.length;t++)if(this.recordingBuffer.push(e[t]),this.recordingBuffer.length>=this.maxRecordingSamples){this.stopRecording();break}}}startRecording(){if(this.isRecording)return;console.log("[Recorder] Start recording");let e=this.prebuffer.getContents();this.recordingBuffer=Array.from(e),this.isRecording=!0}stopRecording(){if(!this.isRecording)return;if(console.log("[Recorder] Stop recording"),this.isRecording=!1,this.recordingBuffer.length===0){console.log("[Recorder] No audio to process");return}let e=new Float32Array(this.recordingBuffer),t=this.wavEncoder.encode(e);console.log(`[Recorder] Generated WAV: ${e.length} samples, ${(e.length/o.audio.sampleRate).toFixed(2)}s`),this.onAudioReady&&this.onAudioReady(t),this.recordingBuffer=[]}reset(){this.recordingBuffer=[],this.isRecording=!1}};var u=class{constructor(){this.ws=null,this.isConnected=!1,this.onTranscript=null,this.onReply=null,this.onAudio=null,this.onError=null,this.onConnected=null,this.onDisconnected=null}async connect(e,t){if(!this.isConnected)try{let s=`${o.api.wsBaseUrl}/ws/public/voice/${e}?token=${t}`;return this.ws=new WebSocket(s),new Promise((n,c)=>{this.ws.onopen=()=>{console.log("[WebSocket] Connected"),this.isConnected=!0,this.onConnected&&this.onConnected(),n()},this.ws.onmessage=r=>{this._handleMessage(r)},this.ws.onerror=r=>{console.error("[WebSocket] Error:",r),this.onError&&this.onError("Connection error"),c(r)},this.ws.onclose=()=>{console.log("[WebSocket] Disconnected"),this.isConnected=!1,this.onDisconnected&&this.onDisconnected()}})}catch(s){throw console.error("[WebSocket] Connection failed:",s),s}}disconnect(){this.ws&&this.isConnected&&this.ws.close()}sendAudio(e){if(!this.isConnected||!this.ws){console.error("[WebSocket] Not connected");return}try{console.log(`[WebSocket] Sending audio: ${e.byteLength} bytes`),this.ws.send(e)}catch(t){console.error("[WebSocket] Error sending audio:",t),this.onError&&this.onError("Error sending audio")}}sendEndSession(){if(!(!this.isConnected||!this.ws))try{this.ws.send(JSON.stringify({type:"end_session"}))}catch(e){console.error("[WebSocket] Error sending end_session:",e)}}_handleMessage(e){if(e.data instanceof Blob)e.data.arrayBuffer().then(t=>{console.log(`[WebSocket] Received audio: ${t.byteLength} bytes`),this.onAudio&&this.onAudio(t)});else try{let t=JSON.parse(e.data);this._handleTextMessage(t)}catch(t){console.error("[WebSocket] Error parsing message:",t)}}_handleTextMessage(e){switch(e.type){case"session_ready":console.log("[WebSocket] Session ready:",e.voice);break;case"final_transcript":console.log("[WebSocket] Transcript:",e.text),this.onTranscript&&this.onTranscript(e.text);break;case"reply_text":console.log("[WebSocket] Reply:",e.text),this.onReply&&this.onReply(e.text);break;case"error":console.error("[WebSocket] Error:",e.message),this.onError&&this.onError(e.message);break;default:console.log("[WebSocket] Unknown message type:",e.type)}}};var p=class{constructor(){this.audioContext=null,this.currentSource=null,this.isPlaying=!1,this.onEnd=null}async play(e){this.isPlaying&&this.stop();try{this.audioContext||(this.audioContext=new AudioContext({sampleRate:o.audio.sampleRate}),this.audioContext.state==="suspended"&&await this.audioContext.resume());let t=await this.audioContext.decodeAudioData(e.slice());this.currentSource=this.audioContext.createBufferSource(),this.currentSource.buffer=t,this.currentSource.connect(this.audioContext.destination),this.currentSource.onended=()=>{this.isPlaying=!1,this.currentSource=null,console.log("[Player] Playback ended"),this.onEnd&&this.onEnd()},this.currentSource.start(0),this.isPlaying=!0,console.log(`[Player] Started playback: ${t.duration.toFixed(2)}s`)}catch(t){console.error("[Player] Error playing audio:",t),this.isPlaying=!1}}stop(){if(this.currentSource&&this.isPlaying)try{this.currentSource.stop(),console.log("[Player] Playback stopped")}catch(e){console.error("[Player] Error stopping playback:",e)}this.currentSource=null,this.isPlaying=!1}destroy(){this.stop(),this.audioContext&&(this.audioContext.close(),this.audioContext=null)}};var i={IDLE:"idle",CONNECTING:"connecting",LISTENING:"listening",RECORDING:"recording",PROCESSING:"processing",PLAYING:"playing",ERROR:"error"},m=class{constructor(e={}){if(console.log("[Venzio][DEBUG] widget constructor called"),!e.siteId||!e.voiceId||!e.token)throw new Error("siteId, voiceId y token son requeridos");this.options={apiBase:e.apiBase||o.api.baseUrl,agentName:e.agentName||"Agente Venzio",siteId:e.siteId,voiceId:e.voiceId,token:e.token,...e},this.state=i.IDLE,this.audioCapture=new l,this.vad=new d,this.recorder=new h,this.wsClient=new u,this.player=new p,this._setupEventHandlers(),this.elements={},this.isOpen=!1,this._buildUI()}_setState(e){console.log(`[Widget] State: ${this.state} \u2192 ${e}`),this.state=e,this._updateUI()}_setupEventHandlers(){this.audioCapture.onAudioFrame=e=>{this.vad.processAudioFrame(e),this.recorder.processAudioFrame(e)},this.vad.onVoiceStart=()=>{if(console.log("[Venzio][DEBUG] VAD voice start detected"),console.log("[Venzio][DEBUG] current state:",this.state),this.state===i.PLAYING){if(this.playingStartedAt&&Date.now()-this.playingStartedAt<150){console.log("[Venzio][DEBUG] voice ignored (anti-echo protection)");return}console.log("[Venzio][DEBUG] barge-in triggered"),console.log("[Venzio][DEBUG] stopping player"),this.player.stop(),this.recorder.startRecording(),this._setState(i.RECORDING);return}this.state===i.LISTENING&&(this.recorder.startRecording(),this._setState(i.RECORDING))},this.vad.onVoiceEnd=()=>{this.state===i.RECORDING&&(this.recorder.stopRecording(),this._setState(i.PROCESSING))},this.recorder.onAudioReady=e=>{this.wsClient.sendAudio(e)},this.wsClient.onConnected=()=>{this._startAudioPipeline(),this._setState(i.LISTENING)},this.wsClient.onDisconnected=()=>{this._stopAudioPipeline(),this._setState(i.IDLE)},this.wsClient.onTranscript=e=>{this._addMessage("user",e)},this.wsClient.onReply=e=>{this._addMessage("agent",e)},this.wsClient.onAudio=e=>{this.playingStartedAt=Date.now(),this.player.play(e),this._setState(i.PLAYING)},this.wsClient.onError=e=>{this._addMessage("error",e),this._setState(i.ERROR)},this.player.onEnd=()=>{this._setState(i.LISTENING)}}async _startAudioPipeline(){try{await this.audioCapture.start(),console.log("[Widget] Audio pipeline started")}catch(e){console.error("[Widget] Failed to start audio pipeline:",e),this._setState(i.ERROR)}}_stopAudioPipeline(){this.audioCapture.stop(),this.vad.reset(),this.recorder.reset(),console.log("[Widget] Audio pipeline stopped")}async _connectWebSocket(){if(!this.options.voiceId||!this.options.token){this._addMessage("error","Configuraci\xF3n incompleta");return}this._setState(i.CONNECTING);try{await this.wsClient.connect(this.options.voiceId,this.options.token)}catch(e){console.error("[Widget] Connection failed:",e),this._setState(i.ERROR)}}_buildUI(){if(console.log("[Venzio][DEBUG] building UI"),!document.getElementById("vz-styles")){let t=document.createElement("link");t.id="vz-styles",t.rel="stylesheet",t.href=`${this.options.apiBase.replace("/api","")}/widget/widget.css`,document.head.appendChild(t)}let e=document.createElement("div");e.className="vz-widget",e.id="vz-widget",e.innerHTML=`
+        `;
+
+        const blob = new Blob([workletCode], { type: 'application/javascript' });
+        return URL.createObjectURL(blob);
+    }
+}
+return { AudioCapture };
+})();
+// ── vad.js ──
+const __venzio_vad = (() => {
+const { CONFIG } = __venzio_config;
+/**
+ * Voice Activity Detection Module
+ * Detecta inicio y fin de voz usando RMS y timers
+ */
+
+
+class VAD {
+    constructor() {
+        this.onVoiceStart = null; // callback: () => void
+        this.onVoiceEnd = null;   // callback: () => void
+
+        this.isVoiceActive = false;
+        this.voiceStartTime = null;
+        this.lastVoiceTime = null;
+        this.silenceTimer = null;
+
+        this.threshold = CONFIG.vad.threshold;
+        this.minSpeechMs = CONFIG.vad.minSpeechMs;
+        this.silenceMs = CONFIG.vad.silenceMs;
+    }
+
+    processAudioFrame(samples) {
+        const rms = this._calculateRMS(samples);
+        const now = Date.now();
+
+        if (rms > this.threshold) {
+            // Voice detected
+            this.lastVoiceTime = now;
+
+            if (!this.isVoiceActive) {
+                if (!this.voiceStartTime) {
+                    this.voiceStartTime = now;
+                } else if (now - this.voiceStartTime > this.minSpeechMs) {
+                    this._triggerVoiceStart();
+                }
+            }
+
+            // Clear silence timer
+            if (this.silenceTimer) {
+                clearTimeout(this.silenceTimer);
+                this.silenceTimer = null;
+            }
+        } else {
+            // Silence
+            if (this.isVoiceActive && !this.silenceTimer) {
+                this.silenceTimer = setTimeout(() => {
+                    this._triggerVoiceEnd();
+                }, this.silenceMs);
+            }
+        }
+    }
+
+    reset() {
+        this.isVoiceActive = false;
+        this.voiceStartTime = null;
+        this.lastVoiceTime = null;
+
+        if (this.silenceTimer) {
+            clearTimeout(this.silenceTimer);
+            this.silenceTimer = null;
+        }
+    }
+
+    _calculateRMS(samples) {
+        let sum = 0;
+        for (let i = 0; i < samples.length; i++) {
+            sum += samples[i] * samples[i];
+        }
+        return Math.sqrt(sum / samples.length);
+    }
+
+    _triggerVoiceStart() {
+        if (this.isVoiceActive) return;
+
+        this.isVoiceActive = true;
+        console.log('[VAD] Voice start detected');
+
+        if (this.onVoiceStart) {
+            this.onVoiceStart();
+        }
+    }
+
+    _triggerVoiceEnd() {
+        if (!this.isVoiceActive) return;
+
+        this.isVoiceActive = false;
+        this.voiceStartTime = null;
+        this.lastVoiceTime = null;
+
+        console.log('[VAD] Voice end detected');
+
+        if (this.onVoiceEnd) {
+            this.onVoiceEnd();
+        }
+    }
+}
+return { VAD };
+})();
+// ── recorder.js ──
+const __venzio_recorder = (() => {
+const { CONFIG } = __venzio_config;
+/**
+ * Audio Recorder Module
+ * Gestiona grabación de frases con prebuffer circular y WAV encoder
+ */
+
+
+class WAVEncoder {
+    constructor(sampleRate = 16000, numChannels = 1) {
+        this.sampleRate = sampleRate;
+        this.numChannels = numChannels;
+    }
+
+    encode(samples) {
+        const buffer = new ArrayBuffer(44 + samples.length * 2);
+        const view = new DataView(buffer);
+
+        // WAV Header
+        this._writeString(view, 0, 'RIFF');
+        view.setUint32(4, 36 + samples.length * 2, true);
+        this._writeString(view, 8, 'WAVE');
+
+        // fmt chunk
+        this._writeString(view, 12, 'fmt ');
+        view.setUint32(16, 16, true);
+        view.setUint16(20, 1, true);
+        view.setUint16(22, this.numChannels, true);
+        view.setUint32(24, this.sampleRate, true);
+        view.setUint32(28, this.sampleRate * 2 * this.numChannels, true);
+        view.setUint16(32, this.numChannels * 2, true);
+        view.setUint16(34, 16, true);
+
+        // data chunk
+        this._writeString(view, 36, 'data');
+        view.setUint32(40, samples.length * 2, true);
+
+        // PCM samples
+        let offset = 44;
+        for (let i = 0; i < samples.length; i++, offset += 2) {
+            const s = Math.max(-1, Math.min(1, samples[i]));
+            view.setInt16(offset, s < 0 ? s * 0x8000 : s * 0x7FFF, true);
+        }
+
+        return buffer;
+    }
+
+    _writeString(view, offset, string) {
+        for (let i = 0; i < string.length; i++) {
+            view.setUint8(offset + i, string.charCodeAt(i));
+        }
+    }
+}
+
+class CircularBuffer {
+    constructor(size) {
+        this.buffer = new Float32Array(size);
+        this.size = size;
+        this.writeIndex = 0;
+        this.isFull = false;
+    }
+
+    push(sample) {
+        this.buffer[this.writeIndex] = sample;
+        this.writeIndex = (this.writeIndex + 1) % this.size;
+        if (this.writeIndex === 0) {
+            this.isFull = true;
+        }
+    }
+
+    getContents() {
+        if (!this.isFull) {
+            return this.buffer.slice(0, this.writeIndex);
+        }
+
+        const result = new Float32Array(this.size);
+        const firstPart = this.buffer.slice(this.writeIndex);
+        const secondPart = this.buffer.slice(0, this.writeIndex);
+        result.set(firstPart);
+        result.set(secondPart, firstPart.length);
+        return result;
+    }
+}
+
+class Recorder {
+    constructor() {
+        this.onAudioReady = null; // callback: (wavBuffer: ArrayBuffer) => void
+
+        this.wavEncoder = new WAVEncoder(CONFIG.audio.sampleRate, CONFIG.audio.channels);
+
+        // Prebuffer: 300ms at 16kHz = 4800 samples
+        const prebufferSamples = Math.floor(CONFIG.audio.sampleRate * CONFIG.prebuffer.durationMs / 1000);
+        this.prebuffer = new CircularBuffer(prebufferSamples);
+
+        this.recordingBuffer = [];
+        this.isRecording = false;
+
+        this.maxRecordingSamples = Math.floor(CONFIG.audio.sampleRate * CONFIG.recording.maxRecordingMs / 1000);
+    }
+
+    processAudioFrame(samples) {
+        // Always add to prebuffer
+        for (let i = 0; i < samples.length; i++) {
+            this.prebuffer.push(samples[i]);
+        }
+
+        // Add to recording buffer if recording
+        if (this.isRecording) {
+            for (let i = 0; i < samples.length; i++) {
+                this.recordingBuffer.push(samples[i]);
+
+                // Check max recording time
+                if (this.recordingBuffer.length >= this.maxRecordingSamples) {
+                    this.stopRecording();
+                    break;
+                }
+            }
+        }
+    }
+
+    startRecording() {
+        if (this.isRecording) return;
+
+        console.log('[Recorder] Start recording');
+
+        // Copy prebuffer to recording buffer
+        const prebufferContents = this.prebuffer.getContents();
+        this.recordingBuffer = Array.from(prebufferContents);
+
+        this.isRecording = true;
+    }
+
+    stopRecording() {
+        if (!this.isRecording) return;
+
+        console.log('[Recorder] Stop recording');
+
+        this.isRecording = false;
+
+        if (this.recordingBuffer.length === 0) {
+            console.log('[Recorder] No audio to process');
+            return;
+        }
+
+        // Generate WAV
+        const samples = new Float32Array(this.recordingBuffer);
+        const wavBuffer = this.wavEncoder.encode(samples);
+
+        console.log(`[Recorder] Generated WAV: ${samples.length} samples, ${(samples.length / CONFIG.audio.sampleRate).toFixed(2)}s`);
+
+        // Emit event
+        if (this.onAudioReady) {
+            this.onAudioReady(wavBuffer);
+        }
+
+        // Reset
+        this.recordingBuffer = [];
+    }
+
+    reset() {
+        this.recordingBuffer = [];
+        this.isRecording = false;
+    }
+}
+return { Recorder };
+})();
+// ── websocket.js ──
+const __venzio_websocket = (() => {
+const { CONFIG } = __venzio_config;
+/**
+ * WebSocket Communication Module
+ * Comunicación con backend para envío de audio y recepción de respuestas
+ */
+
+
+// Framing binario versionado (ver fastapi-core/framing.py): cada mensaje binario es
+// [versión u8][tipo u8][turno u32][seq u32][payload], big-endian. Se negocia como
+// subprotocolo; los mensajes de texto siguen siendo JSON.
+const FRAMING_PROTOCOL = 'venzio.v1';
+const FRAMING_VERSION = 1;
+const HEADER_BYTES = 10;
+const FRAME = {
+    AUDIO: 0x01,
+    AUDIO_END: 0x02,
+    TRANSCRIPT: 0x10,
+    REPLY_TEXT: 0x11,
+    ERROR: 0x12,
+    EVENT: 0x20,
+};
+
+class WebSocketClient {
+    constructor() {
+        this.ws = null;
+        this.isConnected = false;
+
+        // Reanudación: si la conexión se cae, reconectar con el resume token de la
+        // sesión para seguir la misma conversación (el servidor la espera un rato)
+        this.voiceId = null;
+        this.token = null;
+        this.resumeToken = null;
+        this.closing = false;
+
+        // Framing: negociado en cada conexión (un servidor viejo no lo acepta)
+        this.framed = false;
+        this.sendSeq = 0;
+        this.recvSeq = null;
+        this.sendTurn = 0;
+        this.audioTurn = null;
+        this.audioParts = [];
+        this.textDecoder = new TextDecoder();
+
+        // Callbacks
+        this.onTranscript = null; // (text: string) => void
+        this.onReply = null;     // (text: string) => void
+        this.onAudio = null;     // (audioBuffer: ArrayBuffer) => void
+        this.onError = null;     // (message: string) => void
+        this.onConnected = null; // () => void
+        this.onDisconnected = null; // () => void
+    }
+
+    async connect(voiceId, token) {
+        if (this.isConnected) return;
+
+        this.voiceId = voiceId;
+        this.token = token;
+        this.resumeToken = null;
+        this.closing = false;
+        return this._open(false);
+    }
+
+    async _open(resuming) {
+        try {
+            let wsUrl = `${CONFIG.api.wsBaseUrl}/ws/public/voice/${this.voiceId}?token=${this.token}`;
+            if (resuming) wsUrl += `&resume=${encodeURIComponent(this.resumeToken)}`;
+            this.ws = CONFIG.websocket.framing
+                ? new WebSocket(wsUrl, [FRAMING_PROTOCOL])
+                : new WebSocket(wsUrl);
+            this.ws.binaryType = 'arraybuffer';
+
+            return new Promise((resolve, reject) => {
+                this.ws.onopen = () => {
+                    console.log(resuming ? '[WebSocket] Reconnected' : '[WebSocket] Connected');
+                    this.isConnected = true;
+                    this.framed = this.ws.protocol === FRAMING_PROTOCOL;
+                    this.sendSeq = 0;
+                    this.recvSeq = null;
+                    this.audioTurn = null;
+                    this.audioParts = [];
+                    // Al reanudar el pipeline de audio nunca se detuvo
+                    if (!resuming && this.onConnected) this.onConnected();
+                    resolve();
+                };
+
+                this.ws.onmessage = (event) => {
+                    this._handleMessage(event);
+                };
+
+                this.ws.onerror = (error) => {
+                    console.error('[WebSocket] Error:', error);
+                    if (!resuming && this.onError) this.onError('Connection error');
+                    reject(error);
+                };
+
+                this.ws.onclose = (event) => {
+                    const wasConnected = this.isConnected;
+                    this.isConnected = false;
+                    // 4408: el servidor cerró la sesión (inactividad o duración máxima), no reanudar
+                    if (wasConnected && !this.closing && this.resumeToken && event.code !== 4408) {
+                        console.log('[WebSocket] Connection lost, resuming session');
+                        this._resume();
+                        return;
+                    }
+                    if (resuming) return; // el loop de _resume decide
+                    console.log('[WebSocket] Disconnected');
+                    if (this.onDisconnected) this.onDisconnected();
+                };
+            });
+
+        } catch (error) {
+            console.error('[WebSocket] Connection failed:', error);
+            throw error;
+        }
+    }
+
+    async _resume() {
+        for (let attempt = 1; attempt <= CONFIG.websocket.maxAttempts; attempt++) {
+            await new Promise(r => setTimeout(r, CONFIG.websocket.delayMs * attempt));
+            if (this.closing) return;
+            try {
+                await this._open(true);
+                return;
+            } catch (error) {
+                console.warn(`[WebSocket] Resume attempt ${attempt} failed`);
+            }
+        }
+        this.resumeToken = null;
+        console.log('[WebSocket] Disconnected');
+        if (this.onDisconnected) this.onDisconnected();
+    }
+
+    disconnect() {
+        this.closing = true;
+        if (this.ws && this.isConnected) {
+            this.ws.close();
+        }
+    }
+
+    sendAudio(audioBuffer) {
+        if (!this.isConnected || !this.ws) {
+            console.error('[WebSocket] Not connected');
+            return;
+        }
+
+        try {
+            console.log(`[WebSocket] Sending audio: ${audioBuffer.byteLength} bytes`);
+            if (!this.framed) {
+                this.ws.send(audioBuffer);
+                return;
+            }
+            // Con framing: trozos AUDIO del turno y un AUDIO_END que dispara el proceso
+            const turn = ++this.sendTurn;
+            const bytes = new Uint8Array(audioBuffer);
+            for (let start = 0; start < bytes.length; start += CONFIG.websocket.chunkBytes) {
+                this.ws.send(this._frame(FRAME.AUDIO, turn, bytes.subarray(start, start + CONFIG.websocket.chunkBytes)));
+            }
+            this.ws.send(this._frame(FRAME.AUDIO_END, turn));
+        } catch (error) {
+            console.error('[WebSocket] Error sending audio:', error);
+            if (this.onError) this.onError('Error sending audio');
+        }
+    }
+
+    sendEndSession() {
+        this.closing = true;
+        if (!this.isConnected || !this.ws) return;
+
+        try {
+            this.ws.send(JSON.stringify({ type: 'end_session' }));
+        } catch (error) {
+            console.error('[WebSocket] Error sending end_session:', error);
+        }
+    }
+
+    _frame(type, turn, payload = null) {
+        const length = payload ? payload.byteLength : 0;
+        const frame = new Uint8Array(HEADER_BYTES + length);
+        const view = new DataView(frame.buffer);
+        view.setUint8(0, FRAMING_VERSION);
+        view.setUint8(1, type);
+        view.setUint32(2, turn);
+        view.setUint32(6, this.sendSeq);
+        this.sendSeq = (this.sendSeq + 1) >>> 0;
+        if (payload) frame.set(payload, HEADER_BYTES);
+        return frame.buffer;
+    }
+
+    _handleMessage(event) {
+        if (event.data instanceof ArrayBuffer) {
+            if (this.framed) {
+                this._handleFrame(event.data);
+                return;
+            }
+            // Binary audio data
+            console.log(`[WebSocket] Received audio: ${event.data.byteLength} bytes`);
+            if (this.onAudio) this.onAudio(event.data);
+        } else {
+            // Text message
+            try {
+                const msg = JSON.parse(event.data);
+                this._handleTextMessage(msg);
+            } catch (error) {
+                console.error('[WebSocket] Error parsing message:', error);
+            }
+        }
+    }
+
+    _handleFrame(buffer) {
+        if (buffer.byteLength < HEADER_BYTES) {
+            console.error('[WebSocket] Short frame:', buffer.byteLength);
+            return;
+        }
+        const view = new DataView(buffer);
+        if (view.getUint8(0) !== FRAMING_VERSION) {
+            console.error('[WebSocket] Unsupported framing version:', view.getUint8(0));
+            return;
+        }
+        const type = view.getUint8(1);
+        const turn = view.getUint32(2);
+        const seq = view.getUint32(6);
+        const payload = new Uint8Array(buffer, HEADER_BYTES);
+
+        if (this.recvSeq !== null && seq !== this.recvSeq) {
+            // Falta o sobra un frame: el clip a medias ya no es reproducible
+            console.warn(`[WebSocket] Frame seq ${seq}, expected ${this.recvSeq}`);
+            this.audioParts = [];
+        }
+        this.recvSeq = (seq + 1) >>> 0;
+
+        switch (type) {
+            case FRAME.AUDIO:
+                if (turn !== this.audioTurn) {
+                    this.audioTurn = turn;
+                    this.audioParts = [];
+                }
+                this.audioParts.push(payload);
+                break;
+
+            case FRAME.AUDIO_END: {
+                if (turn !== this.audioTurn || !this.audioParts.length) break;
+                const size = this.audioParts.reduce((total, part) => total + part.byteLength, 0);
+                const audio = new Uint8Array(size);
+                let offset = 0;
+                for (const part of this.audioParts) {
+                    audio.set(part, offset);
+                    offset += part.byteLength;
+                }
+                this.audioParts = [];
+                console.log(`[WebSocket] Received audio: ${size} bytes (turn ${turn})`);
+                if (this.onAudio) this.onAudio(audio.buffer);
+                break;
+            }
+
+            case FRAME.TRANSCRIPT:
+                this._handleTextMessage({ type: 'final_transcript', text: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.REPLY_TEXT:
+                this._handleTextMessage({ type: 'reply_text', text: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.ERROR:
+                this._handleTextMessage({ type: 'error', message: this.textDecoder.decode(payload) });
+                break;
+
+            case FRAME.EVENT:
+                try {
+                    this._handleTextMessage(JSON.parse(this.textDecoder.decode(payload)));
+                } catch (error) {
+                    console.error('[WebSocket] Error parsing event frame:', error);
+                }
+                break;
+
+            default:
+                console.log('[WebSocket] Unknown frame type:', type);
+        }
+    }
+
+    _handleTextMessage(msg) {
+        switch (msg.type) {
+            case 'session_ready':
+                console.log('[WebSocket] Session ready:', msg.voice, msg.resumed ? '(resumed)' : '');
+                this.resumeToken = msg.resume_token || null;
+                break;
+
+            case 'ping':
+                // Heartbeat: sin pong el servidor da la conexión por perdida y libera el slot
+                try { this.ws.send(JSON.stringify({ type: 'pong' })); } catch (error) { /* cerrándose */ }
+                break;
+
+            case 'final_transcript':
+                console.log('[WebSocket] Transcript:', msg.text);
+                if (this.onTranscript) this.onTranscript(msg.text);
+                break;
+
+            case 'reply_text':
+                console.log('[WebSocket] Reply:', msg.text);
+                if (this.onReply) this.onReply(msg.text);
+                break;
+
+            case 'error':
+                console.error('[WebSocket] Error:', msg.message);
+                if (this.onError) this.onError(msg.message);
+                break;
+
+            default:
+                console.log('[WebSocket] Unknown message type:', msg.type);
+        }
+    }
+}
+return { WebSocketClient };
+})();
+// ── player.js ──
+const __venzio_player = (() => {
+const { CONFIG } = __venzio_config;
+/**
+ * Audio Player Module
+ * Reproduce audio de respuesta del agente
+ */
+
+
+class AudioPlayer {
+    constructor() {
+        this.audioContext = null;
+        this.currentSource = null;
+        this.isPlaying = false;
+        this.onEnd = null; // callback: () => void
+    }
+
+    async play(audioBuffer) {
+        if (this.isPlaying) {
+            this.stop();
+        }
+
+        try {
+            if (!this.audioContext) {
+                this.audioContext = new AudioContext({ sampleRate: CONFIG.audio.sampleRate });
+                if (this.audioContext.state === 'suspended') {
+                    await this.audioContext.resume();
+                }
+            }
+
+            const audioBufferDecoded = await this.audioContext.decodeAudioData(audioBuffer.slice());
+
+            this.currentSource = this.audioContext.createBufferSource();
+            this.currentSource.buffer = audioBufferDecoded;
+            this.currentSource.connect(this.audioContext.destination);
+
+            this.currentSource.onended = () => {
+                this.isPlaying = false;
+                this.currentSource = null;
+                console.log('[Player] Playback ended');
+                if (this.onEnd) this.onEnd();
+            };
+
+            this.currentSource.start(0);
+            this.isPlaying = true;
+
+            console.log(`[Player] Started playback: ${(audioBufferDecoded.duration).toFixed(2)}s`);
+
+        } catch (error) {
+            console.error('[Player] Error playing audio:', error);
+            this.isPlaying = false;
+        }
+    }
+
+    stop() {
+        if (this.currentSource && this.isPlaying) {
+            try {
+                this.currentSource.stop();
+                console.log('[Player] Playback stopped');
+            } catch (error) {
+                console.error('[Player] Error stopping playback:', error);
+            }
+        }
+
+        this.currentSource = null;
+        this.isPlaying = false;
+    }
+
+    destroy() {
+        this.stop();
+
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
+    }
+}
+return { AudioPlayer };
+})();
+// ── widget.js ──
+const __venzio_widget = (() => {
+const { CONFIG } = __venzio_config;
+const { AudioCapture } = __venzio_audio_capture;
+const { VAD } = __venzio_vad;
+const { Recorder } = __venzio_recorder;
+const { WebSocketClient } = __venzio_websocket;
+const { AudioPlayer } = __venzio_player;
+/**
+ * Venzio Widget - Main Orchestrator
+ * Gestiona máquina de estados y coordina módulos
+ */
+
+
+const STATES = {
+    IDLE: 'idle',
+    CONNECTING: 'connecting',
+    LISTENING: 'listening',
+    RECORDING: 'recording',
+    PROCESSING: 'processing',
+    PLAYING: 'playing',
+    ERROR: 'error',
+};
+
+class VenzioWidget {
+    constructor(options = {}) {
+        console.log('[Venzio][DEBUG] widget constructor called');
+
+        // Validar parámetros requeridos
+        if (!options.siteId || !options.voiceId || !options.token) {
+            throw new Error('siteId, voiceId y token son requeridos');
+        }
+
+        this.options = {
+            apiBase: options.apiBase || CONFIG.api.baseUrl,
+            agentName: options.agentName || 'Agente Venzio',
+            siteId: options.siteId,
+            voiceId: options.voiceId,
+            token: options.token,
+            ...options
+        };
+
+        this.state = STATES.IDLE;
+
+        // Initialize modules
+        this.audioCapture = new AudioCapture();
+        this.vad = new VAD();
+        this.recorder = new Recorder();
+        this.wsClient = new WebSocketClient();
+        this.player = new AudioPlayer();
+
+        // Setup event handlers
+        this._setupEventHandlers();
+
+        // DOM elements
+        this.elements = {};
+        this.isOpen = false;
+
+        this._buildUI();
+    }
+
+    // ── State Management ──────────────────────────────────────────────────────
+    _setState(newState) {
+        console.log(`[Widget] State: ${this.state} → ${newState}`);
+        this.state = newState;
+        this._updateUI();
+    }
+
+    // ── Module Event Handlers ─────────────────────────────────────────────────
+    _setupEventHandlers() {
+        // Audio capture
+        this.audioCapture.onAudioFrame = (samples) => {
+            this.vad.processAudioFrame(samples);
+            this.recorder.processAudioFrame(samples);
+        };
+
+        // VAD
+        this.vad.onVoiceStart = () => {
+            console.log('[Venzio][DEBUG] VAD voice start detected');
+            console.log('[Venzio][DEBUG] current state:', this.state);
+
+            // Barge-in: interrupt playback if user speaks while agent is talking
+            if (this.state === STATES.PLAYING) {
+                // Anti-echo protection: ignore voice detection within 150ms of playback start
+                if (this.playingStartedAt && (Date.now() - this.playingStartedAt) < 150) {
+                    console.log('[Venzio][DEBUG] voice ignored (anti-echo protection)');
+                    return;
+                }
+
+                console.log('[Venzio][DEBUG] barge-in triggered');
+                console.log('[Venzio][DEBUG] stopping player');
+                this.player.stop();
+                this.recorder.startRecording();
+                this._setState(STATES.RECORDING);
+                return;
+            }
+
+            // Normal voice start when listening
+            if (this.state === STATES.LISTENING) {
+                this.recorder.startRecording();
+                this._setState(STATES.RECORDING);
+            }
+        };
+
+        this.vad.onVoiceEnd = () => {
+            if (this.state === STATES.RECORDING) {
+                this.recorder.stopRecording();
+                this._setState(STATES.PROCESSING);
+            }
+        };
+
+        // Recorder
+        this.recorder.onAudioReady = (wavBuffer) => {
+            this.wsClient.sendAudio(wavBuffer);
+        };
+
+        // WebSocket
+        this.wsClient.onConnected = () => {
+            this._startAudioPipeline();
+            this._setState(STATES.LISTENING);
+        };
+
+        this.wsClient.onDisconnected = () => {
+            this._stopAudioPipeline();
+            this._setState(STATES.IDLE);
+        };
+
+        this.wsClient.onTranscript = (text) => {
+            this._addMessage('user', text);
+        };
+
+        this.wsClient.onReply = (text) => {
+            this._addMessage('agent', text);
+        };
+
+        this.wsClient.onAudio = (audioBuffer) => {
+            this.playingStartedAt = Date.now();
+            this.player.play(audioBuffer);
+            this._setState(STATES.PLAYING);
+        };
+
+        this.wsClient.onError = (message) => {
+            this._addMessage('error', message);
+            this._setState(STATES.ERROR);
+        };
+
+        // Player
+        this.player.onEnd = () => {
+            this._setState(STATES.LISTENING);
+        };
+    }
+
+    // ── Audio Pipeline Control ────────────────────────────────────────────────
+    async _startAudioPipeline() {
+        try {
+            await this.audioCapture.start();
+            console.log('[Widget] Audio pipeline started');
+        } catch (error) {
+            console.error('[Widget] Failed to start audio pipeline:', error);
+            this._setState(STATES.ERROR);
+        }
+    }
+
+    _stopAudioPipeline() {
+        this.audioCapture.stop();
+        this.vad.reset();
+        this.recorder.reset();
+        console.log('[Widget] Audio pipeline stopped');
+    }
+
+    // ── WebSocket Connection ──────────────────────────────────────────────────
+    async _connectWebSocket() {
+        if (!this.options.voiceId || !this.options.token) {
+            this._addMessage('error', 'Configuración incompleta');
+            return;
+        }
+
+        this._setState(STATES.CONNECTING);
+
+        try {
+            await this.wsClient.connect(this.options.voiceId, this.options.token);
+        } catch (error) {
+            console.error('[Widget] Connection failed:', error);
+            this._setState(STATES.ERROR);
+        }
+    }
+
+    // ── UI Management ────────────────────────────────────────────────────────
+    _buildUI() {
+        console.log('[Venzio][DEBUG] building UI');
+
+        // Load CSS
+        if (!document.getElementById('vz-styles')) {
+            const link = document.createElement('link');
+            link.id = 'vz-styles';
+            link.rel = 'stylesheet';
+            link.href = `${this.options.apiBase.replace('/api', '')}/widget/widget.css`;
+            document.head.appendChild(link);
+        }
+
+        const wrapper = document.createElement('div');
+        wrapper.className = 'vz-widget';
+        wrapper.id = 'vz-widget';
+        wrapper.innerHTML = `
             <button class="vz-trigger" id="vz-trigger" aria-label="Abrir agente de voz">
                 <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                     <path d="M12 1a3 3 0 0 0-3 3v8a3 3 0 0 0 6 0V4a3 3 0 0 0-3-3z"/>
@@ -33,25 +1051,120 @@
                     </div>
                     <div class="vz-header-info">
                         <h3>${this.options.agentName}</h3>
-                        <p><span class="vz-status-dot"></span>En l\xEDnea</p>
+                        <p><span class="vz-status-dot"></span>En línea</p>
                     </div>
                 </div>
 
                 <div class="vz-messages" id="vz-messages">
                     <div class="vz-msg agent">
-                        \u{1F44B} \xA1Hola! Soy tu agente de ventas virtual. Te escucho autom\xE1ticamente.
+                        👋 ¡Hola! Soy tu agente de ventas virtual. Te escucho automáticamente.
                     </div>
                 </div>
 
                 <div class="vz-visualizer" id="vz-visualizer">
-                    ${Array.from({length:10},()=>'<div class="vz-bar"></div>').join("")}
+                    ${Array.from({ length: 10 }, () => '<div class="vz-bar"></div>').join('')}
                 </div>
 
                 <div class="vz-controls">
                     <div class="vz-status-text" id="vz-status-text">
-                        <span>Listo</span> \u2014 Abre el panel para conectar
+                        <span>Listo</span> — Abre el panel para conectar
                     </div>
                     <button class="vz-end-btn" id="vz-end-btn">Terminar</button>
                 </div>
             </div>
-        `,document.body.appendChild(e),this.elements.trigger=document.getElementById("vz-trigger"),this.elements.panel=document.getElementById("vz-panel"),this.elements.messages=document.getElementById("vz-messages"),this.elements.status=document.getElementById("vz-status-text"),this.elements.endBtn=document.getElementById("vz-end-btn"),this.elements.visualizer=document.getElementById("vz-visualizer"),this.elements.trigger.addEventListener("click",()=>this.togglePanel()),this.elements.endBtn.addEventListener("click",()=>this.endSession())}togglePanel(){this.isOpen=!this.isOpen,this.elements.panel.classList.toggle("open",this.isOpen),this.elements.trigger.classList.toggle("active",this.isOpen),this.isOpen&&this.state===i.IDLE&&this._connectWebSocket()}_updateUI(){let e=this.elements.visualizer;switch(e.className="vz-visualizer",this.state){case i.LISTENING:e.classList.add("listening"),this._setStatus("Escuchando...");break;case i.RECORDING:e.classList.add("user_speaking"),this._setStatus("Hablando...");break;case i.PROCESSING:e.classList.add("processing"),this._setStatus("Procesando...");break;case i.PLAYING:e.classList.add("speaking"),this._setStatus("Respondiendo...");break;case i.CONNECTING:this._setStatus("Conectando...");break;case i.ERROR:this._setStatus("Error");break;default:this._setStatus("Listo")}}_setStatus(e){this.elements.status.innerHTML=`<span>${e}</span>`}_addMessage(e,t){let s=document.createElement("div");s.className=`vz-msg ${e}`,s.textContent=t,this.elements.messages.appendChild(s),this.elements.messages.scrollTop=this.elements.messages.scrollHeight}endSession(){this._stopAudioPipeline(),this.wsClient.sendEndSession(),this.wsClient.disconnect(),this.player.destroy(),this._setState(i.IDLE),this._setStatus("Sesi\xF3n terminada")}destroy(){this.endSession(),this.elements.trigger&&this.elements.trigger.remove()}};typeof window<"u"&&(window.VenzioWidget=m);})();
+        `;
+
+        document.body.appendChild(wrapper);
+
+        this.elements.trigger = document.getElementById('vz-trigger');
+        this.elements.panel = document.getElementById('vz-panel');
+        this.elements.messages = document.getElementById('vz-messages');
+        this.elements.status = document.getElementById('vz-status-text');
+        this.elements.endBtn = document.getElementById('vz-end-btn');
+        this.elements.visualizer = document.getElementById('vz-visualizer');
+
+        this.elements.trigger.addEventListener('click', () => this.togglePanel());
+        this.elements.endBtn.addEventListener('click', () => this.endSession());
+    }
+
+    togglePanel() {
+        this.isOpen = !this.isOpen;
+        this.elements.panel.classList.toggle('open', this.isOpen);
+        this.elements.trigger.classList.toggle('active', this.isOpen);
+
+        if (this.isOpen && this.state === STATES.IDLE) {
+            this._connectWebSocket();
+        }
+    }
+
+    _updateUI() {
+        const viz = this.elements.visualizer;
+        viz.className = 'vz-visualizer';
+
+        switch (this.state) {
+            case STATES.LISTENING:
+                viz.classList.add('listening');
+                this._setStatus('Escuchando...');
+                break;
+            case STATES.RECORDING:
+                viz.classList.add('user_speaking');
+                this._setStatus('Hablando...');
+                break;
+            case STATES.PROCESSING:
+                viz.classList.add('processing');
+                this._setStatus('Procesando...');
+                break;
+            case STATES.PLAYING:
+                viz.classList.add('speaking');
+                this._setStatus('Respondiendo...');
+                break;
+            case STATES.CONNECTING:
+                this._setStatus('Conectando...');
+                break;
+            case STATES.ERROR:
+                this._setStatus('Error');
+                break;
+            default:
+                this._setStatus('Listo');
+        }
+    }
+
+    _setStatus(text) {
+        this.elements.status.innerHTML = `<span>${text}</span>`;
+    }
+
+    _addMessage(type, text) {
+        const div = document.createElement('div');
+        div.className = `vz-msg ${type}`;
+        div.textContent = text;
+        this.elements.messages.appendChild(div);
+        this.elements.messages.scrollTop = this.elements.messages.scrollHeight;
+    }
+
+    // ── Session Management ────────────────────────────────────────────────────
+    endSession() {
+        this._stopAudioPipeline();
+        this.wsClient.sendEndSession();
+        this.wsClient.disconnect();
+        this.player.destroy();
+        this._setState(STATES.IDLE);
+        this._setStatus('Sesión terminada');
+    }
+
+    destroy() {
+        this.endSession();
+        if (this.elements.trigger) {
+            this.elements.trigger.remove();
+        }
+    }
+}
+
+// Export for module system and global access
+
+// Make available globally for embed.js
+if (typeof window !== 'undefined') {
+    window.VenzioWidget = VenzioWidget;
+}
+return { VenzioWidget };
+})();
+})();